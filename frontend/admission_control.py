@@ -0,0 +1,265 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+# config.py에서 설정 정보 로드
+from config import AppConfig
+
+# 예상 대기 시간 계산에 쓰는 LLM 호출 1건의 처리 시간 지수 이동 평균(EWMA) 가중치
+SERVICE_TIME_EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """사용자별 대기열이 가득 찼거나 최대 대기 시간 안에 LLM 호출 차례가 오지 않았을 때 발생합니다."""
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason  # "queue_full" / "timeout"
+
+
+class AdmissionTicket:
+    """대기열에 들어간 LLM 호출 한 건입니다. (허가 후 release 전에 실제 사용 토큰 수를 기록하면 토큰 버킷을 보정)"""
+    def __init__(self, user_id, estimated_tokens):
+        self.user_id = user_id
+        self.estimated_tokens = estimated_tokens
+        self.enqueued_at = time.monotonic()
+        self.admitted_at = None
+        self.initial_position = None  # 대기열에 들어간 시점의 대기 순서 (0이면 바로 허가)
+        self.actual_tokens = None
+
+    @property
+    def wait_seconds(self):
+        return (self.admitted_at or time.monotonic()) - self.enqueued_at
+
+    def record_usage(self, tokens):
+        self.actual_tokens = tokens
+
+
+class TokenBucket:
+    """
+    분당 토큰 한도(tokens_per_minute)만큼 일정하게 다시 채워지는 토큰 버킷입니다. (capacity는 한 번에 쓸 수 있는 최대량)
+    실제 사용량이 추정치보다 많으면 잔량이 음수(빚)가 될 수 있고, 다음 요청은 그만큼 더 기다립니다. (호출한 쪽에서 잠금 필요)
+    """
+    def __init__(self, tokens_per_minute, capacity=None):
+        self.rate = tokens_per_minute / 60.0
+        self.capacity = capacity or tokens_per_minute
+        self.tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def refill(self, now):
+        if self.enabled:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def seconds_until(self, amount, now):
+        """amount만큼(최대 capacity) 쓸 수 있을 때까지 남은 시간(초)을 반환합니다."""
+        if not self.enabled:
+            return 0.0
+        self.refill(now)
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+    def consume(self, amount):
+        if self.enabled:
+            self.tokens -= amount
+
+    def adjust(self, amount):
+        """추정치와 실제 사용량의 차이(amount, 양수면 더 씀)를 반영합니다."""
+        if self.enabled:
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class AdmissionController:
+    """
+    프로세스 전역에서 LLM 호출을 허가하는 관리자입니다. (Streamlit 세션, API 작업자, 일괄 실행이 모두 공유)
+    - 동시 실행 한도(max_concurrent): 동시에 진행 중인 LLM 호출 수를 제한
+    - 토큰 버킷(tokens_per_minute, burst_tokens): API 분당 토큰 한도를 넘지 않도록 추정 토큰 수만큼 차감
+    - 사용자별 공정 대기열: 사용자마다 FIFO 대기열을 두고 사용자 사이에서는 돌아가며(round-robin) 허가하므로
+      한 사용자가 요청을 많이 넣어도 다른 사용자의 대기 순서가 밀리지 않음
+    허가 순서는 엄격하게 지켜서, 맨 앞 요청이 토큰을 기다리는 동안 뒤의 작은 요청이 먼저 들어가지 않습니다.
+    """
+    def __init__(self, max_concurrent, tokens_per_minute=0, burst_tokens=0, max_queue_per_user=0, max_wait_seconds=None):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue_per_user = max_queue_per_user  # 0이면 제한 없음
+        self.max_wait_seconds = max_wait_seconds
+        self._bucket = TokenBucket(tokens_per_minute, burst_tokens or None)
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # user_id -> 대기 중인 AdmissionTicket deque (앞쪽 사용자부터 다음 차례)
+        self._in_flight = 0
+        self._service_seconds = None  # 허가 후 release까지 걸린 시간의 EWMA
+        self._admitted_total = 0
+        self._rejected_totals = {}    # 거절 사유 -> 건수
+        self._wait_seconds_sum = 0.0
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            AppConfig.ADMISSION_MAX_CONCURRENT_LLM_CALLS,
+            AppConfig.LLM_TOKENS_PER_MINUTE,
+            AppConfig.LLM_TOKEN_BUCKET_BURST,
+            AppConfig.ADMISSION_MAX_QUEUE_PER_USER,
+            AppConfig.ADMISSION_MAX_WAIT_SECONDS
+        )
+
+    def _fair_order(self):
+        """현재 대기 중인 요청을 허가될 순서(사용자 간 round-robin)대로 반환합니다."""
+        queues = list(self._queues.values())
+        return [tickets[index] for index in range(max((len(tickets) for tickets in queues), default=0)) for tickets in queues if index < len(tickets)]
+
+    def _try_admit(self, ticket, now):
+        """ticket이 다음 차례이고 실행 자리와 토큰이 있으면 허가합니다. (잠금 상태에서 호출)"""
+        if ticket.admitted_at is not None:
+            return True
+        user_id = next(iter(self._queues))
+        tickets = self._queues[user_id]
+        if tickets[0] is not ticket or self._in_flight >= self.max_concurrent or self._bucket.seconds_until(ticket.estimated_tokens, now) > 0:
+            return False
+        tickets.popleft()
+        if tickets:
+            self._queues.move_to_end(user_id)
+        else:
+            del self._queues[user_id]
+        self._bucket.consume(ticket.estimated_tokens)
+        self._in_flight += 1
+        self._admitted_total += 1
+        ticket.admitted_at = now
+        self._wait_seconds_sum += ticket.wait_seconds
+        # 자리가 더 남아 있으면 다음 차례 요청도 바로 들어갈 수 있도록 깨움
+        self._cond.notify_all()
+        return True
+
+    def _remove(self, ticket):
+        tickets = self._queues.get(ticket.user_id)
+        if tickets and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del self._queues[ticket.user_id]
+            self._cond.notify_all()
+
+    def _queue_status(self, ticket, now):
+        """(대기 순서(0부터), 예상 대기 시간(초) 또는 처리 시간 기록이 없으면 None)을 반환합니다. (잠금 상태에서 호출)"""
+        order = self._fair_order()
+        position = order.index(ticket)
+        token_wait = 0.0
+        if self._bucket.enabled:
+            self._bucket.refill(now)
+            needed = sum(queued.estimated_tokens for queued in order[:position + 1])
+            token_wait = max(0.0, (needed - self._bucket.tokens) / self._bucket.rate)
+        if self._service_seconds is None:
+            return position, (token_wait or None)
+        # 앞선 요청과 이 요청이 실행 자리를 얻기까지 필요한 완료 건수를 동시 실행 한도로 나눈 '회차' 수로 추정
+        free_slots = self.max_concurrent - self._in_flight
+        completions_needed = max(0, position + 1 - free_slots)
+        slot_wait = math.ceil(completions_needed / self.max_concurrent) * self._service_seconds
+        return position, max(slot_wait, token_wait)
+
+    def acquire(self, user_id, estimated_tokens, on_wait=None, poll_interval=0.5, limit_queue=True):
+        """
+        LLM 호출 차례가 올 때까지 기다렸다가 허가된 AdmissionTicket을 반환합니다. (끝나면 반드시 release)
+        기다리는 동안 poll_interval마다 호출한 스레드에서 on_wait(대기 순서, 예상 대기 시간)을 호출합니다. (화면 갱신용)
+        사용자별 대기열이 가득 찼거나(limit_queue=True일 때) max_wait_seconds 안에 차례가 오지 않으면 AdmissionRejected를 올립니다.
+        """
+        ticket = AdmissionTicket(user_id, estimated_tokens)
+        deadline = ticket.enqueued_at + self.max_wait_seconds if self.max_wait_seconds else None
+        with self._cond:
+            queued = self._queues.get(user_id)
+            if limit_queue and queued is not None and self.max_queue_per_user and len(queued) >= self.max_queue_per_user:
+                self._rejected_totals["queue_full"] = self._rejected_totals.get("queue_full", 0) + 1
+                raise AdmissionRejected(f"사용자별 대기 요청 한도({self.max_queue_per_user}건)를 초과했습니다.", "queue_full")
+            self._queues.setdefault(user_id, deque()).append(ticket)
+            ticket.initial_position = self._fair_order().index(ticket)
+
+        try:
+            while True:
+                with self._cond:
+                    now = time.monotonic()
+                    if self._try_admit(ticket, now):
+                        return ticket
+                    if deadline is not None and now >= deadline:
+                        self._remove(ticket)
+                        self._rejected_totals["timeout"] = self._rejected_totals.get("timeout", 0) + 1
+                        raise AdmissionRejected(f"LLM 호출 대기 시간({self.max_wait_seconds}초)을 초과했습니다.", "timeout")
+                    position, estimated_wait = self._queue_status(ticket, now)
+                if on_wait:
+                    on_wait(position, estimated_wait)
+                with self._cond:
+                    now = time.monotonic()
+                    if self._try_admit(ticket, now):
+                        return ticket
+                    timeout = poll_interval if deadline is None else max(0.0, min(poll_interval, deadline - now))
+                    # 토큰만 부족하면 다 찰 때까지 (다른 요청이 끝나 깨우지 않아도) 깨어날 시간을 맞춤
+                    timeout = min(timeout, max(0.01, self._bucket.seconds_until(ticket.estimated_tokens, now))) if self._bucket.enabled else timeout
+                    self._cond.wait(timeout)
+        except BaseException:
+            # on_wait 중 예외(Streamlit rerun으로 인한 중단 등)가 나도 대기열에 남지 않도록 제거
+            with self._cond:
+                self._remove(ticket)
+            raise
+
+    def release(self, ticket):
+        """허가된 호출이 끝났음을 알리고, 실제 사용 토큰이 기록되어 있으면 토큰 버킷을 보정합니다."""
+        with self._cond:
+            self._in_flight -= 1
+            service_seconds = time.monotonic() - ticket.admitted_at
+            if self._service_seconds is None:
+                self._service_seconds = service_seconds
+            else:
+                self._service_seconds += SERVICE_TIME_EWMA_ALPHA * (service_seconds - self._service_seconds)
+            if ticket.actual_tokens is not None:
+                self._bucket.refill(time.monotonic())
+                self._bucket.adjust(ticket.actual_tokens - ticket.estimated_tokens)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            self._bucket.refill(time.monotonic())
+            return {
+                "max_concurrent": self.max_concurrent,
+                "in_flight": self._in_flight,
+                "queued": sum(len(tickets) for tickets in self._queues.values()),
+                "queued_users": len(self._queues),
+                "tokens_available": round(self._bucket.tokens) if self._bucket.enabled else None,
+                "admitted_total": self._admitted_total,
+                "rejected_totals": dict(self._rejected_totals),
+                "wait_seconds_sum": self._wait_seconds_sum,
+                "service_seconds": self._service_seconds,
+            }
+
+    def prometheus_lines(self):
+        """허가 관리자 상태를 Prometheus 텍스트 노출 형식의 줄 목록으로 반환합니다."""
+        stats = self.stats()
+        lines = [
+            "# HELP strategy_app_admission_in_flight LLM calls currently admitted and running.",
+            "# TYPE strategy_app_admission_in_flight gauge",
+            f"strategy_app_admission_in_flight {stats['in_flight']}",
+            "# HELP strategy_app_admission_queued LLM calls waiting for admission.",
+            "# TYPE strategy_app_admission_queued gauge",
+            f"strategy_app_admission_queued {stats['queued']}",
+            "# HELP strategy_app_admission_queued_users Users with at least one LLM call waiting for admission.",
+            "# TYPE strategy_app_admission_queued_users gauge",
+            f"strategy_app_admission_queued_users {stats['queued_users']}",
+            "# HELP strategy_app_admission_admitted_total LLM calls admitted.",
+            "# TYPE strategy_app_admission_admitted_total counter",
+            f"strategy_app_admission_admitted_total {stats['admitted_total']}",
+            "# HELP strategy_app_admission_wait_seconds_total Total time admitted LLM calls spent waiting in the queue.",
+            "# TYPE strategy_app_admission_wait_seconds_total counter",
+            f"strategy_app_admission_wait_seconds_total {stats['wait_seconds_sum']:.6f}",
+            "# HELP strategy_app_admission_rejected_total LLM calls rejected by admission control, by reason.",
+            "# TYPE strategy_app_admission_rejected_total counter",
+        ]
+        for reason, count in stats["rejected_totals"].items():
+            lines.append(f'strategy_app_admission_rejected_total{{reason="{reason}"}} {count}')
+        if stats["tokens_available"] is not None:
+            lines.append("# HELP strategy_app_admission_tokens_available Tokens currently available in the LLM token bucket.")
+            lines.append("# TYPE strategy_app_admission_tokens_available gauge")
+            lines.append(f"strategy_app_admission_tokens_available {stats['tokens_available']}")
+        return lines
+
+
+_shared_admission_controller = AdmissionController.from_config()
+
+def get_admission_controller():
+    """프로세스 전역에서 공유되는 LLM 호출 허가 관리자를 반환합니다."""
+    return _shared_admission_controller
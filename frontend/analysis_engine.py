@@ -1,7 +1,18 @@
-import json
-import openai
+import time
 # config.py에서 설정 정보 로드
 from config import AppConfig
+from response_cache import get_response_cache
+from incremental_json import IncrementalJsonParser
+from metrics import RequestTrace
+from llm_call_policy import LLMCallPolicy, LLMCallCancelled, LLMDeadlineExceeded
+from llm_router import get_endpoint_router, load_endpoints
+from prompt_templates import PROMPT_TEMPLATE_VERSION, build_prompts, build_requery_prompt
+from response_schema import validate_response_text
+from prompt_packer import estimate_tokens
+from admission_control import AdmissionRejected, get_admission_controller
+
+# 사용자 구분 없이 호출한 경우(일괄 실행, 벤치마크 등)의 허가 대기열 사용자 이름
+DEFAULT_USER_ID = "default"
 
 class AnalysisEngine:
     """
@@ -10,101 +21,242 @@ class AnalysisEngine:
     def __init__(self):
         self.api_key = AppConfig.OPENAI_API_KEY
         self.llm_model = AppConfig.LLM_MODEL
-        
-        if self.api_key:
-            # API Key가 있으면 클라이언트 초기화
-            self.client = openai.OpenAI(api_key=self.api_key)
-        else:
-            self.client = None
-
-    def _get_kpi_instruction(self, business_sector):
-        """분야별 KPI 도출 지침을 반환합니다."""
-        if business_sector == "subscription service":
-            return "제공된 원시 데이터를 기반으로 **구독/반복 활동 및 위험(Risk) 관련 핵심 지표** 6가지 (예: 전체 유지/이탈 지표, 사용 빈도, 구독 플랜별 성과, 계약 기간별 패턴, 지원 호출 리스크, 결제 지연 리스크 등)를 도출합니다."
-        elif business_sector == "online commerce":
-            return "제공된 원시 데이터를 기반으로 **거래 및 고객 행동 관련 핵심 지표** 6가지 (예: 객단가, 전환율, 장바구니 포기율, 재구매율, 평균 배송 시간 관련 지표 등)를 도출합니다."
-        elif business_sector == "contents":
-            return "제공된 원시 데이터를 기반으로 **콘텐츠 소비 및 참여 관련 핵심 지표** 6가지 (예: 카테고리별 평균 성과, 제목 길이 vs 조회수 패턴, 업로드 시간 vs 성과, 태그 수 vs 조회수 패턴, 평균 시청 시간, 월간 활동 사용자(MAU), 유료 전환율, 이탈률, 좋아요/공유 지표 등)를 도출합니다."
-        elif business_sector == "fintech":
-            return "제공된 원시 데이터를 기반으로 **금융 거래 및 리스크 관리 관련 핵심 지표** 6가지 (예: 거래 빈도, 평균 거래 금액, 사기 탐지율, 신용 점수 변화, 대출 상환율, 사용자 활동 지표 등)를 도출합니다."
-        else:
-            return "제공된 원시 데이터를 기반으로 **해당 분야에 가장 적합한 핵심 지표** 6가지를 도출합니다."
-
-    def run_analysis(self, strategy_data, raw_data_input):
+        self.base_url = AppConfig.OPENAI_BASE_URL
+        self.response_cache = get_response_cache()
+        self.last_cache_hit = False
+        # 제한 시간, 백오프 재시도, 헤지 요청 설정
+        self.call_policy = LLMCallPolicy.from_config()
+        # 프로세스 전역 동시 실행 한도/분당 토큰 한도/사용자별 공정 대기열
+        self.admission_controller = get_admission_controller()
+
+        # 엔드포인트 라우터는 실제 LLM 호출이 필요할 때 가져옴 (캐시 적중 시에는 클라이언트를 만들지 않음)
+        self.router = None
+
+    def is_configured(self):
+        """LLM 호출에 사용할 API Key, 엔드포인트 목록(LLM_ENDPOINTS) 또는 직접 지정한 라우터가 있는지 확인합니다."""
+        return bool(self.api_key or AppConfig.LLM_ENDPOINTS or self.router is not None)
+
+    def _get_router(self):
+        """LLM_ENDPOINTS(없으면 api_key/base_url/llm_model의 단일 엔드포인트)에 대해 프로세스 전역에서 공유되는 라우터를 반환합니다."""
+        if self.router is None:
+            self.router = get_endpoint_router(load_endpoints(self.api_key, self.base_url, self.llm_model))
+        return self.router
+
+    def _primary_models(self):
+        """기본 요청을 처리할 수 있는 모델 목록 (엔드포인트별 설정 모델, 라우팅 순서와 무관하게 설정 순서 유지)"""
+        return list(dict.fromkeys(endpoint.model for endpoint in self._get_router().endpoints))
+
+    def _stream_completion(self, client, messages, on_partial, model=None, deadline=None, cancel_event=None, on_first_content=None):
         """
-        GPT 모델을 호출하여 전략 타당성을 검증하고 분석 결과를 반환합니다.
+        스트리밍 모드로 LLM을 호출하여 토큰이 도착하는 대로 JSON을 점진적으로 파싱합니다.
+        'strategy_analysis'의 필드가 하나씩 완성될 때마다 on_partial(부분 결과 딕셔너리)을 호출하고, (전체 JSON 문자열, usage)를 반환합니다.
+        deadline(time.monotonic() 기준)을 넘기거나 cancel_event가 설정되면 스트림을 닫고 중단합니다.
         """
-        if not self.client:
-            return None, None
-        
-        business_sector = strategy_data['business_sector']
-        kpi_instruction = self._get_kpi_instruction(business_sector)
-        
-        # 시스템 프롬프트 구성 (🌟 JSON 구조 강제 지시 및 비판적 검토 지시 추가 🌟)
-        system_prompt = (
-            f"당신은 {business_sector} 비즈니스 전략 전문가입니다. 제공된 '원시 데이터(Raw Data)'를 활용하여 전략 분석을 수행하세요. "
-            "분석 단계: "
-            f"1) 원시 데이터 내용을 기반으로 **{business_sector} 분야에 가장 적합한 핵심 지표** 6가지를 도출하고 **'derived_kpis'** 항목에 JSON 형태로 정리합니다. 이 지표들은 다음의 지침을 따르세요: {kpi_instruction} "
-            f"2) 도출된 KPI를 근거로 **'입력 전략'**의 타당성 점수, 성공 확률, 분석 요약, 대안 전략을 제시합니다. 이때 {strategy_data['target_column']} 컬럼을 **개선 타겟 지표**로 설정하고, 이 지표를 증가/감소시키는 전략이 KPI와 얼마나 부합하는지 중점적으로 분석하세요. "
-            f"특히, 입력된 '전략 목표 기간'({strategy_data['contract_type']})이 단기(Monthly), 중기(Quarterly), 장기(Annual) 중 어디에 해당하는지 판단하고, 전략의 효과와 리스크(예: 고객 이탈, 단기 비용)를 해당 기간의 관점에서 분석하여 타당성과 성공 확률을 평가해야 합니다. "
-            
-            "**[성공 확률 검증 강화] 성공 확률을 평가할 때는, 제공된 '원시 데이터'에서 전략을 직접적으로 뒷받침하거나 혹은 반박하는 구체적인 데이터 패턴(예: 특정 시간대 업로드 시 낮은 성과, 특정 속성을 가진 고객층의 예상치 못한 행동 등)을 반드시 찾아 이를 근거로 점수를 부여해야 합니다. 단순히 일반적인 이론이 아닌, 데이터에 기반한 엄격한 비판적 검토를 수행하고, 모순되는 패턴이 있다면 점수를 낮추고 분석 요약에 그 이유를 명시해야 합니다.**"
-            "**[중요] 최종 결과는 반드시 다음 [출력 형식]에 맞춘 단일 JSON 문자열로 반환해야 합니다. 분석이 어렵더라도 'validity_score'와 'success_probability_percent'는 0 이상의 정수(int)로, 'analysis_summary'는 최소 한 문장으로, 'alternative_strategies'는 최소 1개 이상의 대안을 포함하는 배열로 필수로 채워야 합니다.**"
-            "**[중요] () 안에 들어가있는 예시는 참고용일 뿐, 실제 출력 시 똑같이 따라하지 말고, 해당 비즈니스 분야와 데이터에 맞게 적절히 변형하여 생각하세요.**"
+        parser = IncrementalJsonParser()
+        usage = None
+        stream = client.chat.completions.create(
+            model=model or self.llm_model,
+            response_format={"type": "json_object"},
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=self._remaining_seconds(deadline),
         )
-        
-        # 사용자 프롬프트 구성
-        user_prompt = f"""
-        [원시 데이터 (Raw Data)]
-        {raw_data_input}
-
-        [입력 전략]
-        - 비즈니스 분야: {business_sector}
-        - 개선 타겟 컬럼: {strategy_data['target_column']} 
-        - 핵심 기능: {strategy_data['key_feature']}
-        - 전략 목표 기간: {strategy_data['contract_type']}  
-        - 전략: {strategy_data['ai_strategy']}
-
-        [출력 형식]
-        결과는 반드시 다음 구조를 가진 JSON 문자열로만 반환해야 합니다:
-        {{
-          "derived_kpis": {{
-            "KPI_1_이름": "KPI 1 설명",
-            "KPI_2_이름": "KPI 2 설명",
-            "KPI_3_이름": "KPI 3 설명",
-            "KPI_4_이름": "KPI 4 설명",
-            "KPI_5_이름": "KPI 5 설명",
-            "KPI_6_이름": "KPI 6 설명" 
-          }},
-          "strategy_analysis": {{
-            "validity_score": (int, 0부터 100 사이),
-            "success_probability_percent": (int, 0부터 100 사이),
-            "analysis_summary": (string),
-            "alternative_strategies": [
-              (string: 대안 전략 1),
-              (string: 대안 전략 2)
-            ]
-          }}
-        }}
+        try:
+            for chunk in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise LLMCallCancelled()
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise LLMDeadlineExceeded("LLM 스트리밍 응답이 제한 시간 안에 끝나지 않았습니다.")
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage  # include_usage 사용 시 마지막 청크에만 포함
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if on_first_content is not None and not parser.buffer:
+                    on_first_content()
+                partial_result = parser.feed(delta)
+                if partial_result and isinstance(partial_result.get("strategy_analysis"), dict):
+                    on_partial(partial_result["strategy_analysis"])
+        finally:
+            stream.close()
+        return parser.buffer, usage
+
+    @staticmethod
+    def _remaining_seconds(deadline):
+        """요청 한 번에 줄 시간 제한(초): 전체 deadline까지 남은 시간 (deadline이 없으면 클라이언트 기본값)"""
+        if deadline is None:
+            return None
+        return max(0.001, deadline - time.monotonic())
+
+    def _request_once(self, messages):
+        """
+        LLMCallPolicy가 (재)시도마다 호출할 요청 함수를 만듭니다. (on_partial이 있으면 스트리밍)
+        시도마다 라우터가 고른 엔드포인트로 보내며, 재시도/헤지 요청은 이번 호출에서 아직 시도하지 않은 엔드포인트를 우선합니다.
+        기본 모델(또는 다른 엔드포인트의 설정 모델)로 요청하면 고른 엔드포인트에 설정된 모델을 사용하고, 헤지 대체 모델처럼 다른 모델을 지정하면 그 모델을 사용합니다.
+        반환값: (JSON 문자열, usage, 엔드포인트 이름, 실제로 요청한 모델)
+        """
+        router = self._get_router()
+        primary_models = {self.llm_model, *self._primary_models()}
+        tried = set()
+
+        def request_once(model, deadline, cancel_event, on_partial, on_first_content):
+            endpoint = router.acquire(exclude=tried, deadline=deadline, cancel_event=cancel_event)
+            tried.add(endpoint.name)
+            request_model = endpoint.model if model in primary_models else model
+            # 클라이언트 생성 시간은 엔드포인트 지연에 넣지 않도록 시간 측정 전에 가져옴
+            client = endpoint.client()
+            started_at = time.monotonic()
+            try:
+                if on_partial:
+                    json_string, usage = self._stream_completion(client, messages, on_partial, request_model, deadline, cancel_event, on_first_content)
+                else:
+                    response = client.chat.completions.create(
+                        model=request_model,
+                        response_format={"type": "json_object"},
+                        messages=messages,
+                        timeout=self._remaining_seconds(deadline),
+                    )
+                    json_string, usage = response.choices[0].message.content, response.usage
+            except LLMCallCancelled:
+                router.release(endpoint, outcome="cancelled")
+                raise
+            except Exception as e:
+                import openai
+                # 요청 형식 오류(400)는 엔드포인트 문제가 아니고, 429는 일시적인 부하이므로 회로 차단 대상에서 제외
+                if isinstance(e, openai.BadRequestError):
+                    router.release(endpoint, outcome="bad_request")
+                elif isinstance(e, openai.RateLimitError):
+                    router.release(endpoint, outcome="rate_limited")
+                else:
+                    router.release(endpoint, outcome="error")
+                raise
+            router.release(endpoint, time.monotonic() - started_at)
+            return json_string, usage, endpoint.name, request_model
+        return request_once
+
+    def _build_prompts(self, strategy_data, raw_data_input, data_profile):
+        """
+        시스템 프롬프트와 사용자 프롬프트를 구성합니다. (prompt_templates의 버전 관리되는 템플릿 사용)
+        제공자 프롬프트 캐시가 적용되도록 요청별 값은 사용자 프롬프트 마지막의 [입력 전략]에만 넣습니다.
+        """
+        return build_prompts(strategy_data, raw_data_input, data_profile)
+
+    def _requery_missing_fields(self, messages, validation, model, trace):
         """
-        
+        복구된 응답을 대화에 이어 붙이고 누락된 필드만 다시 요청하여 합친 결과를 반환합니다.
+        원래 메시지를 그대로 앞에 두므로 제공자 프롬프트 캐시가 적용됩니다. (재요청도 실패하면 원래 결과를 그대로 반환)
+        """
+        requery_messages = messages + [
+            {"role": "assistant", "content": validation.to_json()},
+            {"role": "user", "content": build_requery_prompt(validation.missing_fields)},
+        ]
+        try:
+            outcome = self.call_policy.call(self._request_once(requery_messages), model)
+        except Exception as e:
+            print(f"누락 항목 재요청 중 오류가 발생했습니다. 오류: {e}")
+            return validation
+        trace.record_usage(outcome.usage, outcome.model)
+        return validation.merge(validate_response_text(outcome.json_string))
+
+    def run_analysis(self, strategy_data, raw_data_input, data_profile=None, dataset_fingerprint=None, use_cache=True, on_partial=None, trace=None, user_id=None, on_queue=None):
+        """
+        GPT 모델을 호출하여 전략 타당성을 검증하고 분석 결과를 반환합니다.
+        data_profile이 주어지면 전체 파일에 대한 집계 요약을 원시 데이터 샘플과 함께(또는 대신) 프롬프트에 넣습니다.
+        동일한 모델/프롬프트/데이터셋 버전의 결과가 캐시에 있으면 API를 호출하지 않고 바로 반환합니다. (use_cache=False로 우회)
+        on_partial이 주어지면 스트리밍 모드로 호출하여, 완성된 필드가 생길 때마다 부분 결과로 on_partial을 호출합니다.
+        trace(RequestTrace)가 주어지면 프롬프트 구성, LLM 호출, JSON 파싱 단계의 소요 시간과 토큰 사용량을 기록합니다.
+        LLM 호출 전에는 프로세스 전역 허가 관리자의 user_id별 공정 대기열에서 차례를 기다리며, 기다리는 동안 on_queue(대기 순서, 예상 대기 시간)를 호출합니다.
+        """
+        self.last_cache_hit = False
+        if not self.is_configured():
+            return None, None
+
+        trace = trace or RequestTrace(strategy_data['business_sector'])
+        with trace.span("prompt_build"):
+            system_prompt, user_prompt = self._build_prompts(strategy_data, raw_data_input, data_profile)
+        trace.prompt_template_version = PROMPT_TEMPLATE_VERSION
+
+        use_cache = use_cache and AppConfig.RESPONSE_CACHE_ENABLED
+        # 캐시 키에는 실제로 응답한 모델을 넣음 (엔드포인트마다 모델이 다르면 모델별로 따로 저장)
+        # 조회 시에는 라우터가 고를 수 있는 모델 중 어느 것의 결과든 사용
+        primary_models = self._primary_models()
+        if use_cache:
+            cached_json_string = None
+            for cached_model in primary_models:
+                cached_json_string = self.response_cache.get(self.response_cache.make_key(cached_model, system_prompt, user_prompt, dataset_fingerprint))
+                if cached_json_string is not None:
+                    break
+            if cached_json_string is not None:
+                with trace.span("json_parse"):
+                    cached_validation = validate_response_text(cached_json_string)
+                # 형식이 맞지 않는 (검증 도입 이전에 저장된) 캐시 항목은 무시하고 새로 호출
+                if cached_validation.is_complete:
+                    cached_analysis_result = cached_validation.data["strategy_analysis"]
+                    self.last_cache_hit = True
+                    trace.cache_hit = True
+                    if on_partial:
+                        on_partial(cached_analysis_result)
+                    return cached_analysis_result, cached_validation.to_json()
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
         try:
-            response = self.client.chat.completions.create(
-                model=self.llm_model, 
-                response_format={"type": "json_object"}, 
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-            )
-            
-            json_string = response.choices[0].message.content
-            full_analysis_result = json.loads(json_string)
-            analysis_result = full_analysis_result.get("strategy_analysis")
-            
+            # 동시 실행 자리와 토큰 버킷의 추정 토큰(입력 + 예상 출력)이 확보될 때까지 대기
+            estimated_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt) + AppConfig.ADMISSION_EXPECTED_COMPLETION_TOKENS
+            with trace.span("admission_wait"):
+                # 사용자 구분 없는 호출(일괄 실행 등)은 자체 동시 실행 수로 제한되므로 사용자별 대기 요청 한도를 적용하지 않음
+                ticket = self.admission_controller.acquire(user_id or DEFAULT_USER_ID, estimated_tokens, on_queue, limit_queue=user_id is not None)
+            trace.admission_queue_position = ticket.initial_position
+            try:
+                with trace.span("llm_call"):
+                    outcome = self.call_policy.call(self._request_once(messages), self.llm_model, on_partial)
+                trace.record_usage(outcome.usage, outcome.model)
+                trace.record_call_outcome(outcome)
+
+                # 형식 검증 및 로컬 복구 (끊긴 JSON 닫기, 점수 정수 변환/범위 제한 등)
+                with trace.span("json_parse"):
+                    validation = validate_response_text(outcome.json_string)
+                response_validation = "repaired" if validation.repairs else "valid"
+
+                # 로컬에서 복구할 수 없는 필드만 같은 대화에 이어서 다시 요청 (최후 수단)
+                if validation.missing_fields and AppConfig.RESPONSE_REQUERY_ENABLED:
+                    trace.requeried_fields = list(validation.missing_fields)
+                    with trace.span("llm_requery"):
+                        validation = self._requery_missing_fields(messages, validation, outcome.model, trace)
+                    response_validation = "requeried"
+                trace.record_response_validation(response_validation if validation.is_usable else "failed", validation)
+            finally:
+                # 실제 사용 토큰으로 토큰 버킷 보정 (usage를 주지 않는 서버면 추정치 유지)
+                if trace.prompt_tokens is not None:
+                    ticket.record_usage(trace.prompt_tokens + (trace.completion_tokens or 0))
+                self.admission_controller.release(ticket)
+
+            if not validation.is_usable:
+                raise ValueError(f"LLM 응답에 필수 항목이 없습니다: {', '.join(validation.missing_fields)}")
+            analysis_result = validation.data["strategy_analysis"]
+            json_string = validation.to_json() if validation.repairs or response_validation == "requeried" else outcome.json_string
+
+            # 헤지 요청의 대체 모델이 응답한 결과, 일부 항목이 빠진 결과, 로컬 복구나 재요청을 거친 결과(끊긴 응답 등)는 캐시하지 않음
+            # (다음 요청에서 검증을 그대로 통과한 기본 모델 결과를 받을 수 있도록)
+            if response_validation == "valid" and validation.is_complete and AppConfig.RESPONSE_CACHE_ENABLED and outcome.model in primary_models:
+                self.response_cache.put(self.response_cache.make_key(outcome.model, system_prompt, user_prompt, dataset_fingerprint), json_string)
+
             return analysis_result, json_string
 
+        except AdmissionRejected as e:
+            trace.status = "rejected"
+            trace.admission_rejected = e.reason
+            print(f"LLM 호출 허가를 받지 못했습니다. 오류: {e}")
+            return None, None
         except Exception as e:
             # 오류 발생 시 외부로 None 전달
+            trace.status = "error"
+            trace.record_call_failure(e)
             print(f"LLM 분석 중 오류가 발생했습니다. 오류: {e}")
             return None, None
\ No newline at end of file
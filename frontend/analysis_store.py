@@ -0,0 +1,261 @@
+import argparse
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+# config.py에서 설정 정보 로드
+from config import AppConfig, INPUT_FIELDS
+from report_renderer import ReportRenderer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    business_sector TEXT NOT NULL,
+    target_column TEXT NOT NULL,
+    ai_strategy TEXT NOT NULL,
+    key_feature TEXT NOT NULL,
+    contract_type TEXT NOT NULL,
+    validity_score INTEGER,
+    success_probability_percent INTEGER,
+    analysis_result TEXT NOT NULL,
+    raw_json_report TEXT NOT NULL,
+    dataset_fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_sector_target_created ON analyses (business_sector, target_column, created_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses (created_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_validity_score ON analyses (validity_score);
+"""
+
+
+def _to_int(value):
+    """점수 값을 정수로 변환합니다. (변환할 수 없으면 None)"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class AnalysisStore:
+    """
+    분석 결과를 하나의 SQLite(WAL 모드) 파일에 추가 전용으로 저장합니다.
+    쓰기는 백그라운드 스레드가 대기열에서 모아 한 트랜잭션으로 처리하므로 요청 스레드는 디스크를 기다리지 않습니다.
+    """
+    WRITE_BATCH_SIZE = 100  # 한 트랜잭션에 모아 쓰는 최대 기록 수
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._schema_ready = False
+        self._readers = threading.local()  # 스레드별 읽기 연결 (조회마다 새로 연결하는 비용 절약)
+        self.report_renderer = ReportRenderer()
+
+    def _connect(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        if not self._schema_ready:
+            connection.executescript(SCHEMA)
+            # 데이터셋 버전 컬럼이 생기기 전에 만든 저장소 파일은 컬럼을 추가 (기존 기록은 NULL: 버전을 알 수 없어 유사 분석 재사용 대상에서 제외됨)
+            columns = {row["name"] for row in connection.execute("PRAGMA table_info(analyses)")}
+            if "dataset_fingerprint" not in columns:
+                connection.execute("ALTER TABLE analyses ADD COLUMN dataset_fingerprint TEXT")
+            self._schema_ready = True
+        return connection
+
+    def _ensure_writer(self):
+        """첫 저장 요청 시 백그라운드 쓰기 스레드를 시작합니다."""
+        with self._writer_lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._write_loop, name="analysis-store-writer", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        try:
+            connection = self._connect()
+        except (OSError, sqlite3.Error) as e:
+            print(f"분석 기록 저장소를 열 수 없습니다 ({self.db_path}). 오류: {e}")
+            connection = None
+
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            rows = [item for item in batch if item is not None]
+            if rows and connection is not None:
+                try:
+                    with connection:
+                        connection.executemany(
+                            "INSERT INTO analyses (created_at, business_sector, target_column, ai_strategy, key_feature, contract_type,"
+                            " validity_score, success_probability_percent, analysis_result, raw_json_report, dataset_fingerprint)"
+                            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            rows
+                        )
+                except sqlite3.Error as e:
+                    print(f"분석 기록 저장 중 오류가 발생했습니다. ({len(rows)}건) 오류: {e}")
+
+            for _ in batch:
+                self._queue.task_done()
+            if None in batch:  # close()가 넣은 종료 신호
+                if connection is not None:
+                    connection.close()
+                return
+
+    def submit(self, input_data, analysis_result, raw_json_report, dataset_fingerprint=None):
+        """분석 결과를 저장 대기열에 넣고 즉시 반환합니다. dataset_fingerprint는 분석에 사용한 데이터 파일 버전입니다."""
+        row = (
+            datetime.now().isoformat(timespec="microseconds"),
+            *(str(input_data.get(field, "")) for field in INPUT_FIELDS),
+            _to_int(analysis_result.get('validity_score')),
+            _to_int(analysis_result.get('success_probability_percent')),
+            json.dumps(analysis_result, ensure_ascii=False),
+            raw_json_report,
+            dataset_fingerprint,
+        )
+        self._ensure_writer()
+        self._queue.put(row)
+
+    def flush(self):
+        """대기열에 쌓인 기록이 모두 저장될 때까지 기다립니다."""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """남은 기록을 저장하고 쓰기 스레드를 종료합니다."""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def query(self, business_sector=None, target_column=None, start=None, end=None, min_score=None, max_score=None, limit=100):
+        """
+        조건에 맞는 분석 기록을 최신순으로 반환합니다.
+        start/end는 datetime 또는 ISO 형식 문자열(예: '2025-01-31')이며, end는 해당 시각 이전(미포함)까지입니다.
+        """
+        conditions, params = [], []
+        for column, value in (("business_sector", business_sector), ("target_column", target_column)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if start is not None:
+            conditions.append("created_at >= ?")
+            params.append(start.isoformat() if isinstance(start, datetime) else str(start))
+        if end is not None:
+            conditions.append("created_at < ?")
+            params.append(end.isoformat() if isinstance(end, datetime) else str(end))
+        if min_score is not None:
+            conditions.append("validity_score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            conditions.append("validity_score <= ?")
+            params.append(max_score)
+
+        sql = "SELECT * FROM analyses"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        records = self._read(sql, params)
+        for record in records:
+            record["analysis_result"] = json.loads(record["analysis_result"])
+        return records
+
+    def get(self, record_id):
+        """id에 해당하는 분석 기록을 반환합니다. (없으면 None)"""
+        records = self._read("SELECT * FROM analyses WHERE id = ?", (record_id,))
+        if not records:
+            return None
+        records[0]["analysis_result"] = json.loads(records[0]["analysis_result"])
+        return records[0]
+
+    def iter_strategy_texts(self, after_id=0):
+        """id가 after_id보다 큰 기록의 전략 문구와 재사용 범위(분야, 타겟 컬럼, 목표 기간, 데이터셋 버전)를 id 순으로 반환합니다. (유사도 색인의 증분 갱신용)"""
+        return self._read(
+            "SELECT id, business_sector, target_column, contract_type, dataset_fingerprint, ai_strategy, key_feature FROM analyses WHERE id > ? ORDER BY id",
+            (after_id,)
+        )
+
+    def _read(self, sql, params):
+        """읽기 전용 쿼리를 실행하여 dict 목록으로 반환합니다. (WAL 모드이므로 쓰기 스레드를 막지 않음)"""
+        connection = getattr(self._readers, "connection", None)
+        if connection is None:
+            if not os.path.exists(self.db_path):
+                return []
+            connection = self._readers.connection = self._connect()
+        return [dict(row) for row in connection.execute(sql, params)]
+
+    def export(self, records, output_dir):
+        """
+        기록들을 기존 형식('output_dir/YYYYMMDD_HHMMSS_<id>/<분야>.json|txt|csv')으로 내보내고 만든 폴더 목록을 반환합니다.
+        (폴더 이름에 기록 id를 붙여 같은 초에 저장된 분석끼리 겹치지 않도록 함)
+        """
+        exported_dirs = []
+        for record in records:
+            timestamp_folder = datetime.fromisoformat(record["created_at"]).strftime("%Y%m%d_%H%M%S")
+            full_log_dir = os.path.join(output_dir, f"{timestamp_folder}_{record['id']}")
+            file_name_base = record['business_sector'].replace(' ', '_')
+            os.makedirs(full_log_dir, exist_ok=True)
+
+            input_data = {field: record[field] for field in INPUT_FIELDS}
+            report = self.report_renderer.render(input_data, record["analysis_result"], record["raw_json_report"])
+            for extension, content in (("json", report.json_bytes), ("txt", report.txt_bytes), ("csv", report.csv_bytes)):
+                with open(os.path.join(full_log_dir, f"{file_name_base}.{extension}"), 'wb') as f:
+                    f.write(content)
+            exported_dirs.append(full_log_dir)
+        return exported_dirs
+
+
+_shared_analysis_store = AnalysisStore(AppConfig.ANALYSIS_STORE_PATH)
+# 프로세스 종료 시 대기열에 남은 기록까지 저장
+atexit.register(_shared_analysis_store.close)
+
+def get_analysis_store():
+    """프로세스 전역에서 공유되는 분석 기록 저장소를 반환합니다."""
+    return _shared_analysis_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="분석 기록 저장소를 조회하거나 기존 TXT/JSON/CSV 형식으로 내보냅니다.")
+    parser.add_argument("command", choices=["query", "export"], help="query: 조회 결과 출력, export: 파일로 내보내기")
+    parser.add_argument("--db", default=AppConfig.ANALYSIS_STORE_PATH, help="저장소 파일 경로")
+    parser.add_argument("--sector", default=None, help="비즈니스 분야")
+    parser.add_argument("--target", default=None, help="개선 타겟 컬럼")
+    parser.add_argument("--start", default=None, help="시작 일시 (포함, 예: 2025-01-01)")
+    parser.add_argument("--end", default=None, help="종료 일시 (미포함, 예: 2025-02-01)")
+    parser.add_argument("--min-score", type=int, default=None, help="최소 타당성 점수")
+    parser.add_argument("--max-score", type=int, default=None, help="최대 타당성 점수")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--output-dir", default="analysis_exports", help="export 시 파일을 저장할 폴더")
+    args = parser.parse_args()
+
+    store = AnalysisStore(args.db)
+    records = store.query(
+        business_sector=args.sector, target_column=args.target, start=args.start, end=args.end,
+        min_score=args.min_score, max_score=args.max_score, limit=args.limit
+    )
+    if args.command == "query":
+        for record in records:
+            print(f"[{record['id']}] {record['created_at']} {record['business_sector']} / {record['target_column']} "
+                  f"점수 {record['validity_score']} 성공 확률 {record['success_probability_percent']}% - {record['ai_strategy'][:40]}")
+        print(f"총 {len(records)}건")
+    else:
+        exported_dirs = store.export(records, args.output_dir)
+        print(f"{len(exported_dirs)}건을 {args.output_dir} 폴더로 내보냈습니다.")
+
+
+if __name__ == "__main__":
+    main()
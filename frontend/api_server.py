@@ -0,0 +1,434 @@
+import argparse
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# 정의한 모듈 및 클래스 로드
+from data_loader import DataLoader
+from data_profiler import DataProfiler
+from analysis_engine import AnalysisEngine
+from local_analysis_engine import LocalAnalysisEngine
+from prompt_packer import PromptPacker
+from metrics import QUANTILE_WINDOW, RequestTrace, get_metrics_recorder
+from dataset_ingestor import list_ingested_datasets
+from config import AppConfig, INPUT_FIELDS
+
+# 분석 방식: "fallback"(LLM, 실패 시 로컬 통계 분석), "llm"(LLM만), "local"(로컬 통계 분석만)
+API_BACKENDS = ("fallback", "llm", "local")
+
+
+class QueueFullError(Exception):
+    """작업 대기열이 가득 차 새 분석 요청을 받을 수 없을 때 발생합니다. (retry_after: 다시 시도할 때까지의 예상 시간(초))"""
+    def __init__(self, retry_after):
+        super().__init__("분석 작업 대기열이 가득 찼습니다. 잠시 후 다시 시도하세요.")
+        self.retry_after = retry_after
+
+
+class AnalysisService:
+    """
+    DataLoader, DataProfiler, AnalysisEngine, LocalAnalysisEngine을 묶어 Streamlit 없이 분석을 실행합니다.
+    분야별 원시 데이터 샘플과 전체 프로파일은 preload()로 서버 시작 시 한 번 로드하고, 타겟 컬럼별 프롬프트 데이터는 처음 요청될 때 한 번만 만듭니다.
+    여러 작업자 스레드에서 동시에 run()을 호출해도 됩니다.
+    """
+    def __init__(self):
+        self.data_loader = DataLoader()
+        self.data_profiler = DataProfiler(self.data_loader)
+        self.prompt_packer = PromptPacker()
+        self.analysis_engine = AnalysisEngine()
+        self.local_analysis_engine = LocalAnalysisEngine(self.data_profiler)
+        self.metrics_recorder = get_metrics_recorder()
+        for business_sector, sample_path in list_ingested_datasets().items():
+            self.data_loader.register_dataset(business_sector, sample_path)
+        self._datasets = {}     # business_sector -> (raw_data, columns)
+        self._prompt_data = {}  # (business_sector, target_column) -> (프로파일 요약 문자열, 압축된 원시 데이터)
+        self._lock = threading.Lock()
+
+    def business_sectors(self):
+        return list(self.data_loader.BUSINESS_FILE_MAPPING.keys())
+
+    def preload(self):
+        """모든 분야의 데이터셋과 프로파일을 미리 로드하고 분야별 상태("ok" 또는 오류 메시지)를 반환합니다."""
+        status = {}
+        for business_sector in self.business_sectors():
+            raw_data, _ = self._load_dataset(business_sector)
+            if not raw_data.startswith("Error:"):
+                self.data_profiler.load_profile(business_sector)
+            status[business_sector] = raw_data if raw_data.startswith("Error:") else "ok"
+        return status
+
+    def dataset_status(self):
+        """지금까지 로드한 분야별 상태를 반환합니다."""
+        with self._lock:
+            return {business_sector: raw_data if raw_data.startswith("Error:") else "ok" for business_sector, (raw_data, _) in self._datasets.items()}
+
+    def _load_dataset(self, business_sector):
+        """분야별 원시 데이터 샘플을 한 번만 로드합니다. (층화 기준은 batch_runner와 같이 마지막 컬럼)"""
+        with self._lock:
+            if business_sector not in self._datasets:
+                columns, error = self.data_loader.load_columns(business_sector)
+                if error:
+                    self._datasets[business_sector] = (error, None)
+                else:
+                    raw_data, columns, _ = self.data_loader.load_raw_data(
+                        business_sector,
+                        max_lines=self.prompt_packer.candidate_rows(),
+                        sampling_mode=AppConfig.DEFAULT_SAMPLING_MODE,
+                        seed=AppConfig.SAMPLING_SEED,
+                        stratify_column=columns[-1]
+                    )
+                    self._datasets[business_sector] = (raw_data, columns)
+            return self._datasets[business_sector]
+
+    def _load_prompt_data(self, business_sector, target_column, raw_data):
+        """타겟 컬럼별 프로파일 요약과 토큰 예산에 맞게 압축한 원시 데이터를 한 번만 만듭니다."""
+        prompt_key = (business_sector, target_column)
+        with self._lock:
+            if prompt_key in self._prompt_data:
+                return self._prompt_data[prompt_key]
+        data_profile = None
+        if AppConfig.PROMPT_DATA_MODE in ("both", "profile"):
+            data_profile = self.data_profiler.build_digest(business_sector, target_column)
+        raw_data_for_prompt, _ = self.prompt_packer.prepare(raw_data, data_profile)
+        with self._lock:
+            self._prompt_data[prompt_key] = (data_profile, raw_data_for_prompt)
+        return data_profile, raw_data_for_prompt
+
+    def columns(self, business_sector):
+        """(컬럼 목록, None) 또는 실패 시 (None, "Error: ...")를 반환합니다."""
+        return self.data_loader.load_columns(business_sector)
+
+    def run(self, input_data, backend="fallback", use_cache=True, user_id=None):
+        """
+        분석 하나를 실행하고 결과 레코드(status, backend, analysis_result, raw_json_report, timing)를 반환합니다.
+        user_id는 LLM 호출 허가 관리자의 사용자별 공정 대기열에서 요청을 구분하는 데 사용합니다.
+        """
+        trace = RequestTrace(input_data["business_sector"])
+        with trace.span("data_load"):
+            raw_data, columns = self._load_dataset(input_data["business_sector"])
+        if raw_data.startswith("Error:"):
+            return {"status": "error", "error": raw_data}
+        if input_data["target_column"] not in columns:
+            return {"status": "error", "error": f"Error: 타겟 컬럼 '{input_data['target_column']}'이(가) 데이터에 없습니다."}
+
+        analysis_result, raw_json_report, backend_used = None, None, backend
+        if backend != "local":
+            with trace.span("prompt_build"):
+                data_profile, raw_data_for_prompt = self._load_prompt_data(input_data["business_sector"], input_data["target_column"], raw_data)
+            analysis_result, raw_json_report = self.analysis_engine.run_analysis(
+                input_data, raw_data_for_prompt, data_profile,
+                dataset_fingerprint=self.data_loader.get_dataset_fingerprint(input_data["business_sector"]),
+                use_cache=use_cache,
+                trace=trace,
+                user_id=user_id
+            )
+            backend_used = "llm"
+        if not analysis_result and backend in ("fallback", "local"):
+            analysis_result, raw_json_report = self.local_analysis_engine.run_analysis(input_data, trace=trace)
+            backend_used = "local" if backend == "local" else "local_fallback"
+            if analysis_result and backend == "fallback":
+                trace.status = "fallback"
+
+        if not analysis_result:
+            trace.status = "error"
+        self.metrics_recorder.record(trace)
+        record = {"backend": backend_used, "timing": trace.to_dict()}
+        if analysis_result:
+            record.update(status="ok", analysis_result=analysis_result, raw_json_report=raw_json_report)
+        else:
+            record.update(status="error", error="분석에 실패했습니다.")
+        return record
+
+
+class AnalysisJob:
+    """대기열에 들어간 분석 요청 하나의 상태와 결과를 담습니다."""
+    def __init__(self, input_data, backend, use_cache, user_id=None):
+        self.job_id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.input_data = input_data
+        self.backend = backend
+        self.use_cache = use_cache
+        self.status = "queued"  # queued -> running -> ok / error
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.record = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        result = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "input": self.input_data,
+            "backend": self.backend,
+            "queued_seconds": round((self.started_at or time.time()) - self.created_at, 3),
+        }
+        if self.finished_at is not None:
+            result["run_seconds"] = round(self.finished_at - self.started_at, 3)
+        if self.record is not None:
+            result.update(self.record)
+        return result
+
+
+class AnalysisJobQueue:
+    """
+    분석 요청을 크기가 제한된 대기열에 넣고 고정된 수의 작업자 스레드가 순서대로 처리합니다.
+    대기열이 가득 차면 요청을 받지 않고 QueueFullError(예상 대기 시간 포함)를 올려 호출자가 429로 응답하게 합니다.
+    완료된 작업은 최근 retention개까지 메모리에 보관하여 결과를 조회할 수 있습니다.
+    """
+    def __init__(self, service, workers, max_queue_size, retention):
+        self.service = service
+        self.workers = max(1, workers)
+        self.max_queue_size = max(1, max_queue_size)
+        self.retention = max(1, retention)
+        self._queue = queue.Queue(maxsize=self.max_queue_size)
+        self._jobs = OrderedDict()  # job_id -> AnalysisJob (등록 순서)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._running = 0
+        self._job_totals = {}  # 완료 상태 -> 작업 수
+        self._rejected_total = 0
+        self._recent_run_seconds = deque(maxlen=QUANTILE_WINDOW)
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"analysis-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """대기 중인 작업을 마친 뒤 작업자 스레드를 종료합니다."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def retry_after_seconds(self):
+        """최근 작업 실행 시간으로 대기열에 자리가 날 때까지의 예상 시간(초)을 계산합니다."""
+        with self._lock:
+            average = sum(self._recent_run_seconds) / len(self._recent_run_seconds) if self._recent_run_seconds else 1.0
+        return max(1, round(average * (self._queue.qsize() + 1) / self.workers))
+
+    def submit(self, input_data, backend="fallback", use_cache=True, user_id=None):
+        """분석 작업을 대기열에 넣고 AnalysisJob을 반환합니다. (대기열이 가득 차면 QueueFullError)"""
+        job = AnalysisJob(input_data, backend, use_cache, user_id)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._rejected_total += 1
+            raise QueueFullError(self.retry_after_seconds())
+        with self._lock:
+            self._jobs[job.job_id] = job
+            # 보관 한도를 넘으면 오래된 완료 작업부터 삭제 (대기/실행 중인 작업은 유지)
+            for job_id in [job_id for job_id, kept in self._jobs.items() if kept.done.is_set()][:max(0, len(self._jobs) - self.retention)]:
+                del self._jobs[job_id]
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            with self._lock:
+                self._running += 1
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.record = self.service.run(job.input_data, job.backend, job.use_cache, job.user_id)
+            except Exception as e:
+                job.record = {"status": "error", "error": f"Error: {e}"}
+            job.finished_at = time.time()
+            job.status = job.record["status"]
+            with self._lock:
+                self._running -= 1
+                self._job_totals[job.status] = self._job_totals.get(job.status, 0) + 1
+                self._recent_run_seconds.append(job.finished_at - job.started_at)
+            job.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self.max_queue_size,
+                "jobs_kept": len(self._jobs),
+                "jobs_total": dict(self._job_totals),
+                "rejected_total": self._rejected_total,
+            }
+
+    def prometheus_lines(self):
+        """작업 대기열 상태를 Prometheus 텍스트 형식 줄 목록으로 반환합니다."""
+        stats = self.stats()
+        lines = [
+            "# HELP strategy_api_workers Analysis worker threads.",
+            "# TYPE strategy_api_workers gauge",
+            f"strategy_api_workers {stats['workers']}",
+            "# HELP strategy_api_jobs_running Analysis jobs currently running.",
+            "# TYPE strategy_api_jobs_running gauge",
+            f"strategy_api_jobs_running {stats['running']}",
+            "# HELP strategy_api_queue_depth Analysis jobs waiting for a worker.",
+            "# TYPE strategy_api_queue_depth gauge",
+            f"strategy_api_queue_depth {stats['queue_depth']}",
+            "# HELP strategy_api_queue_capacity Maximum number of waiting analysis jobs.",
+            "# TYPE strategy_api_queue_capacity gauge",
+            f"strategy_api_queue_capacity {stats['queue_capacity']}",
+            "# HELP strategy_api_rejected_total Analysis requests rejected with 429 because the queue was full.",
+            "# TYPE strategy_api_rejected_total counter",
+            f"strategy_api_rejected_total {stats['rejected_total']}",
+            "# HELP strategy_api_jobs_total Finished analysis jobs, by status.",
+            "# TYPE strategy_api_jobs_total counter",
+        ]
+        for status, count in stats['jobs_total'].items():
+            lines.append(f'strategy_api_jobs_total{{status="{status}"}} {count}')
+        return lines
+
+
+def _make_handler(service, job_queue):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_body(self, status, body, content_type, headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status, payload, headers=None):
+            self._send_body(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'), "application/json; charset=utf-8", headers)
+
+        def _wait_seconds(self, query):
+            """?wait=초 값을 API_MAX_WAIT_SECONDS 이하로 제한하여 반환합니다."""
+            try:
+                return min(max(0.0, float(query.get("wait", ["0"])[0])), AppConfig.API_MAX_WAIT_SECONDS)
+            except ValueError:
+                return 0.0
+
+        def _send_job(self, job, wait_seconds, created=False):
+            """작업 상태를 응답합니다. wait_seconds 동안 완료를 기다리며, 그때까지 끝나지 않았으면 202로 응답합니다."""
+            if wait_seconds > 0:
+                job.done.wait(wait_seconds)
+            headers = {"Location": f"/analyses/{job.job_id}"} if created else None
+            self._send_json(200 if job.done.is_set() else 202, job.to_dict(), headers)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            parts = [unquote(part) for part in url.path.strip('/').split('/') if part]
+            query = parse_qs(url.query)
+
+            if parts == ["health"]:
+                self._send_json(200, {"status": "ok", "datasets": service.dataset_status(), **job_queue.stats()})
+            elif parts == ["metrics"]:
+                text = service.metrics_recorder.prometheus_text() + "\n".join(job_queue.prometheus_lines()) + "\n"
+                self._send_body(200, text.encode('utf-8'), "text/plain; version=0.0.4; charset=utf-8")
+            elif parts == ["datasets"]:
+                self._send_json(200, {"business_sectors": service.business_sectors()})
+            elif len(parts) == 3 and parts[0] == "datasets" and parts[2] == "columns":
+                columns, error = service.columns(parts[1])
+                if error:
+                    self._send_json(404, {"error": error})
+                else:
+                    self._send_json(200, {"business_sector": parts[1], "columns": columns})
+            elif len(parts) == 2 and parts[0] == "analyses":
+                job = job_queue.get(parts[1])
+                if job is None:
+                    self._send_json(404, {"error": f"Error: 작업 '{parts[1]}'을(를) 찾을 수 없습니다. (완료 후 보관 기간이 지났을 수 있음)"})
+                else:
+                    self._send_job(job, self._wait_seconds(query))
+            else:
+                self._send_json(404, {"error": "Error: 지원하지 않는 경로입니다."})
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            if url.path.rstrip('/') != "/analyses":
+                self._send_json(404, {"error": "Error: 지원하지 않는 경로입니다."})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": "Error: 요청 본문이 올바른 JSON이 아닙니다."})
+                return
+
+            missing_fields = [field for field in INPUT_FIELDS if not request.get(field)]
+            if missing_fields:
+                self._send_json(400, {"error": f"Error: 필수 필드가 없습니다: {', '.join(missing_fields)}"})
+                return
+            backend = request.get("backend") or ("local" if AppConfig.DEFAULT_ANALYSIS_BACKEND == "local" else "fallback")
+            if backend not in API_BACKENDS:
+                self._send_json(400, {"error": f"Error: backend는 {', '.join(API_BACKENDS)} 중 하나여야 합니다."})
+                return
+
+            input_data = {field: str(request[field]).strip() for field in INPUT_FIELDS}
+            try:
+                # 사용자별 공정 대기열의 사용자: X-User-Id 헤더, 없으면 클라이언트 주소
+                user_id = self.headers.get("X-User-Id") or self.client_address[0]
+                job = job_queue.submit(input_data, backend, use_cache=request.get("use_cache", True) is not False, user_id=user_id)
+            except QueueFullError as e:
+                self._send_json(429, {"error": f"Error: {e}", "retry_after_seconds": e.retry_after}, {"Retry-After": str(e.retry_after)})
+                return
+            self._send_job(job, self._wait_seconds(parse_qs(url.query)), created=True)
+
+    return Handler
+
+
+def create_server(service, job_queue, host="127.0.0.1", port=0):
+    """분석 API HTTP 서버를 만듭니다. (serve_forever는 호출자가 실행, port=0이면 임의의 빈 포트)"""
+    httpd = ThreadingHTTPServer((host, port), _make_handler(service, job_queue))
+    httpd.daemon_threads = True
+    return httpd
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="전략 타당성 검증 HTTP API 서버를 실행합니다. "
+                    "(작업 결과는 프로세스 메모리에 보관하므로 여러 서버를 로드 밸런서 뒤에서 실행할 때는 POST /analyses?wait=초 로 결과를 같은 연결에서 받거나 고정 세션을 사용하세요)"
+    )
+    parser.add_argument("--host", default=AppConfig.API_HOST)
+    parser.add_argument("--port", type=int, default=AppConfig.API_PORT)
+    parser.add_argument("--workers", type=int, default=AppConfig.API_WORKERS, help="동시에 실행할 분석 작업 수")
+    parser.add_argument("--queue-size", type=int, default=AppConfig.API_QUEUE_MAX_SIZE, help="실행 대기 중인 작업의 최대 수 (초과 시 429)")
+    parser.add_argument("--no-preload", action="store_true", help="시작 시 데이터셋을 미리 로드하지 않음 (첫 요청 시 로드)")
+    args = parser.parse_args()
+
+    if not AppConfig.OPENAI_API_KEY and not AppConfig.LLM_ENDPOINTS:
+        print("OpenAI API Key가 설정되지 않아 backend=local 또는 로컬 통계 분석 대체 결과만 제공합니다.")
+
+    service = AnalysisService()
+    if not args.no_preload:
+        started_at = time.perf_counter()
+        for business_sector, status in service.preload().items():
+            print(f"[데이터셋] {business_sector}: {status}")
+        print(f"데이터셋 로드 완료 ({time.perf_counter() - started_at:.2f}초)")
+
+    job_queue = AnalysisJobQueue(service, args.workers, args.queue_size, AppConfig.API_JOB_RETENTION).start()
+    httpd = create_server(service, job_queue, args.host, args.port)
+    print(f"분석 API 서버 실행 중: http://{args.host}:{args.port} (작업자 {job_queue.workers}개, 대기열 {job_queue.max_queue_size}개)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        job_queue.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,19 @@
+import uuid
 import streamlit as st
-import time
-import json 
-import os   
-from datetime import datetime 
 
 # 정의한 모듈 및 클래스 로드
 from data_loader import DataLoader
+from data_profiler import DataProfiler
+from prompt_packer import PromptPacker
+from metrics import RequestTrace, get_metrics_recorder, start_metrics_server
+from llm_client import get_client_manager
+from analysis_store import get_analysis_store
+from similarity_index import PLACEHOLDER_PREFIX, get_similarity_index
+from report_renderer import get_report_renderer
+from dataset_ingestor import DatasetIngestor, UPLOADED_SECTOR_PREFIX, list_ingested_datasets
 from analysis_engine import AnalysisEngine
-from config import AppConfig
+from local_analysis_engine import LocalAnalysisEngine
+from config import AppConfig, INPUT_FIELDS
 
 # ----------------------------------------------------
 # 📌 0. 전역 설정 및 세션 상태 초기화
@@ -27,20 +33,52 @@ def initialize_session_state():
         st.session_state['input_data'] = None
         st.session_state['file_name_for_display'] = None
         st.session_state['output_format'] = "텍스트 파일 (TXT)" 
+        st.session_state['prompt_data_stats'] = None
+        st.session_state['request_trace'] = None
+        st.session_state['similar_match'] = None
+        st.session_state['similar_suggestion'] = None
+        st.session_state['analysis_backend'] = None
+        # LLM 호출 허가 대기열에서 사용자를 구분하는 세션별 ID (같은 사용자의 요청끼리만 순서대로 대기)
+        st.session_state['user_id'] = uuid.uuid4().hex
 
 # ----------------------------------------------------
 # 📌 1. Streamlit 앱 클래스 (View & Controller)
 # ----------------------------------------------------
 class StreamlitAppView:
+    # 화면 표시용 샘플링 방식 이름 -> DataLoader.load_raw_data의 sampling_mode 값
+    SAMPLING_MODE_LABELS = {
+        "층화 샘플링 (기준 컬럼 비율 유지)": "stratified",
+        "무작위 샘플링 (전체 균등)": "reservoir",
+        "앞부분 샘플링 (파일 상위 행)": "head",
+    }
+    # 화면 표시용 분석 방식 이름 -> AppConfig.DEFAULT_ANALYSIS_BACKEND 값
+    ANALYSIS_BACKEND_LABELS = {
+        "LLM 분석 (실패 시 로컬 통계 분석으로 대체)": "fallback",
+        "로컬 통계 사전 검토 후 LLM 분석": "prescreen",
+        "로컬 통계 분석만 (LLM 호출 없음, 즉시 결과)": "local",
+    }
+
     def __init__(self):
         self.data_loader = DataLoader()
+        self.data_profiler = DataProfiler(self.data_loader)
+        self.prompt_packer = PromptPacker()
+        self.metrics_recorder = get_metrics_recorder()
+        self.analysis_store = get_analysis_store()
+        self.similarity_index = get_similarity_index()
+        self.report_renderer = get_report_renderer()
+        start_metrics_server(AppConfig.METRICS_PORT)
         self.analysis_engine = AnalysisEngine()
-        self.BUSINESS_FILE_MAPPING = AppConfig.BUSINESS_FILE_MAPPING
+        self.local_analysis_engine = LocalAnalysisEngine(self.data_profiler)
+        self.dataset_ingestor = DatasetIngestor()
+        # 업로드 처리된 데이터셋도 비즈니스 분야 목록에 추가
+        for business_sector, sample_path in list_ingested_datasets().items():
+            self.data_loader.register_dataset(business_sector, sample_path)
+        self.BUSINESS_FILE_MAPPING = self.data_loader.BUSINESS_FILE_MAPPING
         
         initialize_session_state()
 
-        if not AppConfig.OPENAI_API_KEY:
-            st.error("🚨 OpenAI API Key가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.")
+        if not self.analysis_engine.is_configured():
+            st.error("🚨 OpenAI API Key가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요. (키 없이는 로컬 통계 분석만 사용할 수 있습니다)")
 
     def run(self):
         """앱의 메인 실행 흐름을 정의합니다."""
@@ -49,6 +87,10 @@ class StreamlitAppView:
 
         col_input, col_result = st.columns([1, 2])
 
+        # LLM 호출 대기 순서/예상 대기 시간과 스트리밍 중인 분석 결과를 결과 영역 맨 위에 표시하기 위한 자리
+        self.queue_status_placeholder = col_result.empty()
+        self.result_stream_placeholder = col_result.empty()
+
         with col_input:
             self._render_input_form()
 
@@ -59,6 +101,8 @@ class StreamlitAppView:
     def _render_input_form(self):
         """전략 입력 폼을 렌더링합니다."""
         st.header("1. 전략 입력")
+
+        self._render_upload_section()
         
         current_business_sector = st.selectbox(
             "비즈니스 분야", 
@@ -66,13 +110,13 @@ class StreamlitAppView:
             key="sector_select"
         )
         
-        # 데이터 로더를 통해 컬럼 목록 로드
-        raw_data_on_load, column_list, _ = self.data_loader.load_raw_data(current_business_sector)
+        # 데이터 로더를 통해 컬럼 목록 로드 (헤더 한 줄만 읽으므로 데이터셋 전체 로드/파싱 없이 폼을 바로 표시)
+        column_list, load_error = self.data_loader.load_columns(current_business_sector)
         
         # 오류 처리 로직 (컬럼 로드 실패 시)
-        is_load_error = column_list is None or not column_list or "Error:" in column_list[0]
+        is_load_error = not column_list
         if is_load_error:
-            error_detail = raw_data_on_load.replace("Error: ", "") if raw_data_on_load.startswith("Error:") else (column_list[0].replace("Error: ", "") if column_list else "알 수 없는 오류")
+            error_detail = load_error.replace("Error: ", "") if load_error else "알 수 없는 오류"
             target_columns = ["컬럼 로드 실패 (파일 확인 필요)", "Error"]
             st.error(f"컬럼 로드 오류: {error_detail}")
         else:
@@ -88,8 +132,8 @@ class StreamlitAppView:
             )
             
             # 🌟 Placeholder 텍스트 변수 정의 🌟
-            strategy_placeholder = f"예시: {target_column}을(를) 높이기 위해 30일 이내 해지 고객에게 맞춤형 쿠폰을 발송합니다."
-            key_feature_placeholder = "예시: AI 기반 이탈 예측 모델을 활용하여 이탈 징후 고객을 실시간 식별 및 자동화된 마케팅 캠페인 실행"
+            strategy_placeholder = f"{PLACEHOLDER_PREFIX} {target_column}을(를) 높이기 위해 30일 이내 해지 고객에게 맞춤형 쿠폰을 발송합니다."
+            key_feature_placeholder = f"{PLACEHOLDER_PREFIX} AI 기반 이탈 예측 모델을 활용하여 이탈 징후 고객을 실시간 식별 및 자동화된 마케팅 캠페인 실행"
             
             ai_strategy = st.text_input(
                 "AI 추천 핵심 전략", 
@@ -105,20 +149,83 @@ class StreamlitAppView:
             
             contract_type = st.selectbox("전략 목표 기간", ["Monthly", "Quarterly", "Annual"])
 
+            # 🌟 원시 데이터 샘플링 방식 (앞부분만 사용하면 정렬된 파일에서 표본이 편향됨) 🌟
+            sampling_labels = list(self.SAMPLING_MODE_LABELS.keys())
+            sampling_modes = list(self.SAMPLING_MODE_LABELS.values())
+            sampling_label = st.selectbox(
+                "원시 데이터 샘플링 방식",
+                sampling_labels,
+                index=sampling_modes.index(AppConfig.DEFAULT_SAMPLING_MODE) if AppConfig.DEFAULT_SAMPLING_MODE in sampling_modes else 0
+            )
+            sampling_mode = self.SAMPLING_MODE_LABELS[sampling_label]
+
+            # 층화 기준 컬럼: 보통 마지막 컬럼이 결과 지표(예: Churn)이므로 기본값으로 사용
+            stratify_column = st.selectbox(
+                "층화 기준 컬럼 (층화 샘플링 시 사용)",
+                target_columns,
+                index=len(target_columns) - 1
+            )
+
+            # 🌟 분석 방식: LLM 호출 없이 전체 데이터 집계로 바로 계산하는 로컬 통계 분석을 사전 검토/대체용으로 선택 🌟
+            backend_labels = list(self.ANALYSIS_BACKEND_LABELS.keys())
+            backend_values = list(self.ANALYSIS_BACKEND_LABELS.values())
+            backend_label = st.selectbox(
+                "분석 방식",
+                backend_labels,
+                index=backend_values.index(AppConfig.DEFAULT_ANALYSIS_BACKEND) if AppConfig.DEFAULT_ANALYSIS_BACKEND in backend_values else 0
+            )
+            analysis_backend = self.ANALYSIS_BACKEND_LABELS[backend_label]
+
+            bypass_cache = st.checkbox("저장된 분석 결과(캐시)를 사용하지 않고 새로 분석", value=False)
+            skip_similar = st.checkbox("유사한 과거 분석이 있어도 새로 분석", value=False)
+
             st.caption(f"※ 분석 시 LLM은 **{target_column}** 컬럼을 개선 대상으로 가정하고 타당성을 검증합니다.")
             
             submit_button = st.form_submit_button("🚀 전략 타당성 검증 시작")
-            
-            if submit_button:
-                self._handle_submit(current_business_sector, target_column, ai_strategy, key_feature, contract_type, strategy_placeholder, key_feature_placeholder)
-
-    def _handle_submit(self, business_sector, target_column, ai_strategy, key_feature, contract_type, strategy_placeholder, key_feature_placeholder):
+            # 결과 영역의 '새로 분석 실행' 버튼을 누른 경우 같은 입력값으로 유사 결과 재사용 없이 다시 실행
+            fresh_analysis_requested = st.session_state.pop('fresh_analysis_requested', False)
+
+            if submit_button or fresh_analysis_requested:
+                self._handle_submit(current_business_sector, target_column, ai_strategy, key_feature, contract_type, strategy_placeholder, key_feature_placeholder, sampling_mode, stratify_column, bypass_cache, skip_similar or fresh_analysis_requested, analysis_backend)
+
+    def _render_upload_section(self):
+        """대용량 CSV 업로드 및 청크 단위 처리(표본 추출 + 컬럼 통계)를 렌더링합니다."""
+        with st.expander("📂 고객 데이터 업로드 (CSV/TSV)"):
+            uploaded_file = st.file_uploader("분석할 데이터 파일", type=["csv", "tsv", "txt"], key="dataset_upload")
+            if uploaded_file is None or not st.button("업로드 데이터 처리", key="ingest_button"):
+                return
+
+            progress_bar = st.progress(0.0, text="데이터를 청크 단위로 처리하는 중...")
+            last_percent = [-1]
+
+            def on_progress(bytes_read, total_bytes):
+                # 진행률이 1% 이상 바뀔 때만 화면 갱신
+                percent = int(bytes_read / total_bytes * 100) if total_bytes else 0
+                if percent > last_percent[0]:
+                    last_percent[0] = percent
+                    progress_bar.progress(min(percent, 100) / 100, text=f"데이터 처리 중... {percent}% ({bytes_read / 1024 / 1024:,.1f} MB)")
+
+            try:
+                metadata = self.dataset_ingestor.ingest(uploaded_file, uploaded_file.name, uploaded_file.size, on_progress=on_progress)
+            except Exception as e:
+                st.error(f"업로드 데이터 처리 실패: {e}")
+                return
+
+            business_sector = f"{UPLOADED_SECTOR_PREFIX}{metadata['name']}"
+            self.data_loader.register_dataset(business_sector, metadata['sample_file'])
+            # 아래 비즈니스 분야 선택 상자에서 방금 처리한 데이터셋을 선택
+            st.session_state['sector_select'] = business_sector
+            progress_bar.progress(1.0, text="처리 완료")
+            st.success(f"✅ {metadata['row_count']:,}행 처리 완료 (표본 {metadata['sample_rows']:,}행, 구분자 {metadata['delimiter']!r}, 인코딩 {metadata['encoding']})")
+
+    def _handle_submit(self, business_sector, target_column, ai_strategy, key_feature, contract_type, strategy_placeholder, key_feature_placeholder, sampling_mode="head", stratify_column=None, bypass_cache=False, skip_similar=False, analysis_backend="fallback"):
         """폼 제출 시 분석을 실행하고 결과를 세션 상태에 저장하고, 로그를 저장합니다."""
         
-        if not AppConfig.OPENAI_API_KEY:
-            return
+        if not self.analysis_engine.is_configured() and analysis_backend != "local":
+            st.warning("OpenAI API Key가 없어 로컬 통계 분석으로 진행합니다.")
+            analysis_backend = "local"
 
-        with st.spinner(f"'{business_sector}' 분야 원시 데이터를 로드하고 LLM이 분석 중입니다..."):
+        with st.spinner(f"'{business_sector}' 분야 원시 데이터를 로드하고 {'로컬 통계로' if analysis_backend == 'local' else 'LLM이'} 분석 중입니다..."):
             
             # 🌟 입력값 검증 및 기본값 설정: 빈 값일 경우 placeholder 사용 🌟
             final_ai_strategy = ai_strategy if ai_strategy else strategy_placeholder
@@ -131,125 +238,310 @@ class StreamlitAppView:
                 "key_feature": final_key_feature, 
                 "contract_type": contract_type
             }
-            
-            raw_data, _, file_name_for_display = self.data_loader.load_raw_data(input_data['business_sector'])
+
+            # 🌟 문구만 조금 다른 과거 분석이 있으면 LLM 호출 전에 과거 결과를 볼지 먼저 묻기 (예시 문구가 아닌 사용자가 입력한 문구로만 비교) 🌟
+            st.session_state['similar_match'] = None
+            st.session_state['similar_suggestion'] = None
+            if analysis_backend != "local" and AppConfig.SIMILARITY_REUSE_ENABLED and not skip_similar and self._suggest_similar_analysis(input_data, ai_strategy, key_feature):
+                return
+
+            # 🌟 요청 단계별 소요 시간 및 토큰 사용량 기록 🌟
+            trace = RequestTrace(business_sector)
+            if analysis_backend == "local":
+                self._run_local_analysis(input_data, trace)
+                return
+
+            with trace.span("data_load"):
+                raw_data, _, file_name_for_display = self.data_loader.load_raw_data(
+                    input_data['business_sector'],
+                    max_lines=self.prompt_packer.candidate_rows(),
+                    sampling_mode=sampling_mode,
+                    seed=AppConfig.SAMPLING_SEED,
+                    stratify_column=stratify_column
+                )
             
             if raw_data.startswith("Error:") or target_column in ["컬럼 로드 실패 (파일 확인 필요)", "Error"]:
                 st.error(f"데이터 또는 컬럼 로드 오류로 인해 분석을 시작할 수 없습니다. 오류: {raw_data.replace('Error: ', '')}")
                 st.session_state['analysis_ran'] = False
             else:
-                # AnalysisEngine 호출
-                analysis_result_temp, raw_json_report_temp = self.analysis_engine.run_analysis(input_data, raw_data)
-                time.sleep(1) 
-                
-                if analysis_result_temp:
+                # 🌟 전체 파일 프로파일(파일 버전별 캐시) 및 프롬프트 데이터 구성 🌟
+                with trace.span("prompt_build"):
+                    data_profile = None
+                    if AppConfig.PROMPT_DATA_MODE in ("both", "profile"):
+                        data_profile = self.data_profiler.build_digest(business_sector, target_column)
+                    # 토큰 예산에 맞게 원시 데이터 압축 (식별자 컬럼 제거, 범주형 값 코드화)
+                    raw_data_for_prompt, prompt_data_stats = self.prompt_packer.prepare(raw_data, data_profile)
+
+                # AnalysisEngine 호출 (스트리밍 모드에서는 완성된 필드부터 결과 영역에 바로 표시)
+                on_partial = None
+                if AppConfig.STREAMING_ENABLED:
+                    on_partial = lambda partial_result: self._render_partial_result(input_data, partial_result)
+                # 사전 검토: LLM 응답을 기다리는 동안 로컬 통계 분석 결과를 먼저 표시 (LLM 실패 시 그대로 대체 결과로 사용)
+                local_result = None
+                if analysis_backend == "prescreen":
+                    local_result = self.local_analysis_engine.run_analysis(
+                        input_data, trace=trace,
+                        on_partial=lambda partial_result: self._render_partial_result(input_data, partial_result, "📊 로컬 통계 사전 검토 결과입니다. LLM 분석이 끝나면 교체됩니다.")
+                    )
+                dataset_fingerprint = self.data_loader.get_dataset_fingerprint(business_sector)
+                analysis_result_temp, raw_json_report_temp = self.analysis_engine.run_analysis(
+                    input_data,
+                    raw_data_for_prompt,
+                    data_profile,
+                    dataset_fingerprint=dataset_fingerprint,
+                    use_cache=not bypass_cache,
+                    on_partial=on_partial,
+                    trace=trace,
+                    user_id=st.session_state.get('user_id'),
+                    on_queue=self._render_queue_status
+                )
+                # 최종 결과는 _render_result_section에서 다시 그리므로 대기 상태/스트리밍 영역은 비움
+                self.queue_status_placeholder.empty()
+                self.result_stream_placeholder.empty()
+                if self.analysis_engine.last_cache_hit:
+                    st.toast("⚡ 동일한 요청의 저장된 분석 결과를 불러왔습니다. (LLM 호출 생략)", icon="⚡")
+
+                analysis_backend_used = "llm"
+                if not analysis_result_temp:
+                    # LLM 호출이 실패하면 로컬 통계 분석 결과로 대체
+                    if local_result is None or local_result[0] is None:
+                        local_result = self.local_analysis_engine.run_analysis(input_data, trace=trace)
+                    analysis_result_temp, raw_json_report_temp = local_result
+                    analysis_backend_used = "local_fallback"
+                    if analysis_result_temp:
+                        trace.status = "fallback"
+                        if trace.admission_rejected:
+                            st.warning("분석 요청이 많아 LLM 분석 차례를 기다리지 못했습니다. 로컬 통계 분석 결과를 표시하며, 잠시 후 다시 시도할 수 있습니다.")
+                        else:
+                            st.warning("LLM 분석에 실패하여 로컬 통계 분석 결과를 표시합니다. API 키 또는 네트워크 상태를 확인하세요.")
+
+                if analysis_result_temp and analysis_backend_used == "llm":
                     # 🌟🌟🌟 자동 로컬 디렉토리 저장 로직 시작 🌟🌟🌟
-                    self._save_analysis_log(input_data, analysis_result_temp, raw_json_report_temp)
+                    with trace.span("log_write"):
+                        self._save_analysis_log(input_data, analysis_result_temp, raw_json_report_temp, dataset_fingerprint)
                     # 🌟🌟🌟 자동 로컬 디렉토리 저장 로직 끝 🌟🌟🌟
 
+                if analysis_result_temp:
                     # 결과 세션 상태에 저장
                     st.session_state['analysis_ran'] = True
                     st.session_state['analysis_result'] = analysis_result_temp
                     st.session_state['raw_json_report'] = raw_json_report_temp
                     st.session_state['input_data'] = input_data
                     st.session_state['file_name_for_display'] = file_name_for_display
+                    st.session_state['prompt_data_stats'] = prompt_data_stats
+                    st.session_state['analysis_backend'] = analysis_backend_used
                 else:
+                    trace.status = "error"
                     st.session_state['analysis_ran'] = False
                     st.error("LLM 분석에 실패했습니다. API 키 또는 네트워크 상태를 확인하세요.")
 
+                self.metrics_recorder.record(trace)
+                st.session_state['request_trace'] = trace.to_dict()
 
-    def _save_analysis_log(self, input_data, analysis_result, raw_json_report):
+    def _run_local_analysis(self, input_data, trace):
         """
-        분석 결과를 'analysis_logs/YYYYMMDD_HHMMSS' 폴더에 저장합니다.
+        LLM 호출 없이 로컬 통계 분석만 실행하여 결과를 세션 상태에 저장합니다.
+        원시 데이터 샘플/프롬프트 구성이 필요 없고, 근거가 데이터 집계뿐이므로 유사 분석 재사용 대상(분석 기록 저장소)에는 저장하지 않습니다.
         """
-        # 1. 파일 이름 및 폴더 이름 생성
-        timestamp_folder = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_name_base = input_data['business_sector'].replace(' ', '_')
-        
-        # 2. 로그 디렉토리 경로 설정
-        base_log_dir = "analysis_logs"
-        full_log_dir = os.path.join(base_log_dir, timestamp_folder)
-        
-        # 3. 폴더 생성 (analysis_logs와 날짜/시간 폴더 모두 없으면 생성)
-        try:
-            os.makedirs(full_log_dir, exist_ok=True) 
-        except Exception as e:
-            st.error(f"로그 디렉토리 생성 실패 ({full_log_dir}): {e}")
+        if input_data['target_column'] in ["컬럼 로드 실패 (파일 확인 필요)", "Error"]:
+            st.error("컬럼 로드 오류로 인해 분석을 시작할 수 없습니다.")
+            st.session_state['analysis_ran'] = False
             return
-        
-        # LLM 분석 결과에서 안전하게 값 추출 (로그 파일 생성을 위해)
-        validity_score_dl = analysis_result.get('validity_score', 'N/A')
-        success_probability_dl = analysis_result.get('success_probability_percent', 'N/A')
-        alternative_strategies_list = analysis_result.get('alternative_strategies', ['N/A'])
-        alt_1_dl = alternative_strategies_list[0] if len(alternative_strategies_list) > 0 else 'N/A'
-        alt_2_dl = alternative_strategies_list[1] if len(alternative_strategies_list) > 1 else 'N/A'
-        analysis_summary_dl = analysis_result.get('analysis_summary', '분석 요약 정보를 불러오지 못했습니다.')
 
+        analysis_result_temp, raw_json_report_temp = self.local_analysis_engine.run_analysis(input_data, trace=trace)
+        if analysis_result_temp:
+            st.session_state['analysis_ran'] = True
+            st.session_state['analysis_result'] = analysis_result_temp
+            st.session_state['raw_json_report'] = raw_json_report_temp
+            st.session_state['input_data'] = input_data
+            st.session_state['file_name_for_display'] = self.BUSINESS_FILE_MAPPING.get(input_data['business_sector'])
+            st.session_state['prompt_data_stats'] = None
+            st.session_state['analysis_backend'] = "local"
+        else:
+            st.session_state['analysis_ran'] = False
+            st.error("로컬 통계 분석에 실패했습니다. 데이터 파일과 타겟 컬럼을 확인하세요.")
 
-        # --- 4. JSON 파일 저장 ---
-        try:
-            json_file_path = os.path.join(full_log_dir, f"{file_name_base}.json")
-            with open(json_file_path, 'w', encoding='utf-8') as f:
-                f.write(raw_json_report)
-        except Exception as e:
-            st.error(f"JSON 로그 저장 실패: {e}")
-
-        # --- 5. TXT 파일 저장 ---
-        text_report = f"""
-[AI 비즈니스 전략 타당성 검증 리포트 - {input_data['business_sector']}]
-
---- 입력 정보 ---
-비즈니스 분야: {input_data['business_sector']}
-개선 타겟 컬럼: {input_data['target_column']} 
-AI 추천 핵심 전략: {input_data['ai_strategy']}
-핵심 기능 요약: {input_data['key_feature']}
-전략 목표 기간: {input_data['contract_type']} 
---- 분석 결과 ---
-타당성 점수: {validity_score_dl}점
-예상 성공 확률: {success_probability_dl}%
-
-[요약]
-{analysis_summary_dl}
-
-[대안 전략]
-- {alt_1_dl}
-- {alt_2_dl}
-"""
-        try:
-            txt_file_path = os.path.join(full_log_dir, f"{file_name_base}.txt")
-            with open(txt_file_path, 'w', encoding='utf-8') as f:
-                f.write(text_report.strip())
-        except Exception as e:
-            st.error(f"TXT 로그 저장 실패: {e}")
-
-        # --- 6. CSV 파일 저장 ---
-        csv_data = f"""
-지표,값
-비즈니스 분야, "{input_data['business_sector']}"
-개선 타겟 컬럼, "{input_data['target_column']}"
-AI 추천 핵심 전략, "{input_data['ai_strategy']}"
-핵심 기능 요약, "{input_data['key_feature']}"
-전략 목표 기간, {input_data['contract_type']}
-타당성 점수, {validity_score_dl}
-성공 확률, {success_probability_dl}
-대안 1, "{alt_1_dl}"
-대안 2, "{alt_2_dl}"
-"""
+        self.metrics_recorder.record(trace)
+        st.session_state['request_trace'] = trace.to_dict()
+
+    def _suggest_similar_analysis(self, input_data, ai_strategy, key_feature):
+        """
+        같은 분야/타겟 컬럼/목표 기간/데이터셋 버전의 유사한 과거 분석이 있으면 결과 영역에 재사용 제안을 띄웁니다. 제안했으면 True를 반환합니다.
+        ai_strategy/key_feature는 예시 문구로 채우기 전의 사용자 입력입니다. (전략을 비워 두었으면 비교하지 않음)
+        """
+        matches = self.similarity_index.find_similar(
+            input_data['business_sector'], input_data['target_column'], input_data['contract_type'],
+            self.data_loader.get_dataset_fingerprint(input_data['business_sector']),
+            ai_strategy, key_feature
+        )
+        if not matches:
+            return False
+        similarity, record_id = matches[0]
+        record = self.analysis_store.get(record_id)
+        if record is None:
+            return False
+
+        st.session_state['analysis_ran'] = False
+        st.session_state['similar_suggestion'] = {
+            "record_id": record_id,
+            "similarity": similarity,
+            "created_at": record['created_at'],
+            "ai_strategy": record['ai_strategy'],
+            "key_feature": record['key_feature'],
+        }
+        return True
+
+    def _render_similar_suggestion(self):
+        """유사한 과거 분석이 있을 때 과거 결과를 볼지, 새로 분석할지 선택하게 합니다."""
+        suggestion = st.session_state.get('similar_suggestion')
+        if not suggestion:
+            return False
+        st.info(
+            f"♻️ 입력한 전략과 비슷한 과거 분석이 있습니다. (유사도 {suggestion['similarity']:.0%}, {suggestion['created_at'][:16].replace('T', ' ')} 분석)\n\n"
+            f"- 과거 전략: {suggestion['ai_strategy']}\n"
+            f"- 과거 핵심 기능: {suggestion['key_feature']}\n\n"
+            "같은 전략이면 과거 결과를 바로 볼 수 있고, 다른 전략이면 새로 분석하세요."
+        )
+        col_reuse, col_fresh = st.columns(2)
+        with col_reuse:
+            if st.button("♻️ 과거 분석 결과 보기", key="reuse_similar_button"):
+                st.session_state['similar_suggestion'] = None
+                self._reuse_similar_analysis(suggestion['record_id'], suggestion['similarity'])
+                st.rerun()
+        with col_fresh:
+            if st.button("🔄 새로 분석 실행", key="skip_similar_button"):
+                st.session_state['similar_suggestion'] = None
+                st.session_state['fresh_analysis_requested'] = True
+                st.rerun()
+        return True
+
+    def _reuse_similar_analysis(self, record_id, similarity):
+        """
+        사용자가 재사용을 선택한 과거 분석 결과를 세션 상태에 채웁니다. 재사용했으면 True를 반환합니다.
+        보고서와 다운로드가 실제 분석 내용과 맞도록 입력값도 새 입력이 아닌 과거 분석의 입력값으로 채웁니다.
+        """
+        record = self.analysis_store.get(record_id)
+        if record is None:
+            return False
+
+        st.session_state['analysis_ran'] = True
+        st.session_state['analysis_result'] = record['analysis_result']
+        st.session_state['raw_json_report'] = record['raw_json_report']
+        st.session_state['input_data'] = {field: record[field] for field in INPUT_FIELDS}
+        st.session_state['file_name_for_display'] = self.BUSINESS_FILE_MAPPING.get(record['business_sector'])
+        st.session_state['prompt_data_stats'] = None
+        st.session_state['request_trace'] = None
+        st.session_state['analysis_backend'] = "llm"
+        st.session_state['similar_match'] = {
+            "similarity": similarity,
+            "created_at": record['created_at'],
+            "ai_strategy": record['ai_strategy'],
+            "key_feature": record['key_feature'],
+        }
+        return True
+
+    def _render_similar_match(self):
+        """재사용한 과거 분석의 출처를 표시하고, 새로 분석할 수 있는 버튼을 제공합니다."""
+        similar_match = st.session_state.get('similar_match')
+        if not similar_match:
+            return
+        st.info(
+            f"♻️ 유사한 과거 분석 결과를 표시합니다. (유사도 {similar_match['similarity']:.0%}, {similar_match['created_at'][:16].replace('T', ' ')} 분석)\n\n"
+            f"- 과거 전략: {similar_match['ai_strategy']}\n"
+            f"- 과거 핵심 기능: {similar_match['key_feature']}"
+        )
+        if st.button("🔄 새로 분석 실행", key="fresh_analysis_button"):
+            st.session_state['fresh_analysis_requested'] = True
+            st.rerun()
+
+    def _render_request_timing(self):
+        """마지막 요청의 단계별 소요 시간과 토큰 사용량을 표시합니다."""
+        request_trace = st.session_state.get('request_trace')
+        if not request_trace:
+            return
+        with st.expander(f"⏱ 요청 처리 시간: 총 {request_trace['total_ms'] / 1000:.2f}초"):
+            stage_names = {
+                "data_load": "데이터 로드",
+                "prompt_build": "프롬프트 구성",
+                "llm_call": "LLM 호출",
+                "json_parse": "JSON 파싱",
+                "log_write": "로그 저장",
+                "local_analysis": "로컬 통계 분석",
+                "llm_requery": "누락 항목 재요청",
+                "admission_wait": "LLM 호출 대기열",
+            }
+            for stage, elapsed_ms in request_trace['stages_ms'].items():
+                st.markdown(f"- {stage_names.get(stage, stage)}: {elapsed_ms:,.1f} ms")
+            if request_trace['cache_hit']:
+                st.caption("캐시 적중으로 LLM 호출을 생략했습니다.")
+            elif request_trace['prompt_tokens'] is not None:
+                cached_note = f" (프롬프트 캐시 {request_trace['cached_prompt_tokens']:,} 토큰)" if request_trace.get('cached_prompt_tokens') else ""
+                endpoint_note = f" ({request_trace['llm_endpoint']})" if request_trace.get('llm_endpoint') and AppConfig.LLM_ENDPOINTS else ""
+                st.caption(f"모델 {request_trace['model']}{endpoint_note} · 입력 {request_trace['prompt_tokens']:,} 토큰{cached_note} · 출력 {request_trace['completion_tokens']:,} 토큰")
+            if request_trace.get('llm_attempts', 0) > 1 or request_trace.get('hedged'):
+                hedge_note = f" · 헤지 요청 {'응답 사용' if request_trace['hedge_won'] else '전송 (기본 요청 응답 사용)'}" if request_trace['hedged'] else ""
+                st.caption(f"LLM 요청 {request_trace['llm_attempts']}회 (일시 오류 재시도 포함){hedge_note}")
+            admission_wait_ms = request_trace['stages_ms'].get('admission_wait', 0)
+            if admission_wait_ms >= 100:
+                st.caption(f"다른 요청이 많아 LLM 호출 대기열 {request_trace['admission_queue_position'] + 1}번째에서 {admission_wait_ms / 1000:.1f}초 기다린 뒤 실행했습니다.")
+            if request_trace.get('response_validation') in ("repaired", "requeried"):
+                repair_note = f"형식 복구 {len(request_trace['response_repairs'])}건" if request_trace['response_repairs'] else ""
+                requery_note = f"누락 항목 재요청 ({', '.join(request_trace['requeried_fields'])})" if request_trace['requeried_fields'] else ""
+                st.caption("LLM 응답 보정: " + " · ".join(note for note in (repair_note, requery_note) if note))
+            llm_percentiles = self.metrics_recorder.stage_percentiles("llm_call")
+            if llm_percentiles:
+                st.caption("최근 LLM 호출 시간: " + " · ".join(f"P{int(quantile * 100)} {seconds:.2f}초" for quantile, seconds in llm_percentiles.items()))
+            pool_stats = get_client_manager().stats()
+            if pool_stats['clients']:
+                st.caption(f"LLM 연결 풀: 열린 연결 {pool_stats['open_connections']}개 (유휴 {pool_stats['idle_connections']}개, 최대 {pool_stats['max_connections']}개) · 누적 HTTP 요청 {pool_stats['requests']:,}건")
+
+    def _render_queue_status(self, position, estimated_wait):
+        """LLM 호출 차례를 기다리는 동안 대기 순서와 예상 대기 시간을 표시합니다."""
+        wait_text = f"예상 대기 약 {estimated_wait:.0f}초" if estimated_wait is not None else "예상 대기 시간 계산 중"
+        self.queue_status_placeholder.info(f"⏳ 분석 요청이 많아 LLM 호출 차례를 기다리고 있습니다. 대기 순서 {position + 1}번째 · {wait_text}")
+
+    def _render_partial_result(self, input_data, partial_result, status_message="⏳ LLM이 분석 결과를 작성하는 중입니다. 완성된 항목부터 표시됩니다."):
+        """스트리밍 도중 지금까지 완성된 필드만으로 결과 영역을 갱신합니다."""
+        with self.result_stream_placeholder.container():
+            st.header("2. 분석 결과")
+            st.info(status_message)
+
+            col1, col2 = st.columns(2)
+            with col1:
+                validity_score = partial_result.get('validity_score')
+                st.metric(label="타당성 점수 (100점 만점)", value=f"{validity_score} 점" if validity_score is not None else "...")
+            with col2:
+                success_probability = partial_result.get('success_probability_percent')
+                st.metric(label="예상 성공 확률", value=f"{success_probability} %" if success_probability is not None else "...")
+
+            if 'analysis_summary' in partial_result:
+                st.subheader("분석 요약")
+                st.info(partial_result['analysis_summary'])
+
+            alternative_strategies = partial_result.get('alternative_strategies') or []
+            if alternative_strategies:
+                st.subheader(f"대안 전략 (타겟 컬럼 '{input_data['target_column']}' 개선 관점)")
+                for i, alt in enumerate(alternative_strategies):
+                    st.markdown(f"**대안 {i+1}:** {alt}")
+
+    def _save_analysis_log(self, input_data, analysis_result, raw_json_report, dataset_fingerprint=None):
+        """
+        분석 결과를 분석 기록 저장소(analysis_logs/analysis_store.db)의 저장 대기열에 넣습니다.
+        실제 쓰기는 백그라운드 스레드가 처리하며, 기존 TXT/JSON/CSV 파일은 'python analysis_store.py export'로 내보낼 수 있습니다.
+        """
         try:
-            csv_file_path = os.path.join(full_log_dir, f"{file_name_base}.csv")
-            with open(csv_file_path, 'w', encoding='utf-8') as f:
-                f.write(csv_data.strip())
-            
-            # 저장 성공 시 Streamlit Toast 알림
-            st.toast(f"✅ 분석 결과가 analysis_logs/{timestamp_folder}/{file_name_base}.* 파일로 저장되었습니다.", icon="💾")
+            self.analysis_store.submit(input_data, analysis_result, raw_json_report, dataset_fingerprint)
+            st.toast(f"✅ 분석 결과가 {AppConfig.ANALYSIS_STORE_PATH}에 저장됩니다.", icon="💾")
         except Exception as e:
-            st.error(f"CSV 로그 저장 실패: {e}")
+            st.error(f"분석 기록 저장 실패: {e}")
 
     # 📌 필수 메서드: _render_result_section 
     def _render_result_section(self):
         """분석 결과 및 다운로드 섹션을 렌더링합니다."""
         st.header("2. 분석 결과")
-        
+
+        if self._render_similar_suggestion():
+            return
         if st.session_state['analysis_ran']:
             # 세션 상태에서 데이터 언팩
             analysis_result = st.session_state['analysis_result']
@@ -258,6 +550,15 @@ AI 추천 핵심 전략, "{input_data['ai_strategy']}"
             file_name_for_display = st.session_state['file_name_for_display']
 
             st.success("✅ 전략 검증 완료! (원시 데이터 기반 동적 분석)")
+            self._render_similar_match()
+            if st.session_state.get('analysis_backend') in ("local", "local_fallback"):
+                st.caption("📊 LLM 없이 전체 데이터의 세그먼트별 타겟 평균과 상관 분석으로 계산한 로컬 통계 분석 결과입니다.")
+            cache_stats = self.analysis_engine.response_cache.stats()
+            st.caption(f"LLM 응답 캐시: 적중 {cache_stats['hits']}회 / 미적중 {cache_stats['misses']}회")
+            prompt_data_stats = st.session_state.get('prompt_data_stats')
+            if prompt_data_stats:
+                st.caption(f"프롬프트 데이터: 원시 행 {prompt_data_stats['row_count']}개, 추정 {prompt_data_stats['estimated_tokens']} 토큰 (프로파일 {prompt_data_stats['profile_tokens']} 토큰)")
+            self._render_request_timing()
 
             # 🌟 키가 누락될 경우를 대비해 .get() 사용 (KeyError 방지) 🌟
             validity_score = analysis_result.get('validity_score', 'N/A')
@@ -296,10 +597,10 @@ AI 추천 핵심 전략, "{input_data['ai_strategy']}"
             # 다운로드 섹션 렌더링
             self._render_download_section(analysis_result, input_data, raw_json_report)
                 
-        elif AppConfig.OPENAI_API_KEY:
+        elif self.analysis_engine.is_configured():
             st.info("왼쪽에서 전략을 입력하고 '전략 타당성 검증 시작' 버튼을 눌러주세요.")
         else:
-            st.warning("분석을 시작하려면 OpenAI API Key를 설정해야 합니다.")
+            st.warning("OpenAI API Key가 없어 로컬 통계 분석만 사용할 수 있습니다. LLM 분석을 사용하려면 API Key를 설정해야 합니다.")
 
     # 📌 필수 메서드: _render_download_section 
     def _render_download_section(self, analysis_result, input_data, raw_json_report):
@@ -314,71 +615,33 @@ AI 추천 핵심 전략, "{input_data['ai_strategy']}"
         
         output_format = st.session_state['output_format']
 
-        # LLM 분석 결과에서 안전하게 값 추출 (다운로드 시에도 적용)
-        validity_score_dl = analysis_result.get('validity_score', 'N/A')
-        success_probability_dl = analysis_result.get('success_probability_percent', 'N/A')
-        alternative_strategies_list = analysis_result.get('alternative_strategies', ['N/A'])
-        alt_1_dl = alternative_strategies_list[0] if len(alternative_strategies_list) > 0 else 'N/A'
-        alt_2_dl = alternative_strategies_list[1] if len(alternative_strategies_list) > 1 else 'N/A'
-        analysis_summary_dl = analysis_result.get('analysis_summary', '분석 요약 정보를 불러오지 못했습니다.')
+        # 보고서는 분석 결과당 한 번만 렌더링되므로 형식을 바꾸는 rerun에서는 저장된 바이트를 재사용
+        report = self.report_renderer.render(input_data, analysis_result, raw_json_report)
+        json_file, txt_file, csv_file = report.files()
 
         # 1. JSON 파일 다운로드
         if output_format == "리포트 (JSON 파일)":
-            st.download_button(
-                label="JSON 파일 다운로드 (KPI + 전략)",
-                data=raw_json_report,
-                file_name=f"strategy_report_{input_data['business_sector']}.json",
-                mime="application/json"
-            )
-        
+            file_name, data, mime = json_file
+            label = "JSON 파일 다운로드 (KPI + 전략)"
         # 2. 텍스트 파일 (TXT) 다운로드: 모든 입력값 포함
         elif output_format == "텍스트 파일 (TXT)":
-            text_report = f"""
-[AI 비즈니스 전략 타당성 검증 리포트 - {input_data['business_sector']}]
-
---- 입력 정보 ---
-비즈니스 분야: {input_data['business_sector']}
-개선 타겟 컬럼: {input_data['target_column']} 
-AI 추천 핵심 전략: {input_data['ai_strategy']}
-핵심 기능 요약: {input_data['key_feature']}
-전략 목표 기간: {input_data['contract_type']} 
---- 분석 결과 ---
-타당성 점수: {validity_score_dl}점
-예상 성공 확률: {success_probability_dl}%
-
-[요약]
-{analysis_summary_dl}
-
-[대안 전략]
-- {alt_1_dl}
-- {alt_2_dl}
-"""
-            st.download_button(
-                label="텍스트 파일 다운로드",
-                data=text_report,
-                file_name=f"strategy_report_{input_data['business_sector']}.txt",
-                mime="text/plain"
-            )
-        
+            file_name, data, mime = txt_file
+            label = "텍스트 파일 다운로드"
         # 3. 엑셀 파일 (CSV 형식) 다운로드: 모든 입력값 포함
-        elif output_format == "엑셀 파일 (CSV 형식)":
-            csv_data = f"""
-지표,값
-비즈니스 분야, "{input_data['business_sector']}"
-개선 타겟 컬럼, "{input_data['target_column']}"
-AI 추천 핵심 전략, "{input_data['ai_strategy']}"
-핵심 기능 요약, "{input_data['key_feature']}"
-전략 목표 기간, {input_data['contract_type']}
-타당성 점수, {validity_score_dl}
-성공 확률, {success_probability_dl}
-대안 1, "{alt_1_dl}"
-대안 2, "{alt_2_dl}"
-"""
+        else:
+            file_name, data, mime = csv_file
+            label = "CSV 파일 다운로드"
+
+        col_single, col_bundle = st.columns(2)
+        with col_single:
+            st.download_button(label=label, data=data, file_name=file_name, mime=mime)
+        with col_bundle:
+            # zip 묶음은 버튼을 눌렀을 때만 만듦
             st.download_button(
-                label="CSV 파일 다운로드",
-                data=csv_data,
-                file_name=f"strategy_summary_{input_data['business_sector']}.csv",
-                mime="text/csv"
+                label="전체 묶음 다운로드 (ZIP)",
+                data=report.bundle_file,
+                file_name=report.bundle_file_name,
+                mime="application/zip"
             )
 
 # ----------------------------------------------------
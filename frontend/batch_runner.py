@@ -0,0 +1,234 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# 정의한 모듈 및 클래스 로드
+from data_loader import DataLoader
+from data_profiler import DataProfiler
+from analysis_engine import AnalysisEngine
+from local_analysis_engine import LocalAnalysisEngine
+from prompt_packer import PromptPacker
+from metrics import RequestTrace, get_metrics_recorder
+from config import AppConfig, INPUT_FIELDS
+
+
+class RateLimiter:
+    """
+    여러 스레드에서 호출해도 요청 시작 간격이 최소 60/requests_per_minute초가 되도록 보장합니다.
+    """
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_start)
+            self._next_start = start_at + self.interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+
+class BatchRunner:
+    """
+    CSV/JSONL 파일의 전략 목록을 DataLoader와 AnalysisEngine으로 동시에 검증하고 결과를 JSONL로 기록합니다.
+    (이미 결과 파일에 성공으로 기록된 작업은 건너뛰므로 중단 후 다시 실행하면 이어서 처리합니다.)
+    local=True이면 LLM 대신 LocalAnalysisEngine(로컬 통계 분석)으로 검증합니다.
+    """
+    def __init__(self, concurrency=4, requests_per_minute=0, sampling_mode=None, stratify_column=None, use_cache=True, local=False):
+        self.data_loader = DataLoader()
+        self.data_profiler = DataProfiler(self.data_loader)
+        self.local = local
+        self.analysis_engine = LocalAnalysisEngine(self.data_profiler) if local else AnalysisEngine()
+        self.prompt_packer = PromptPacker()
+        self.metrics_recorder = get_metrics_recorder()
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.sampling_mode = sampling_mode or AppConfig.DEFAULT_SAMPLING_MODE
+        self.stratify_column = stratify_column
+        self.use_cache = use_cache
+        self._datasets = {}  # business_sector -> (raw_data, columns, dataset_fingerprint)
+        self._profiles = {}  # (business_sector, target_column) -> (프로파일 요약 문자열, 압축된 원시 데이터)
+
+    @staticmethod
+    def read_jobs(input_path):
+        """CSV 또는 JSONL 파일에서 전략 목록을 읽습니다. job_id가 없으면 입력값의 해시로 만듭니다."""
+        if input_path.endswith(".jsonl"):
+            with open(input_path, 'r', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f if line.strip()]
+        else:
+            with open(input_path, 'r', encoding='utf-8-sig', newline='') as f:
+                records = list(csv.DictReader(f))
+
+        jobs = []
+        for line_number, record in enumerate(records, start=1):
+            missing_fields = [field for field in INPUT_FIELDS if not record.get(field)]
+            if missing_fields:
+                print(f"[건너뜀] {line_number}번째 전략에 필수 필드가 없습니다: {', '.join(missing_fields)}")
+                continue
+            input_data = {field: str(record[field]).strip() for field in INPUT_FIELDS}
+            job_id = record.get("job_id") or hashlib.sha1(json.dumps(input_data, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+            jobs.append((str(job_id), input_data))
+        return jobs
+
+    @staticmethod
+    def read_completed_job_ids(output_path):
+        """결과 파일에서 이미 성공한 작업의 job_id를 읽습니다."""
+        completed = set()
+        if not os.path.exists(output_path):
+            return completed
+        with open(output_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 중단 시 마지막 줄이 잘렸을 수 있음
+                if record.get("status") == "ok":
+                    completed.add(record.get("job_id"))
+        return completed
+
+    def _prepare_datasets(self, jobs):
+        """작업에 필요한 데이터셋과 프로파일을 분야/타겟별로 한 번씩만 로드하여 모든 작업이 공유합니다."""
+        for _, input_data in jobs:
+            business_sector = input_data["business_sector"]
+            if business_sector not in self._datasets:
+                # 층화 기준 컬럼을 정하는 데는 헤더만 필요 (오류면 아래 load_raw_data가 같은 오류 메시지를 반환)
+                columns, _ = self.data_loader.load_columns(business_sector)
+                stratify_column = self.stratify_column or (columns[-1] if columns else None)
+                raw_data, columns, _ = self.data_loader.load_raw_data(
+                    business_sector,
+                    max_lines=self.prompt_packer.candidate_rows(),
+                    sampling_mode=self.sampling_mode,
+                    seed=AppConfig.SAMPLING_SEED,
+                    stratify_column=stratify_column
+                )
+                self._datasets[business_sector] = (raw_data, columns, self.data_loader.get_dataset_fingerprint(business_sector))
+
+            profile_key = (business_sector, input_data["target_column"])
+            if profile_key not in self._profiles and self.local:
+                self._profiles[profile_key] = (None, None)  # 로컬 분석은 프롬프트를 만들지 않음
+            elif profile_key not in self._profiles:
+                data_profile = None
+                raw_data = self._datasets[business_sector][0]
+                if AppConfig.PROMPT_DATA_MODE in ("both", "profile") and not raw_data.startswith("Error:"):
+                    data_profile = self.data_profiler.build_digest(*profile_key)
+                raw_data_for_prompt, _ = self.prompt_packer.prepare(raw_data, data_profile)
+                self._profiles[profile_key] = (data_profile, raw_data_for_prompt)
+
+    def _run_job(self, job_id, input_data):
+        """전략 하나를 분석하고 결과 레코드를 반환합니다."""
+        raw_data, columns, dataset_fingerprint = self._datasets[input_data["business_sector"]]
+        record = {"job_id": job_id, "input": input_data}
+
+        if raw_data.startswith("Error:"):
+            record.update(status="error", error=raw_data)
+            return record
+        if input_data["target_column"] not in columns:
+            record.update(status="error", error=f"Error: 타겟 컬럼 '{input_data['target_column']}'이(가) 데이터에 없습니다.")
+            return record
+
+        data_profile, raw_data_for_prompt = self._profiles[(input_data["business_sector"], input_data["target_column"])]
+
+        self.rate_limiter.wait()
+        trace = RequestTrace(input_data["business_sector"])
+        analysis_result, raw_json_report = self.analysis_engine.run_analysis(
+            input_data, raw_data_for_prompt, data_profile,
+            dataset_fingerprint=dataset_fingerprint,
+            use_cache=self.use_cache,
+            trace=trace
+        )
+        if not analysis_result:
+            trace.status = "error"
+        self.metrics_recorder.record(trace)
+        record["elapsed_seconds"] = round(trace.total_seconds(), 3)
+        record["timing"] = trace.to_dict()
+
+        if analysis_result:
+            record.update(status="ok", analysis_result=analysis_result, raw_json_report=raw_json_report)
+        else:
+            record.update(status="error", error="로컬 통계 분석에 실패했습니다." if self.local else "LLM 분석에 실패했습니다.")
+        return record
+
+    def run(self, input_path, output_path):
+        """입력 파일의 전략을 동시에 분석하고, 완료되는 순서대로 결과 파일에 추가합니다."""
+        jobs = self.read_jobs(input_path)
+        completed_job_ids = self.read_completed_job_ids(output_path)
+        pending_jobs = [(job_id, input_data) for job_id, input_data in jobs if job_id not in completed_job_ids]
+        print(f"전체 {len(jobs)}건 중 완료 {len(jobs) - len(pending_jobs)}건, 이번 실행 {len(pending_jobs)}건")
+        if not pending_jobs:
+            return {"total": len(jobs), "processed": 0, "succeeded": 0, "failed": 0, "elapsed_seconds": 0.0, "jobs_per_second": 0.0}
+
+        self._prepare_datasets(pending_jobs)
+
+        succeeded = failed = 0
+        started_at = time.perf_counter()
+        with open(output_path, 'a', encoding='utf-8') as output_file, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(self._run_job, job_id, input_data): job_id for job_id, input_data in pending_jobs}
+            for future in as_completed(futures):
+                try:
+                    record = future.result()
+                except Exception as e:
+                    record = {"job_id": futures[future], "status": "error", "error": f"Error: {e}"}
+
+                # 완료 즉시 기록하여 중단되어도 끝난 작업은 보존
+                output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output_file.flush()
+
+                if record["status"] == "ok":
+                    succeeded += 1
+                else:
+                    failed += 1
+                processed = succeeded + failed
+                print(f"[{processed}/{len(pending_jobs)}] {record['job_id']} {record['status']}")
+
+        elapsed_seconds = time.perf_counter() - started_at
+        summary = {
+            "total": len(jobs),
+            "processed": succeeded + failed,
+            "succeeded": succeeded,
+            "failed": failed,
+            "elapsed_seconds": round(elapsed_seconds, 3),
+            "jobs_per_second": round((succeeded + failed) / elapsed_seconds, 3) if elapsed_seconds > 0 else 0.0,
+        }
+        print(f"처리량: {summary['processed']}건 / {summary['elapsed_seconds']}초 = {summary['jobs_per_second']}건/초 (성공 {succeeded}, 실패 {failed})")
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="전략 목록(CSV/JSONL)을 일괄로 타당성 검증합니다.")
+    parser.add_argument("input_path", help="전략 목록 파일 (.csv 또는 .jsonl, 필드: " + ", ".join(INPUT_FIELDS) + ", 선택: job_id)")
+    parser.add_argument("--output", default="batch_results.jsonl", help="결과를 추가할 JSONL 파일 (재실행 시 이어서 처리)")
+    parser.add_argument("--concurrency", type=int, default=AppConfig.BATCH_CONCURRENCY, help="동시에 실행할 LLM 호출 수")
+    parser.add_argument("--rate-limit", type=float, default=AppConfig.BATCH_REQUESTS_PER_MINUTE, help="분당 최대 요청 수 (0이면 제한 없음)")
+    parser.add_argument("--sampling-mode", choices=["head", "reservoir", "stratified"], default=None, help="원시 데이터 샘플링 방식")
+    parser.add_argument("--stratify-column", default=None, help="층화 샘플링 기준 컬럼 (기본값: 마지막 컬럼)")
+    parser.add_argument("--no-cache", action="store_true", help="저장된 LLM 응답 캐시를 사용하지 않음")
+    parser.add_argument("--local", action="store_true", help="LLM 없이 로컬 통계 분석으로 검증 (API Key 불필요)")
+    args = parser.parse_args()
+
+    if not AppConfig.OPENAI_API_KEY and not AppConfig.LLM_ENDPOINTS and not args.local:
+        print("OpenAI API Key가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.")
+        return
+
+    runner = BatchRunner(
+        concurrency=args.concurrency,
+        requests_per_minute=args.rate_limit,
+        sampling_mode=args.sampling_mode,
+        stratify_column=args.stratify_column,
+        use_cache=not args.no_cache,
+        local=args.local
+    )
+    runner.run(args.input_path, args.output)
+
+
+if __name__ == "__main__":
+    main()
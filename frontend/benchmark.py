@@ -0,0 +1,544 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# 정의한 모듈 및 클래스 로드
+from data_loader import DataLoader
+from data_profiler import DataProfiler
+from analysis_engine import AnalysisEngine
+from llm_call_policy import LLMCallPolicy
+from llm_router import EndpointRouter, LLMEndpoint
+from metrics import RequestTrace
+from prompt_packer import PromptPacker
+from prompt_templates import PROMPT_TEMPLATE_VERSION
+from response_cache import ResponseCache
+from columnar_store import ColumnarSidecar
+from fake_openai_server import FakeOpenAIServer
+from synthetic_data import SyntheticDataGenerator, example_file_path
+from config import AppConfig
+
+# 첫 화면 표시 전에 로드되면 안 되는 무거운 의존성 (실제 사용 시점까지 import를 미룸)
+HEAVY_MODULES = ("openai", "pandas", "numpy")
+
+# 새 프로세스에서 Streamlit import와 app.py 첫 실행(입력 폼 렌더링, Streamlit 서버 없이 실행) 시간을 재는 스크립트
+COLD_START_SCRIPT = """
+import json, logging, sys, time
+started_at = time.perf_counter()
+import streamlit
+streamlit_loaded_at = time.perf_counter()
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+import app
+finished_at = time.perf_counter()
+print(json.dumps({
+    "streamlit_import": streamlit_loaded_at - started_at,
+    "app_first_run": finished_at - streamlit_loaded_at,
+    "loaded_modules": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+# 꼬리 지연 벤치마크에서 헤지 요청에 쓰는 (가짜 서버에서 더 빠르게 응답하는) 대체 모델 이름
+TAIL_HEDGE_MODEL = "benchmark-fast"
+# 응답 검증 벤치마크에서 형식 오류(끊긴 JSON, 문자열/범위 밖 점수, 필드 누락)가 있는 응답 비율
+MALFORMED_RATE = 0.3
+# 엔드포인트 라우팅 벤치마크의 동시 요청 수
+ROUTING_CONCURRENCY = 4
+
+SAMPLE_STRATEGY = {
+    "business_sector": "benchmark",
+    "target_column": "Churn",
+    "ai_strategy": "이탈 위험 고객에게 30일 이내 맞춤형 쿠폰을 발송합니다.",
+    "key_feature": "AI 기반 이탈 예측 모델로 이탈 징후 고객을 식별하고 자동 캠페인을 실행합니다.",
+    "contract_type": "Monthly",
+}
+
+
+def summarize(timings):
+    """측정값 목록(초)을 요약 통계(밀리초)로 변환합니다."""
+    ordered = sorted(timings)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    p99_index = min(len(ordered) - 1, int(round(0.99 * (len(ordered) - 1))))
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[p95_index] * 1000, 3),
+        "p99_ms": round(ordered[p99_index] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def measure(function, iterations, before_each=None):
+    """function을 iterations번 실행하여 각 실행 시간을 잰 뒤 요약 통계를 반환합니다."""
+    timings = []
+    for _ in range(iterations):
+        if before_each:
+            before_each()
+        started_at = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started_at)
+    return summarize(timings)
+
+
+class BenchmarkSuite:
+    """
+    데이터 로드, 프로파일/프롬프트 구성, LLM 호출(로컬 가짜 서버), JSON 파싱, 로그 저장까지 단계별 소요 시간을 측정합니다.
+    """
+    def __init__(self, work_dir, row_counts, iterations, llm_iterations, server_options):
+        self.work_dir = work_dir
+        self.row_counts = row_counts
+        self.iterations = iterations
+        self.llm_iterations = llm_iterations
+        self.server_options = server_options
+
+    def _make_data_loader(self, file_name):
+        data_loader = DataLoader()
+        data_loader.BASE_DATA_DIR = self.work_dir
+        data_loader.BUSINESS_FILE_MAPPING = {"benchmark": file_name}
+        return data_loader
+
+    def bench_data_stages(self, file_name):
+        """한 데이터 파일에 대해 로드/샘플링/프로파일/압축 단계를 측정합니다."""
+        data_loader = self._make_data_loader(file_name)
+        data_profiler = DataProfiler(data_loader)
+        prompt_packer = PromptPacker()
+        results = {}
+
+        results["load_raw_data_cold"] = measure(
+            lambda: data_loader.load_raw_data("benchmark"), self.iterations,
+            before_each=data_loader.dataset_cache.clear
+        )
+        results["sidecar_build"] = measure(lambda: ColumnarSidecar.build(data_loader.get_file_path("benchmark")), self.iterations)
+        results["load_raw_data_warm"] = measure(lambda: data_loader.load_raw_data("benchmark"), self.iterations)
+        results["sample_stratified"] = measure(
+            lambda: data_loader.load_raw_data(
+                "benchmark", max_lines=prompt_packer.candidate_rows(), sampling_mode="stratified",
+                seed=AppConfig.SAMPLING_SEED, stratify_column="Churn"
+            ),
+            self.iterations
+        )
+        results["profile_cold"] = measure(
+            lambda: data_profiler.build_digest("benchmark", "Churn"), self.iterations,
+            before_each=data_profiler.profile_cache.clear
+        )
+        results["profile_warm"] = measure(lambda: data_profiler.build_digest("benchmark", "Churn"), self.iterations)
+
+        raw_data, _, _ = data_loader.load_raw_data("benchmark", max_lines=prompt_packer.candidate_rows())
+        data_profile = data_profiler.build_digest("benchmark", "Churn")
+        results["prompt_packing"] = measure(lambda: prompt_packer.prepare(raw_data, data_profile), self.iterations)
+
+        # 다음 파일 측정에 메모리를 넘기지 않도록 정리
+        data_loader.dataset_cache.clear()
+        data_profiler.profile_cache.clear()
+        return results
+
+    def bench_llm_stages(self, file_name):
+        """로컬 가짜 서버를 대상으로 run_analysis(일반/스트리밍/캐시 적중)와 JSON 파싱을 측정합니다."""
+        data_loader = self._make_data_loader(file_name)
+        data_profiler = DataProfiler(data_loader)
+        prompt_packer = PromptPacker()
+        raw_data, _, _ = data_loader.load_raw_data("benchmark", max_lines=prompt_packer.candidate_rows())
+        data_profile = data_profiler.build_digest("benchmark", "Churn")
+        raw_data_for_prompt, prompt_data_stats = prompt_packer.prepare(raw_data, data_profile)
+
+        server = FakeOpenAIServer(**self.server_options).start()
+        try:
+            analysis_engine = AnalysisEngine()
+            analysis_engine.api_key = "benchmark"
+            analysis_engine.base_url = server.base_url
+            analysis_engine.response_cache = ResponseCache(os.path.join(self.work_dir, "llm_cache"), 3600, 50 * 1024 * 1024)
+
+            run = lambda **kwargs: analysis_engine.run_analysis(SAMPLE_STRATEGY, raw_data_for_prompt, data_profile, dataset_fingerprint="benchmark", **kwargs)
+            first_partial_timings = []
+
+            def run_streaming():
+                started_at = time.perf_counter()
+                first_partial = []
+                def on_partial(partial_result):
+                    if not first_partial:
+                        first_partial.append(time.perf_counter() - started_at)
+                run(use_cache=False, on_partial=on_partial)
+                if first_partial:
+                    first_partial_timings.append(first_partial[0])
+
+            results = {
+                "prompt_data": prompt_data_stats,
+                "run_analysis": measure(lambda: run(use_cache=False), self.llm_iterations),
+                "run_analysis_streaming": measure(run_streaming, self.llm_iterations),
+                "run_analysis_cache_hit": measure(lambda: run(use_cache=True), self.llm_iterations),
+            }
+            if first_partial_timings:
+                results["streaming_first_partial"] = summarize(first_partial_timings)
+
+            json_string = server.build_content()
+            results["json_parse"] = measure(lambda: json.loads(json_string), self.iterations * 10)
+            results["fake_server"] = {"requests": server.request_count, "errors": server.error_count}
+            return results, json_string
+        finally:
+            server.stop()
+
+    def bench_tail_latency(self):
+        """
+        일부 요청이 느리거나(10%, 기본 지연의 10배) 429/500으로 실패하는(각 5%) 가짜 서버에서
+        재시도 없음 / 백오프 재시도 / 재시도 + 헤지 요청 설정별 run_analysis 지연 분포(P50/P95/P99)와 실패 수를 비교합니다.
+        """
+        latency = max(self.server_options["latency"], 0.01)
+        server_options = dict(
+            self.server_options, slow_rate=0.1, slow_latency=latency * 10, rate_limit_rate=0.05, error_rate=0.05,
+            model_latencies={TAIL_HEDGE_MODEL: latency / 2}
+        )
+        deadline = latency * 30
+        policies = {
+            "no_retry": LLMCallPolicy(deadline, 1, 0.1, 2.0, seed=42),
+            "retry_backoff": LLMCallPolicy(deadline, 3, 0.1, 2.0, seed=42),
+            "retry_hedge": LLMCallPolicy(deadline, 3, 0.1, 2.0, hedge_enabled=True, hedge_delay=latency * 2, hedge_model=TAIL_HEDGE_MODEL, seed=42),
+        }
+        results = {}
+        for name, policy in policies.items():
+            # 설정마다 같은 시드의 새 서버를 사용하여 같은 순서의 느린 요청/오류를 재현
+            server = FakeOpenAIServer(**server_options).start()
+            try:
+                analysis_engine = AnalysisEngine()
+                analysis_engine.api_key = "benchmark"
+                analysis_engine.base_url = server.base_url
+                analysis_engine.call_policy = policy
+                timings, failures, attempts, hedged = [], 0, 0, 0
+                for _ in range(self.llm_iterations * 3):
+                    trace = RequestTrace("benchmark")
+                    started_at = time.perf_counter()
+                    analysis_result, _ = analysis_engine.run_analysis(SAMPLE_STRATEGY, "", use_cache=False, trace=trace)
+                    timings.append(time.perf_counter() - started_at)
+                    failures += analysis_result is None
+                    attempts += trace.llm_attempts
+                    hedged += trace.hedged
+                results[name] = dict(summarize(timings), failures=failures, llm_attempts=attempts, hedged=hedged)
+            finally:
+                server.stop()
+        return results
+
+    def bench_prompt_cache(self, file_name):
+        """
+        같은 데이터셋/타겟 컬럼에 전략 문구와 목표 기간만 다른 요청을 보내, 가짜 서버의 프롬프트 캐시(앞부분 일치) 흉내로
+        입력 토큰 중 캐시된 비율(usage.prompt_tokens_details.cached_tokens)을 측정합니다.
+        """
+        data_loader = self._make_data_loader(file_name)
+        data_profiler = DataProfiler(data_loader)
+        prompt_packer = PromptPacker()
+        raw_data, _, _ = data_loader.load_raw_data("benchmark", max_lines=prompt_packer.candidate_rows())
+        data_profile = data_profiler.build_digest("benchmark", "Churn")
+        raw_data_for_prompt, _ = prompt_packer.prepare(raw_data, data_profile)
+
+        server = FakeOpenAIServer(**self.server_options).start()
+        try:
+            analysis_engine = AnalysisEngine()
+            analysis_engine.api_key = "benchmark"
+            analysis_engine.base_url = server.base_url
+            prompt_tokens = cached_prompt_tokens = 0
+            for index in range(self.llm_iterations):
+                strategy = dict(
+                    SAMPLE_STRATEGY,
+                    ai_strategy=f"{SAMPLE_STRATEGY['ai_strategy']} (변형 {index})",
+                    contract_type=("Monthly", "Quarterly", "Annual")[index % 3]
+                )
+                trace = RequestTrace("benchmark")
+                analysis_engine.run_analysis(strategy, raw_data_for_prompt, data_profile, dataset_fingerprint="benchmark", use_cache=False, trace=trace)
+                prompt_tokens += trace.prompt_tokens or 0
+                cached_prompt_tokens += trace.cached_prompt_tokens or 0
+            return {
+                "requests": self.llm_iterations,
+                "prompt_template_version": PROMPT_TEMPLATE_VERSION,
+                "prompt_tokens": prompt_tokens,
+                "cached_prompt_tokens": cached_prompt_tokens,
+                "cached_ratio": round(cached_prompt_tokens / prompt_tokens, 4) if prompt_tokens else 0.0,
+            }
+        finally:
+            server.stop()
+
+    def bench_response_repair(self):
+        """
+        MALFORMED_RATE 비율로 형식 오류 응답을 섞는 가짜 서버에서 run_analysis를 반복하여
+        응답 검증 결과(valid/repaired/requeried/failed)별 건수와 로컬 복구율, 재요청률, LLM 호출 시간 대비 검증 시간을 측정합니다.
+        """
+        server = FakeOpenAIServer(**dict(self.server_options, malformed_rate=MALFORMED_RATE)).start()
+        try:
+            analysis_engine = AnalysisEngine()
+            analysis_engine.api_key = "benchmark"
+            analysis_engine.base_url = server.base_url
+            requests = self.llm_iterations * 3
+            outcomes, repairs, validation_timings, requery_timings = {}, {}, [], []
+            for _ in range(requests):
+                trace = RequestTrace("benchmark")
+                analysis_engine.run_analysis(SAMPLE_STRATEGY, "", use_cache=False, trace=trace)
+                outcome = trace.response_validation or "failed"
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+                for repair in trace.response_repairs:
+                    repairs[repair] = repairs.get(repair, 0) + 1
+                if "json_parse" in trace.stages:
+                    validation_timings.append(trace.stages["json_parse"])
+                if "llm_requery" in trace.stages:
+                    requery_timings.append(trace.stages["llm_requery"])
+            results = {
+                "requests": requests,
+                "malformed_rate": MALFORMED_RATE,
+                "malformed_responses": dict(server.malformed_counts),
+                "outcomes": outcomes,
+                "repairs": repairs,
+                "repair_rate": round(outcomes.get("repaired", 0) / requests, 4),
+                "requery_rate": round(outcomes.get("requeried", 0) / requests, 4),
+                "failure_rate": round(outcomes.get("failed", 0) / requests, 4),
+                "validation": summarize(validation_timings),
+            }
+            if requery_timings:
+                results["requery"] = summarize(requery_timings)
+            return results
+        finally:
+            server.stop()
+
+    def bench_endpoint_routing(self):
+        """
+        가짜 서버 3개(정상 / 중간부터 지연이 5배로 느려짐 / 항상 500 오류)를 엔드포인트로 두고 ROUTING_CONCURRENCY개씩 동시에 run_analysis를 실행하여,
+        느려지는 서버 하나만 쓰는 경우와 EWMA 라우팅 + 회로 차단을 쓰는 경우의 지연 분포, 실패 수, 엔드포인트별 요청 수를 비교합니다.
+        """
+        latency = max(self.server_options["latency"], 0.01)
+        requests = self.llm_iterations * 4
+        results = {}
+        for name in ("single_endpoint", "routed"):
+            servers = {
+                "steady": FakeOpenAIServer(**self.server_options).start(),
+                "degrading": FakeOpenAIServer(**self.server_options).start(),
+                "failing": FakeOpenAIServer(**dict(self.server_options, error_rate=1.0)).start(),
+            }
+            try:
+                names = ("degrading",) if name == "single_endpoint" else tuple(servers)
+                analysis_engine = AnalysisEngine()
+                analysis_engine.router = EndpointRouter(
+                    [LLMEndpoint(server_name, servers[server_name].base_url, "benchmark", analysis_engine.llm_model) for server_name in names],
+                    failure_threshold=2, open_seconds=latency * 20
+                )
+                timings, failures = [], 0
+
+                def run_one(index):
+                    # 절반이 지나면 degrading 서버를 느리게 만들어 제공자 한 곳의 성능 저하를 재현
+                    if index == requests // 2:
+                        servers["degrading"].latency = latency * 5
+                    started_at = time.perf_counter()
+                    analysis_result, _ = analysis_engine.run_analysis(SAMPLE_STRATEGY, "", use_cache=False)
+                    return time.perf_counter() - started_at, analysis_result is None
+
+                with ThreadPoolExecutor(max_workers=ROUTING_CONCURRENCY) as executor:
+                    for elapsed, failed in executor.map(run_one, range(requests)):
+                        timings.append(elapsed)
+                        failures += failed
+                endpoints = {endpoint["name"]: {"requests": endpoint["requests"], "ewma_latency_seconds": endpoint["ewma_latency_seconds"], "circuit": endpoint["circuit"]}
+                             for endpoint in analysis_engine.router.stats()}
+                results[name] = dict(summarize(timings), failures=failures, endpoints=endpoints)
+            finally:
+                for server in servers.values():
+                    server.stop()
+        return results
+
+    def bench_log_write(self, json_string):
+        """StreamlitAppView._save_analysis_log의 로그 저장(저장 대기열 추가) 시간을 측정합니다. (작업 디렉토리 안에서 실행)"""
+        # app.py는 import 시 Streamlit 페이지 설정을 실행하므로 필요할 때만 로드
+        from app import StreamlitAppView
+        # Streamlit 서버 밖에서 실행할 때 출력되는 ScriptRunContext 경고 숨김
+        for logger_name in list(logging.root.manager.loggerDict):
+            if logger_name.startswith("streamlit"):
+                logging.getLogger(logger_name).setLevel(logging.ERROR)
+
+        analysis_result = json.loads(json_string)["strategy_analysis"]
+        previous_dir = os.getcwd()
+        os.chdir(self.work_dir)
+        try:
+            view = StreamlitAppView()
+            results = measure(lambda: view._save_analysis_log(SAMPLE_STRATEGY, analysis_result, json_string), self.iterations)
+            # 작업 디렉토리를 지우기 전에 백그라운드 쓰기가 끝나도록 대기
+            view.analysis_store.flush()
+            return results
+        finally:
+            os.chdir(previous_dir)
+
+    @staticmethod
+    def _run_cold_start(extra_args=()):
+        """새 파이썬 프로세스에서 COLD_START_SCRIPT를 실행하고 (측정 결과, 표준 오류 출력)을 반환합니다."""
+        completed = subprocess.run(
+            [sys.executable, *extra_args, "-c", COLD_START_SCRIPT],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+        )
+        return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+    @staticmethod
+    def import_time_report(importtime_output, top=15):
+        """'python -X importtime' 출력을 최상위 패키지별 import 시간(자체 시간 합계, ms) 내림차순으로 집계합니다."""
+        package_ms = {}
+        for line in importtime_output.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, _, module_name = line[len("import time:"):].split("|")
+            package = module_name.strip().split(".")[0]
+            package_ms[package] = package_ms.get(package, 0.0) + int(self_us) / 1000
+        ordered = sorted(package_ms.items(), key=lambda item: item[1], reverse=True)
+        return [{"package": package, "self_ms": round(ms, 3)} for package, ms in ordered[:top]]
+
+    def bench_cold_start(self):
+        """새 프로세스 기준 첫 화면 표시 시간(Streamlit import + app.py 첫 실행)과 패키지별 import 시간을 측정합니다."""
+        timings = {"streamlit_import": [], "app_first_run": []}
+        for _ in range(self.iterations):
+            result, _ = self._run_cold_start()
+            for name in timings:
+                timings[name].append(result[name])
+        results = {name: summarize(values) for name, values in timings.items()}
+        results["heavy_modules_loaded"] = result["loaded_modules"]
+
+        _, importtime_output = self._run_cold_start(("-X", "importtime"))
+        results["import_time_by_package"] = self.import_time_report(importtime_output)
+        return results
+
+    def run(self):
+        generator = SyntheticDataGenerator(example_file_path("subscription service"))
+        report = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "environment": {"python": platform.python_version(), "platform": platform.platform()},
+            "parameters": {
+                "row_counts": self.row_counts,
+                "iterations": self.iterations,
+                "llm_iterations": self.llm_iterations,
+                "fake_server": self.server_options,
+            },
+            "datasets": {},
+            "cold_start": self.bench_cold_start(),
+        }
+
+        for row_count in self.row_counts:
+            file_name = f"synthetic_{row_count}.csv"
+            generate_started_at = time.perf_counter()
+            generator.generate(os.path.join(self.work_dir, file_name), row_count)
+            print(f"[데이터] {row_count}행 생성 ({time.perf_counter() - generate_started_at:.1f}초)")
+            report["datasets"][str(row_count)] = self.bench_data_stages(file_name)
+
+        smallest_file = f"synthetic_{min(self.row_counts)}.csv"
+        report["llm"], json_string = self.bench_llm_stages(smallest_file)
+        report["llm_tail"] = self.bench_tail_latency()
+        report["prompt_cache"] = self.bench_prompt_cache(smallest_file)
+        report["response_repair"] = self.bench_response_repair()
+        report["endpoint_routing"] = self.bench_endpoint_routing()
+        report["log_write"] = self.bench_log_write(json_string)
+        return report
+
+
+def print_report(report, baseline=None):
+    """단계별 p50 결과를 출력하고, 이전 결과가 주어지면 변화율을 함께 표시합니다."""
+    def line(name, current, previous):
+        text = f"  {name:<28} p50 {current['p50_ms']:>10.3f} ms  p95 {current['p95_ms']:>10.3f} ms  p99 {current.get('p99_ms', current['p95_ms']):>10.3f} ms"
+        if previous and previous.get("p50_ms"):
+            text += f"  ({(current['p50_ms'] / previous['p50_ms'] - 1) * 100:+.1f}% vs baseline)"
+        print(text)
+
+    cold_start = report.get("cold_start")
+    if cold_start:
+        print("[첫 화면 표시 (새 프로세스)]")
+        previous_cold_start = (baseline or {}).get("cold_start", {})
+        for name in ("streamlit_import", "app_first_run"):
+            line(name, cold_start[name], previous_cold_start.get(name))
+        print(f"  첫 화면 전에 로드된 무거운 모듈: {', '.join(cold_start['heavy_modules_loaded']) or '없음'}")
+        print("  import 시간 상위 패키지: " + ", ".join(f"{item['package']} {item['self_ms']:.1f} ms" for item in cold_start["import_time_by_package"][:8]))
+
+    for row_count, stages in report["datasets"].items():
+        print(f"[{row_count}행]")
+        previous_stages = (baseline or {}).get("datasets", {}).get(row_count, {})
+        for name, stats in stages.items():
+            line(name, stats, previous_stages.get(name))
+
+    print("[LLM / 로그]")
+    previous_llm = (baseline or {}).get("llm", {})
+    for name, stats in report["llm"].items():
+        if "p50_ms" in stats:
+            line(name, stats, previous_llm.get(name))
+    line("log_write", report["log_write"], (baseline or {}).get("log_write"))
+
+    print("[LLM 꼬리 지연 (느린 요청 10%, 429/500 각 5%)]")
+    previous_tail = (baseline or {}).get("llm_tail", {})
+    for name, stats in report.get("llm_tail", {}).items():
+        line(name, stats, previous_tail.get(name))
+        print(f"  {'':<28} 실패 {stats['failures']}건 · LLM 요청 {stats['llm_attempts']}회 · 헤지 {stats['hedged']}건")
+
+    prompt_cache = report.get("prompt_cache")
+    if prompt_cache:
+        previous_ratio = (baseline or {}).get("prompt_cache", {}).get("cached_ratio")
+        print(f"[프롬프트 캐시 (템플릿 v{prompt_cache['prompt_template_version']}, 전략 문구/기간만 다른 요청 {prompt_cache['requests']}건)]")
+        print(f"  입력 {prompt_cache['prompt_tokens']:,} 토큰 중 캐시 {prompt_cache['cached_prompt_tokens']:,} 토큰 ({prompt_cache['cached_ratio'] * 100:.1f}%)"
+              + (f"  (baseline {previous_ratio * 100:.1f}%)" if previous_ratio is not None else ""))
+
+    response_repair = report.get("response_repair")
+    if response_repair:
+        print(f"[LLM 응답 검증 (형식 오류 응답 {response_repair['malformed_rate'] * 100:.0f}%, 요청 {response_repair['requests']}건)]")
+        print(f"  결과: " + ", ".join(f"{outcome} {count}건" for outcome, count in response_repair["outcomes"].items())
+              + f"  (로컬 복구 {response_repair['repair_rate'] * 100:.1f}% · 재요청 {response_repair['requery_rate'] * 100:.1f}% · 실패 {response_repair['failure_rate'] * 100:.1f}%)")
+        line("validation", response_repair["validation"], (baseline or {}).get("response_repair", {}).get("validation"))
+        if "requery" in response_repair:
+            line("requery", response_repair["requery"], (baseline or {}).get("response_repair", {}).get("requery"))
+
+    endpoint_routing = report.get("endpoint_routing")
+    if endpoint_routing:
+        print(f"[LLM 엔드포인트 라우팅 (동시 {ROUTING_CONCURRENCY}건, 정상/중간부터 5배 느려짐/항상 500 오류 서버)]")
+        previous_routing = (baseline or {}).get("endpoint_routing", {})
+        for name, stats in endpoint_routing.items():
+            line(name, stats, previous_routing.get(name))
+            per_endpoint = ", ".join(
+                f"{endpoint_name} " + "/".join(f"{outcome} {count}" for outcome, count in endpoint["requests"].items()) + f" ({endpoint['circuit']})"
+                for endpoint_name, endpoint in stats["endpoints"].items()
+            )
+            print(f"  {'':<28} 실패 {stats['failures']}건 · {per_endpoint}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 가짜 OpenAI 서버를 이용한 오프라인 종단 간 벤치마크를 실행합니다.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="합성 데이터 행 수 목록 (최대 10000000 권장)")
+    parser.add_argument("--iterations", type=int, default=5, help="데이터/로그 단계 반복 횟수")
+    parser.add_argument("--llm-iterations", type=int, default=10, help="LLM 호출 단계 반복 횟수")
+    parser.add_argument("--latency", type=float, default=0.5, help="가짜 서버 응답 지연(초)")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="가짜 서버 지연 변동 폭(초)")
+    parser.add_argument("--summary-chars", type=int, default=300, help="가짜 응답의 analysis_summary 길이")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="가짜 서버 오류 비율 (0~1)")
+    parser.add_argument("--output-dir", default="bench_results", help="결과 JSON 저장 폴더")
+    parser.add_argument("--compare", default=None, help="비교할 이전 결과 JSON 파일")
+    args = parser.parse_args()
+
+    server_options = {
+        "latency": args.latency,
+        "latency_jitter": args.latency_jitter,
+        "summary_chars": args.summary_chars,
+        "error_rate": args.error_rate,
+        "seed": 42,
+    }
+    work_dir = tempfile.mkdtemp(prefix="benchmark_")
+    try:
+        report = BenchmarkSuite(work_dir, args.rows, args.iterations, args.llm_iterations, server_options).run()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"결과 저장: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+
+SIDECAR_SUFFIX = ".columns"
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+# 사이드카 경로별 빌드 잠금 (같은 파일을 여러 스레드가 동시에 처음 로드할 때 한 번만 만들도록)
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+
+def _build_lock(sidecar_dir):
+    with _build_locks_guard:
+        return _build_locks.setdefault(sidecar_dir, threading.Lock())
+
+
+def _file_sha256(file_path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _quote(value, delimiter):
+    """구분자, 따옴표, 줄바꿈이 들어간 값은 CSV 규칙대로 따옴표로 감쌉니다."""
+    if delimiter in value or '"' in value or '\n' in value or '\r' in value:
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+class ColumnarDataset:
+    """
+    컬럼별 NumPy 배열(숫자/불리언은 그대로, 문자열은 사전 인코딩 코드 + 사전)로 저장된 데이터셋입니다.
+    배열은 메모리 맵으로 열리므로 로드 시 파일 전체를 읽거나 복사하지 않습니다.
+    """
+    def __init__(self, sidecar_dir, manifest):
+        self.sidecar_dir = sidecar_dir
+        self.columns = [column["name"] for column in manifest["columns"]]
+        self.row_count = manifest["row_count"]
+        self.delimiter = manifest["delimiter"]
+        self._specs = {column["name"]: column for column in manifest["columns"]}
+        self._arrays = {}
+
+    @property
+    def header_line(self):
+        return self.delimiter.join(self.columns)
+
+    def _array(self, name):
+        if name not in self._arrays:
+            spec = self._specs[name]
+            self._arrays[name] = np.load(os.path.join(self.sidecar_dir, spec["file"]), mmap_mode='r')
+        return self._arrays[name]
+
+    def is_dictionary_encoded(self, name):
+        return self._specs[name]["kind"] == "dictionary"
+
+    def codes(self, name):
+        """사전 인코딩 컬럼의 코드 배열(결측은 -1)을 반환합니다."""
+        return self._array(name)
+
+    def dictionary(self, name):
+        return self._specs[name]["dictionary"]
+
+    def strata_codes(self, name):
+        """층화 샘플링용 행별 층 코드 배열을 반환합니다."""
+        if self.is_dictionary_encoded(name):
+            return np.asarray(self._array(name))
+        return np.unique(np.asarray(self._array(name)), return_inverse=True)[1]
+
+    def column(self, name):
+        """컬럼을 pandas Series로 반환합니다. (숫자형은 메모리 맵 배열을 그대로 사용, 문자열은 Categorical)"""
+        array = self._array(name)
+        if self.is_dictionary_encoded(name):
+            return pd.Series(pd.Categorical.from_codes(np.asarray(array), categories=self.dictionary(name)), name=name)
+        return pd.Series(array, name=name, copy=False)
+
+    def to_dataframe(self):
+        return pd.DataFrame({name: self.column(name) for name in self.columns})
+
+    def format_rows(self, indices):
+        """지정한 행 번호들의 값을 원래 구분자로 이어 붙인 행 문자열 목록으로 만듭니다."""
+        indices = np.asarray(indices, dtype=np.int64)
+        rendered_columns = []
+        for name in self.columns:
+            values = self._array(name)[indices]
+            if self.is_dictionary_encoded(name):
+                dictionary = self.dictionary(name)
+                rendered = [dictionary[code] if code >= 0 else "" for code in values.tolist()]
+            elif values.dtype.kind == 'f':
+                rendered = ["" if value != value else (str(int(value)) if value.is_integer() else repr(value)) for value in values.tolist()]
+            else:
+                rendered = [str(value) for value in values.tolist()]
+            rendered_columns.append([_quote(value, self.delimiter) for value in rendered])
+        return [self.delimiter.join(row) for row in zip(*rendered_columns)]
+
+    def estimated_size(self):
+        """캐시 메모리 예산 계산용 크기: 메모리 맵 배열은 OS 페이지 캐시가 관리하므로 사전 크기만 계산합니다."""
+        return sum(
+            sum(sys.getsizeof(value) for value in spec.get("dictionary", ()))
+            for spec in self._specs.values()
+        ) + 1024
+
+
+class ColumnarSidecar:
+    """
+    CSV 파일 옆('<파일명>.columns/' 폴더)에 컬럼형 사이드카를 만들고, 원본이 바뀌지 않았으면 메모리 맵으로 다시 엽니다.
+    원본의 크기/mtime이 같으면 그대로 사용하고, mtime만 바뀐 경우에는 SHA-256 체크섬이 같을 때만 재사용합니다.
+    """
+    @staticmethod
+    def sidecar_dir(csv_path):
+        return f"{csv_path}{SIDECAR_SUFFIX}"
+
+    @classmethod
+    def _read_manifest(cls, csv_path):
+        try:
+            with open(os.path.join(cls.sidecar_dir(csv_path), MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def _is_valid(cls, manifest, csv_path):
+        if not manifest or manifest.get("format_version") != FORMAT_VERSION:
+            return False
+        stat = os.stat(csv_path)
+        if manifest["source_size"] != stat.st_size:
+            return False
+        if manifest["source_mtime_ns"] == stat.st_mtime_ns:
+            return True
+        # 내용은 같고 수정 시각만 바뀐 경우(복사, touch 등) 체크섬으로 확인 후 mtime 갱신
+        if _file_sha256(csv_path) != manifest["source_sha256"]:
+            return False
+        manifest["source_mtime_ns"] = stat.st_mtime_ns
+        cls._write_manifest(cls.sidecar_dir(csv_path), manifest)
+        return True
+
+    @staticmethod
+    def _write_manifest(directory, manifest):
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        with open(f"{manifest_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    @staticmethod
+    def _detect_delimiter(csv_path):
+        """DataLoader와 같은 규칙으로 헤더에서 구분자(쉼표 또는 탭)를 감지합니다."""
+        with open(csv_path, 'r', encoding='utf-8') as f:
+            first_line = f.readline()
+        if ',' in first_line:
+            return ','
+        if '\t' in first_line:
+            return '\t'
+        raise ValueError("유효한 구분자(쉼표 또는 탭)를 찾을 수 없습니다.")
+
+    @classmethod
+    def build(cls, csv_path):
+        """CSV를 한 번 파싱하여 사이드카를 만들고 ColumnarDataset을 반환합니다."""
+        with _build_lock(cls.sidecar_dir(csv_path)):
+            return cls._build(csv_path)
+
+    @classmethod
+    def _build(cls, csv_path):
+        stat = os.stat(csv_path)
+        delimiter = cls._detect_delimiter(csv_path)
+        df = pd.read_csv(csv_path, sep=delimiter, skipinitialspace=True)
+
+        sidecar_dir = cls.sidecar_dir(csv_path)
+        # 임시 폴더는 빌드마다 고유하게 만들어 다른 프로세스의 빌드와 섞이지 않게 함
+        temp_dir = tempfile.mkdtemp(prefix=f"{os.path.basename(sidecar_dir)}.tmp", dir=os.path.dirname(os.path.abspath(sidecar_dir)))
+
+        try:
+            column_specs = []
+            for index, name in enumerate(df.columns):
+                series = df[name]
+                file_name = f"{index}.npy"
+                if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+                    np.save(os.path.join(temp_dir, file_name), series.to_numpy())
+                    column_specs.append({"name": str(name).strip(), "kind": "array", "file": file_name})
+                else:
+                    codes, uniques = pd.factorize(series.astype(object).where(series.notna(), None))
+                    dtype = np.int16 if len(uniques) < 2 ** 15 else np.int32
+                    np.save(os.path.join(temp_dir, file_name), codes.astype(dtype))
+                    column_specs.append({"name": str(name).strip(), "kind": "dictionary", "file": file_name, "dictionary": [str(value) for value in uniques]})
+
+            manifest = {
+                "format_version": FORMAT_VERSION,
+                "source_size": stat.st_size,
+                "source_mtime_ns": stat.st_mtime_ns,
+                "source_sha256": _file_sha256(csv_path),
+                "delimiter": delimiter,
+                "row_count": len(df),
+                "columns": column_specs,
+            }
+            cls._write_manifest(temp_dir, manifest)
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        # 완성된 사이드카로 한 번에 교체 (읽는 쪽이 만들다 만 사이드카를 보지 않도록)
+        shutil.rmtree(sidecar_dir, ignore_errors=True)
+        try:
+            os.replace(temp_dir, sidecar_dir)
+        except OSError:
+            # 그 사이 다른 프로세스가 사이드카를 먼저 만들었으면 그것을 사용
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            existing = cls._read_manifest(csv_path)
+            if not cls._is_valid(existing, csv_path):
+                raise
+            return ColumnarDataset(sidecar_dir, existing)
+        return ColumnarDataset(sidecar_dir, manifest)
+
+    @classmethod
+    def load_or_build(cls, csv_path):
+        """유효한 사이드카가 있으면 메모리 맵으로 열고, 없거나 원본이 바뀌었으면 새로 만듭니다."""
+        manifest = cls._read_manifest(csv_path)
+        if cls._is_valid(manifest, csv_path):
+            return ColumnarDataset(cls.sidecar_dir(csv_path), manifest)
+        with _build_lock(cls.sidecar_dir(csv_path)):
+            # 잠금을 기다리는 동안 다른 스레드가 이미 만들었으면 그대로 사용
+            manifest = cls._read_manifest(csv_path)
+            if cls._is_valid(manifest, csv_path):
+                return ColumnarDataset(cls.sidecar_dir(csv_path), manifest)
+            return cls._build(csv_path)
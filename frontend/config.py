@@ -4,6 +4,9 @@ from dotenv import load_dotenv
 # .env 파일에서 환경 변수 로드
 load_dotenv()
 
+# 분석 요청의 입력 필드 (Streamlit 폼의 input_data, 일괄 검증 파일, HTTP API 요청 본문, 보고서, 분석 기록에서 공통으로 사용)
+INPUT_FIELDS = ("business_sector", "target_column", "ai_strategy", "key_feature", "contract_type")
+
 class AppConfig:
     """
     앱 실행에 필요한 모든 전역 설정과 상수를 관리하는 클래스입니다.
@@ -11,6 +14,8 @@ class AppConfig:
     
     # 1. API Key
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    # OpenAI 호환 서버 주소 (비워두면 OpenAI 기본 주소 사용, 벤치마크 시 로컬 가짜 서버 주소 지정)
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
 
     # 2. 파일 경로 및 매핑 딕셔너리
     BUSINESS_FILE_MAPPING = {
@@ -24,4 +29,106 @@ class AppConfig:
     BASE_DATA_DIR = "example_dataset"
 
     # 3. LLM 모델 설정
-    LLM_MODEL = "gpt-4-turbo-preview"
\ No newline at end of file
+    LLM_MODEL = "gpt-4-turbo-preview"
+
+    # 4. 데이터셋 캐시 설정 (파싱된 데이터셋을 프로세스 전역 메모리에 보관하는 최대 크기)
+    DATASET_CACHE_MAX_BYTES = int(os.getenv("DATASET_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+    # 5. 원시 데이터 샘플링 설정 ("head", "reservoir", "stratified")
+    DEFAULT_SAMPLING_MODE = os.getenv("DEFAULT_SAMPLING_MODE", "stratified")
+    SAMPLING_SEED = int(os.getenv("SAMPLING_SEED", "42"))
+
+    # 6. 데이터 프로파일 설정
+    # 프롬프트에 넣을 데이터: "both"(프로파일 + 원시 샘플), "profile"(프로파일만), "sample"(원시 샘플만)
+    PROMPT_DATA_MODE = os.getenv("PROMPT_DATA_MODE", "both")
+    PROFILE_MAX_SEGMENTS = 12  # 세그먼트 분석/상위 값 표시에 사용할 최대 값 종류 수
+    PROFILE_CACHE_MAX_BYTES = int(os.getenv("PROFILE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+    # 7. LLM 응답 캐시 설정 (동일한 모델/프롬프트/데이터셋 요청 시 API 호출 생략)
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", "llm_cache")
+    RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+    # 8. 일괄(batch) 전략 검증 설정
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    BATCH_REQUESTS_PER_MINUTE = float(os.getenv("BATCH_REQUESTS_PER_MINUTE", "0"))
+
+    # 9. 스트리밍 설정 (True이면 LLM 응답을 토큰 단위로 받아 완성된 항목부터 화면에 표시)
+    STREAMING_ENABLED = os.getenv("STREAMING_ENABLED", "true").lower() == "true"
+
+    # 10. 프롬프트 데이터 압축 설정 (토큰 예산 안에 원시 데이터 행을 최대한 담음)
+    PROMPT_PACKING_ENABLED = os.getenv("PROMPT_PACKING_ENABLED", "true").lower() == "true"
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))  # 데이터 블록(프로파일 + 원시 샘플)의 추정 토큰 한도
+    PACKER_CANDIDATE_ROWS = int(os.getenv("PACKER_CANDIDATE_ROWS", "1000"))  # 압축 전에 샘플링할 후보 행 수
+
+    # 11. 지표(metrics) 설정: 요청 단계별 소요 시간/토큰 사용량 기록
+    METRICS_DIR = os.getenv("METRICS_DIR", "metrics")  # metrics.jsonl(회전 파일)과 metrics.prom 저장 폴더
+    METRICS_FILE_MAX_BYTES = int(os.getenv("METRICS_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+    METRICS_FILE_BACKUP_COUNT = int(os.getenv("METRICS_FILE_BACKUP_COUNT", "5"))
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0이 아니면 해당 포트의 /metrics 에서 Prometheus 지표 제공
+    METRICS_PROM_DUMP_INTERVAL_SECONDS = float(os.getenv("METRICS_PROM_DUMP_INTERVAL_SECONDS", "5"))  # metrics.prom 파일 갱신 최소 간격 (그 사이의 요청은 모아서 한 번에 반영)
+
+    # 12. 분석 기록 저장소 설정
+    ANALYSIS_STORE_PATH = os.getenv("ANALYSIS_STORE_PATH", os.path.join("analysis_logs", "analysis_store.db"))  # SQLite(WAL) 파일
+
+    # 13. 유사 전략 재사용 설정: 문구만 조금 다른 전략은 LLM 호출 전에 과거 분석 결과를 볼지 먼저 제안
+    SIMILARITY_REUSE_ENABLED = os.getenv("SIMILARITY_REUSE_ENABLED", "true").lower() == "true"
+    SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.4"))  # 단어 TF-IDF 코사인 유사도 기준 (0~1)
+
+    # 14. 업로드 데이터셋 처리 설정: 대용량 CSV를 청크 단위로 읽어 표본과 통계만 저장
+    UPLOAD_DATA_DIR = os.getenv("UPLOAD_DATA_DIR", "uploaded_datasets")
+    INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "50000"))     # 한 번에 메모리에 올리는 행 수
+    INGEST_SAMPLE_ROWS = int(os.getenv("INGEST_SAMPLE_ROWS", "20000"))   # 프로파일/프롬프트용 균등 무작위 표본 행 수
+    INGEST_MAX_TRACKED_VALUES = int(os.getenv("INGEST_MAX_TRACKED_VALUES", "1000"))  # 컬럼별 빈도를 추적할 최대 값 종류 수
+
+    # 15. 컬럼형 사이드카 설정: CSV 옆('<파일명>.columns/')에 컬럼별 NumPy 배열을 저장하고 이후에는 메모리 맵으로 로드
+    COLUMNAR_SIDECAR_ENABLED = os.getenv("COLUMNAR_SIDECAR_ENABLED", "true").lower() == "true"
+
+    # 16. OpenAI 클라이언트 연결 풀 설정: 프로세스 전역에서 하나의 연결 풀을 공유하며 keep-alive 연결을 재사용
+    OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))                     # 동시에 열 수 있는 최대 연결 수
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "10"))  # 유휴 상태로 유지할 최대 연결 수
+    OPENAI_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY_SECONDS", "60"))  # 유휴 연결을 닫기까지의 시간
+    OPENAI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", "10"))
+    OPENAI_READ_TIMEOUT_SECONDS = float(os.getenv("OPENAI_READ_TIMEOUT_SECONDS", "120"))        # 응답(스트리밍 토큰 간) 대기 시간
+    # (클라이언트 자체 재시도는 쓰지 않음: 재시도 횟수는 17번의 LLM_RETRY_MAX_ATTEMPTS로 설정)
+
+    # 17. LLM 호출 지연 제어 설정: 제한 시간, 지수 백오프 재시도(429/5xx/연결 오류), 헤지(중복) 요청
+    LLM_CALL_DEADLINE_SECONDS = float(os.getenv("LLM_CALL_DEADLINE_SECONDS", "120"))     # 재시도/헤지를 포함한 분석 1건의 LLM 호출 제한 시간
+    LLM_RETRY_MAX_ATTEMPTS = int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "3"))                # 요청별 최대 시도 횟수 (첫 시도 포함)
+    LLM_RETRY_BASE_DELAY_SECONDS = float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", "0.5"))
+    LLM_RETRY_MAX_DELAY_SECONDS = float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", "8"))
+    LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "15"))         # 이 시간 안에 응답(스트리밍은 첫 토큰)이 없으면 헤지 요청
+    LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL") or None                              # 헤지 요청에 쓸 (더 빠른) 대체 모델, 비우면 LLM_MODEL
+
+    # 18. 분석 백엔드 설정: "fallback"(LLM 분석, 실패 시 로컬 통계 분석으로 대체), "prescreen"(로컬 통계 분석을 먼저 표시한 뒤 LLM 분석), "local"(로컬 통계 분석만)
+    DEFAULT_ANALYSIS_BACKEND = os.getenv("DEFAULT_ANALYSIS_BACKEND", "fallback")
+
+    # 19. 분석 HTTP API 서버 설정 (api_server.py): 제한된 작업자 스레드와 대기열, 대기열이 가득 차면 429 응답
+    API_HOST = os.getenv("API_HOST", "0.0.0.0")
+    API_PORT = int(os.getenv("API_PORT", "8600"))
+    API_WORKERS = int(os.getenv("API_WORKERS", "4"))                   # 동시에 실행할 분석 작업 수
+    API_QUEUE_MAX_SIZE = int(os.getenv("API_QUEUE_MAX_SIZE", "32"))    # 실행 대기 중인 작업의 최대 수 (초과 시 429)
+    API_JOB_RETENTION = int(os.getenv("API_JOB_RETENTION", "1000"))    # 결과 조회를 위해 메모리에 보관할 완료 작업 수
+    API_MAX_WAIT_SECONDS = float(os.getenv("API_MAX_WAIT_SECONDS", "120"))  # ?wait= 로 결과를 기다릴 수 있는 최대 시간
+
+    # 20. LLM 응답 검증 설정: 형식이 틀린 응답은 로컬에서 복구(끊긴 JSON 닫기, 점수 정수 변환/0~100 제한 등)하고, 복구할 수 없는 필드만 다시 요청
+    RESPONSE_REQUERY_ENABLED = os.getenv("RESPONSE_REQUERY_ENABLED", "true").lower() == "true"
+
+    # 21. LLM 호출 허가(admission control) 설정: 프로세스 전역 동시 실행 한도, API 분당 토큰 한도(토큰 버킷), 사용자(세션)별 공정 대기열
+    ADMISSION_MAX_CONCURRENT_LLM_CALLS = int(os.getenv("ADMISSION_MAX_CONCURRENT_LLM_CALLS", "8"))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))          # API 분당 토큰 한도 (0이면 제한 없음)
+    LLM_TOKEN_BUCKET_BURST = int(os.getenv("LLM_TOKEN_BUCKET_BURST", "0"))        # 한 번에 쓸 수 있는 최대 토큰 수 (0이면 분당 한도와 같음)
+    ADMISSION_EXPECTED_COMPLETION_TOKENS = int(os.getenv("ADMISSION_EXPECTED_COMPLETION_TOKENS", "1000"))  # 토큰 차감 시 입력 추정치에 더할 출력 토큰 수
+    ADMISSION_MAX_QUEUE_PER_USER = int(os.getenv("ADMISSION_MAX_QUEUE_PER_USER", "3"))  # 사용자별 대기 요청 한도 (0이면 제한 없음)
+    ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "120"))  # 차례를 기다리는 최대 시간 (초과 시 LLM 분석 실패로 처리)
+
+    # 22. LLM 엔드포인트 라우팅 설정: 여러 OpenAI 호환 엔드포인트 중 관측 지연(EWMA)과 진행 중 요청 수가 가장 적은 곳으로 보내고, 연속 실패한 곳은 일시 차단
+    # JSON 목록 문자열 또는 JSON 파일 경로, 예: [{"name": "a", "base_url": "http://host-a/v1", "api_key_env": "KEY_A", "model": "gpt-4o", "capacity": 8}, ...]
+    # (비우면 OPENAI_API_KEY / OPENAI_BASE_URL / LLM_MODEL의 단일 엔드포인트)
+    LLM_ENDPOINTS = os.getenv("LLM_ENDPOINTS") or None
+    LLM_ENDPOINT_CAPACITY = int(os.getenv("LLM_ENDPOINT_CAPACITY", "8"))                    # capacity를 지정하지 않은 엔드포인트의 동시 처리 용량
+    LLM_ENDPOINT_EWMA_ALPHA = float(os.getenv("LLM_ENDPOINT_EWMA_ALPHA", "0.3"))            # 관측 지연 EWMA의 새 값 가중치
+    LLM_ENDPOINT_FAILURE_THRESHOLD = int(os.getenv("LLM_ENDPOINT_FAILURE_THRESHOLD", "3"))  # 회로를 여는 연속 실패 횟수
+    LLM_ENDPOINT_OPEN_SECONDS = float(os.getenv("LLM_ENDPOINT_OPEN_SECONDS", "30"))         # 회로를 연 뒤 확인 요청을 보내기까지의 시간
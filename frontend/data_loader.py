@@ -1,6 +1,23 @@
 import os
+import sys
 # config.py에서 설정 정보 로드
 from config import AppConfig
+from dataset_cache import get_dataset_cache
+from sampler import RowSampler
+
+class ParsedDataset:
+    """
+    한 번 파싱한 CSV 파일의 내용(헤더, 데이터 행, 컬럼 목록)을 보관합니다.
+    """
+    def __init__(self, lines, columns, delimiter=','):
+        self.lines = lines          # 헤더를 포함한 전체 행 (양끝 공백 제거)
+        self.columns = columns      # 헤더에서 추출한 컬럼 목록 (또는 "Error: ..." 메시지 1개)
+        self.delimiter = delimiter  # 헤더에서 감지한 구분자
+
+    def estimated_size(self):
+        """캐시 메모리 예산 계산을 위한 대략적인 바이트 크기를 반환합니다."""
+        return sum(sys.getsizeof(line) for line in self.lines) + sys.getsizeof(self.lines)
+
 
 class DataLoader:
     """
@@ -8,54 +25,178 @@ class DataLoader:
     """
     def __init__(self):
         self.BASE_DATA_DIR = AppConfig.BASE_DATA_DIR
-        self.BUSINESS_FILE_MAPPING = AppConfig.BUSINESS_FILE_MAPPING
+        # 업로드 데이터셋을 등록해도 AppConfig의 기본 매핑이 바뀌지 않도록 복사본 사용
+        self.BUSINESS_FILE_MAPPING = dict(AppConfig.BUSINESS_FILE_MAPPING)
+        self.dataset_cache = get_dataset_cache()
+
+    def _resolve_file_path(self, relative_file_path):
+        """매핑된 상대 경로를 OS에 맞는 실제 파일 경로로 변환합니다."""
+        normalized_relative_path = relative_file_path.replace('/', os.sep)
+        return os.path.join(self.BASE_DATA_DIR, normalized_relative_path)
+
+    def register_dataset(self, business_sector, file_path):
+        """업로드 처리된 데이터셋 등 추가 데이터 파일을 비즈니스 분야로 등록합니다. (절대 경로는 BASE_DATA_DIR과 무관하게 사용)"""
+        self.BUSINESS_FILE_MAPPING[business_sector] = file_path
+
+    def get_file_path(self, business_sector):
+        """비즈니스 분야에 매핑된 데이터 파일 경로를 반환합니다. (매핑이 없으면 None)"""
+        relative_file_path = self.BUSINESS_FILE_MAPPING.get(business_sector)
+        if not relative_file_path:
+            return None
+        return self._resolve_file_path(relative_file_path)
+
+    def get_dataset_fingerprint(self, business_sector):
+        """데이터 파일의 현재 버전(경로 + mtime + 크기)을 나타내는 문자열을 반환합니다. (파일이 없으면 None)"""
+        file_path = self.get_file_path(business_sector)
+        if not file_path:
+            return None
+        try:
+            return ":".join(str(part) for part in self.dataset_cache.make_key(file_path))
+        except OSError:
+            return None
+
+    @staticmethod
+    def _parse_header(first_line):
+        """헤더 행에서 구분자를 감지하고 컬럼 목록(또는 "Error: ..." 메시지 1개)과 구분자를 반환합니다."""
+        delimiter = ','
+        if not first_line:
+            columns = ["Error: 파일 내용이 비어 있거나 첫 줄(컬럼)이 비어 있습니다."]
+        else:
+            columns = []
+
+            # 구분자(쉼표 또는 탭)에 따라 컬럼 분리
+            if ',' in first_line:
+                columns = [col.strip() for col in first_line.split(',') if col.strip()]
+            elif '\t' in first_line:
+                delimiter = '\t'
+                columns = [col.strip() for col in first_line.split('\t') if col.strip()]
+            else:
+                columns = ["Error: 유효한 구분자(쉼표 또는 탭)를 찾을 수 없습니다."]
+
+            if not columns or (len(columns) == 1 and columns[0].startswith("Error:")):
+                 columns = ["Error: 유효한 컬럼 이름을 추출하지 못했습니다. (데이터 확인 필요)"]
+
+        return columns, delimiter
+
+    @classmethod
+    def _parse_dataset(cls, file_path):
+        """CSV 파일 전체를 한 번 읽어 행 목록과 컬럼 목록을 만듭니다."""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            lines = [line.strip() for line in f]
+
+        columns, delimiter = cls._parse_header(lines[0] if lines else "")
+        return ParsedDataset(lines, columns, delimiter)
+
+    @classmethod
+    def _load_columnar(cls, file_path):
+        """
+        CSV 옆의 컬럼형 사이드카를 메모리 맵으로 엽니다. (처음이거나 원본이 바뀌었으면 한 번 변환)
+        사이드카를 만들 수 없으면(쓰기 권한 없음, 빈 파일 등) 기존 방식으로 파싱합니다.
+        """
+        # 컬럼형 사이드카는 numpy/pandas를 사용하므로 처음 데이터를 로드할 때 import (앱 첫 화면 표시를 늦추지 않도록)
+        from columnar_store import ColumnarSidecar
+        try:
+            return ColumnarSidecar.load_or_build(file_path)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            print(f"컬럼형 사이드카를 사용할 수 없어 CSV를 직접 파싱합니다. ({file_path}) 오류: {e}")
+            return cls._parse_dataset(file_path)
+
+    @staticmethod
+    def _dataset_size(dataset):
+        return dataset.estimated_size()
+
+    def load_dataset(self, file_path):
+        """공유 캐시를 통해 파싱된 데이터셋을 반환합니다. (파일이 바뀌지 않았다면 디스크를 다시 읽지 않습니다.)"""
+        if AppConfig.COLUMNAR_SIDECAR_ENABLED:
+            return self.dataset_cache.get_or_load(file_path, self._load_columnar, self._dataset_size)
+        return self.dataset_cache.get_or_load(file_path, self._parse_dataset, ParsedDataset.estimated_size)
+
+    def _sample_indices(self, dataset, sample_size, sampling_mode, seed, stratify_column):
+        """컬럼형 데이터셋에서 sampling_mode에 맞게 sample_size개의 행 번호를 고릅니다. (행 문자열은 고른 행만 만듦)"""
+        sampler = RowSampler(seed)
+        if sampling_mode == "head":
+            return range(min(sample_size, dataset.row_count))
+        if sampling_mode == "reservoir":
+            return sampler.reservoir_indices(dataset.row_count, sample_size)
+        if sampling_mode == "stratified":
+            if stratify_column not in dataset.columns:
+                raise ValueError(f"층화 기준 컬럼 '{stratify_column}'을(를) 찾을 수 없습니다.")
+            return sampler.stratified_indices(dataset.strata_codes(stratify_column), sample_size)
+        raise ValueError(f"지원하지 않는 샘플링 방식입니다: {sampling_mode}")
+
+    def _sample_rows(self, dataset, sample_size, sampling_mode, seed, stratify_column):
+        """헤더를 제외한 데이터 행에서 sampling_mode에 맞게 sample_size개의 행을 한 번의 순회로 추출합니다."""
+        sampler = RowSampler(seed)
+        data_rows = iter(dataset.lines)
+        next(data_rows, None)  # 헤더 건너뛰기
+
+        if sampling_mode == "reservoir":
+            return sampler.reservoir(data_rows, sample_size)
+        if sampling_mode == "stratified":
+            if stratify_column not in dataset.columns:
+                raise ValueError(f"층화 기준 컬럼 '{stratify_column}'을(를) 찾을 수 없습니다.")
+            column_index = dataset.columns.index(stratify_column)
+            return sampler.stratified(data_rows, sample_size, column_index, dataset.delimiter)
+        if sampling_mode == "head":
+            return sampler.head(data_rows, sample_size)
+        raise ValueError(f"지원하지 않는 샘플링 방식입니다: {sampling_mode}")
+
+    def load_columns(self, business_sector):
+        """
+        입력 폼 표시용으로 데이터 파일의 헤더 한 줄만 읽어 컬럼 목록을 반환합니다. (데이터셋 전체를 로드하지 않음)
+        반환값: (컬럼 목록, None) 또는 실패 시 (None, "Error: ..." 메시지)
+        """
+        relative_file_path = self.BUSINESS_FILE_MAPPING.get(business_sector)
+        if not relative_file_path:
+            return None, f"Error: {business_sector}에 대한 매핑 파일이 없습니다."
+
+        file_path = self._resolve_file_path(relative_file_path)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                first_line = f.readline().strip()
+        except FileNotFoundError:
+            abs_file_path = os.path.abspath(file_path)
+            return None, f"Error: 파일 '{file_path}'를 찾을 수 없습니다. (절대 경로: {abs_file_path}) example_dataset 폴더 구조 및 파일명을 확인해주세요."
+        except Exception as e:
+            return None, f"Error: 파일 로드 중 오류 발생: {e}"
+
+        columns, _ = self._parse_header(first_line)
+        if columns[0].startswith("Error:"):
+            return None, columns[0]
+        return columns, None
 
-    def load_raw_data(self, business_sector, max_lines=100): 
+    def load_raw_data(self, business_sector, max_lines=100, sampling_mode="head", seed=None, stratify_column=None):
         """
         선택된 비즈니스 분야에 따라 원시 데이터를 로드하고 컬럼 목록을 추출합니다.
-        (토큰 한도 초과 방지를 위해 max_lines만큼 샘플링합니다.)
+        (토큰 한도 초과 방지를 위해 헤더 포함 max_lines만큼 샘플링합니다.)
+        sampling_mode: "head"(앞부분), "reservoir"(전체 균등 무작위), "stratified"(stratify_column 기준 층화)
         """
-        relative_file_path = self.BUSINESS_FILE_MAPPING.get(business_sector) 
-        
+        relative_file_path = self.BUSINESS_FILE_MAPPING.get(business_sector)
+
         if not relative_file_path:
             return f"Error: {business_sector}에 대한 매핑 파일이 없습니다.", None, None
-            
-        normalized_relative_path = relative_file_path.replace('/', os.sep)
-        file_path = os.path.join(self.BASE_DATA_DIR, normalized_relative_path)
-        
+
+        file_path = self._resolve_file_path(relative_file_path)
+
         try:
-            raw_data_lines = []
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for i, line in enumerate(f):
-                    if i < max_lines: 
-                        raw_data_lines.append(line.strip())
-                    else:
-                        break
-            
-            raw_data = '\n'.join(raw_data_lines)
-            lines = raw_data_lines
-            
-            if not lines or not lines[0].strip():
-                columns = ["Error: 파일 내용이 비어 있거나 첫 줄(컬럼)이 비어 있습니다."]
+            dataset = self.load_dataset(file_path)
+            if not isinstance(dataset, ParsedDataset):  # 컬럼형 데이터셋(ColumnarDataset)
+                indices = self._sample_indices(dataset, max_lines - 1, sampling_mode, seed, stratify_column)
+                raw_data = '\n'.join([dataset.header_line] + dataset.format_rows(indices))
+            elif sampling_mode == "head" or not dataset.lines:
+                raw_data = '\n'.join(dataset.lines[:max_lines])
             else:
-                first_line = lines[0]
-                columns = []
-                
-                # 구분자(쉼표 또는 탭)에 따라 컬럼 분리
-                if ',' in first_line:
-                    columns = [col.strip() for col in first_line.split(',') if col.strip()]
-                elif '\t' in first_line:
-                    columns = [col.strip() for col in first_line.split('\t') if col.strip()]
-                else:
-                    columns = ["Error: 유효한 구분자(쉼표 또는 탭)를 찾을 수 없습니다."]
-                    
-                if not columns or (len(columns) == 1 and columns[0].startswith("Error:")):
-                     columns = ["Error: 유효한 컬럼 이름을 추출하지 못했습니다. (데이터 확인 필요)"]
-                     
+                sampled_rows = self._sample_rows(dataset, max_lines - 1, sampling_mode, seed, stratify_column)
+                raw_data = '\n'.join([dataset.lines[0]] + sampled_rows)
+            # 호출자가 목록을 수정해도 캐시된 원본이 바뀌지 않도록 복사본 반환
+            columns = list(dataset.columns)
+
             return raw_data, columns, relative_file_path
-        
+
         except FileNotFoundError:
             abs_file_path = os.path.abspath(file_path)
             return f"Error: 파일 '{file_path}'를 찾을 수 없습니다. (절대 경로: {abs_file_path}) example_dataset 폴더 구조 및 파일명을 확인해주세요.", None, None
         except Exception as e:
-            return f"Error: 파일 로드 중 오류 발생: {e}", None, None
\ No newline at end of file
+            return f"Error: 파일 로드 중 오류 발생: {e}", None, None
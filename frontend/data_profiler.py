@@ -0,0 +1,265 @@
+import math
+# config.py에서 설정 정보 로드
+from config import AppConfig
+from dataset_cache import DatasetCache
+from dataset_ingestor import load_ingest_metadata
+from prompt_packer import is_identifier_name
+
+class DatasetProfile:
+    """
+    전체 데이터 파일을 한 번 읽어 계산한 컬럼별 요약과, 타겟 컬럼별 세그먼트/상관 분석 결과를 보관합니다.
+    """
+    def __init__(self, df, total_row_count=None, exact_summaries=None):
+        self.df = df
+        self.row_count = len(df)
+        # 업로드 데이터셋은 df가 균등 표본이므로 전체 행 수와 스트리밍으로 계산한 정확한 컬럼 통계를 따로 받음
+        self.total_row_count = total_row_count or self.row_count
+        self.exact_summaries = exact_summaries or {}
+        self.numeric_columns = [col for col in df.columns if self._is_numeric(df[col])]
+        # 모든 값이 고유한 식별자 컬럼(예: CustomerID)은 분석에 의미가 없으므로 제외
+        self.identifier_columns = [col for col in df.columns if self._is_identifier(col, df[col], self.row_count)]
+        self.column_summaries = self._summarize_columns()
+        self._segment_keys = self._build_segment_keys()
+        self._digest_cache = {}  # target_column -> digest 문자열
+        self._effects_cache = {}  # target_column -> segment_effects 결과
+
+    @staticmethod
+    def _is_identifier(column, series, row_count):
+        """
+        값이 모두 고유하고, 문자열 컬럼이거나 이름이 식별자 형태(ID/번호)인 정수 컬럼이면 식별자로 봅니다.
+        (금액/시간 같은 연속형 실수 측정값과 이름이 식별자가 아닌 정수 컬럼은 값이 모두 달라도 분석에 사용)
+        """
+        import pandas as pd
+        if row_count <= 1 or series.nunique(dropna=True) != row_count:
+            return False
+        if pd.api.types.is_bool_dtype(series):
+            return False
+        if pd.api.types.is_integer_dtype(series):
+            return is_identifier_name(column)
+        return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+
+    @staticmethod
+    def _is_numeric(series):
+        import pandas as pd
+        return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+    def estimated_size(self):
+        """캐시 메모리 예산 계산을 위한 대략적인 바이트 크기를 반환합니다."""
+        return int(self.df.memory_usage(deep=True).sum())
+
+    def _summarize_columns(self):
+        """컬럼별 요약 통계를 벡터 연산으로 한 번에 계산합니다."""
+        summaries = {}
+        missing = self.df.isna().sum()
+
+        if self.numeric_columns:
+            stats = self.df[self.numeric_columns].agg(["mean", "std", "min", "median", "max"])
+            for col in self.numeric_columns:
+                summaries[col] = {
+                    "type": "numeric",
+                    "mean": stats.at["mean", col],
+                    "std": stats.at["std", col],
+                    "min": stats.at["min", col],
+                    "median": stats.at["median", col],
+                    "max": stats.at["max", col],
+                    "missing": int(missing[col]),
+                }
+
+        for col in self.df.columns:
+            if col in summaries:
+                continue
+            shares = self.df[col].value_counts(normalize=True, dropna=True)
+            summaries[col] = {
+                "type": "categorical",
+                "unique": int(shares.size),
+                "top_values": shares.head(AppConfig.PROFILE_MAX_SEGMENTS).to_dict(),
+                "missing": int(missing[col]),
+            }
+
+        # 전체 파일 기준의 정확한 통계가 있으면 같은 유형의 항목을 덮어씀 (중앙값 등은 표본 기준 유지)
+        for col, exact in self.exact_summaries.items():
+            if col in summaries and summaries[col]["type"] == exact.get("type"):
+                summaries[col].update(exact)
+        return summaries
+
+    def _build_segment_keys(self):
+        """
+        세그먼트 분석에 사용할 컬럼별 그룹 키를 만듭니다.
+        범주형 컬럼과 값 종류가 적은 숫자형 컬럼은 그대로, 나머지 숫자형 컬럼은 사분위 구간으로 나눕니다.
+        """
+        segment_keys = {}
+        for col in self.df.columns:
+            if col in self.identifier_columns:
+                continue
+            series = self.df[col]
+            unique_count = series.nunique(dropna=True)
+            if unique_count < 2:
+                continue
+            if col in self.numeric_columns and unique_count > AppConfig.PROFILE_MAX_SEGMENTS:
+                import pandas as pd
+                bins = pd.qcut(series, q=4, duplicates="drop")
+                # qcut은 첫 구간의 하한을 실제 최솟값보다 조금 낮추므로 표시용 라벨에는 실제 최솟값을 사용
+                lower_bounds = [series.min()] + [interval.left for interval in bins.cat.categories[1:]]
+                labels = [f"{_fmt(lower)}~{_fmt(interval.right)}" for lower, interval in zip(lower_bounds, bins.cat.categories)]
+                segment_keys[col] = bins.cat.rename_categories(labels)
+            elif unique_count <= AppConfig.PROFILE_MAX_SEGMENTS:
+                segment_keys[col] = series
+        return segment_keys
+
+    def _target_values(self, target_column):
+        """
+        타겟 컬럼을 세그먼트 평균 계산용 숫자 배열로 변환합니다.
+        숫자/불리언은 그대로, 범주형은 가장 흔한 값의 비율(0/1)로 변환하며 변환 설명을 함께 반환합니다.
+        """
+        import pandas as pd
+        series = self.df[target_column]
+        if self._is_numeric(series) or pd.api.types.is_bool_dtype(series):
+            return series.astype(float), f"'{target_column}' 평균"
+        top_value = series.mode(dropna=True).iloc[0]
+        return (series == top_value).astype(float), f"'{target_column}'='{top_value}' 비율"
+
+    def segment_rates(self, target_column):
+        """세그먼트(컬럼 값/구간)별 타겟 평균과 표본 수를 계산합니다."""
+        target_values, label = self._target_values(target_column)
+        overall = float(target_values.mean())
+        rates = {}
+        for col, keys in self._segment_keys.items():
+            if col == target_column:
+                continue
+            grouped = target_values.groupby(keys, observed=True).agg(["mean", "count"])
+            rates[col] = grouped.sort_values("mean", ascending=False)
+        return label, overall, rates
+
+    def segment_effects(self, target_column):
+        """
+        세그먼트 컬럼별로 타겟 변동을 얼마나 설명하는지(상관비 η² = 세그먼트 간 제곱합 / 전체 제곱합, 0~1)를 큰 순서로 반환합니다.
+        반환값: (라벨, 전체 평균, {컬럼: η²}, segment_rates의 세그먼트별 결과) (타겟 컬럼별로 한 번만 계산)
+        """
+        if target_column in self._effects_cache:
+            return self._effects_cache[target_column]
+        target_values, _ = self._target_values(target_column)
+        label, overall, rates = self.segment_rates(target_column)
+        total_sum_of_squares = float(((target_values - overall) ** 2).sum())
+        effects = {}
+        for col, grouped in rates.items():
+            between_sum_of_squares = float((grouped["count"] * (grouped["mean"] - overall) ** 2).sum())
+            effects[col] = between_sum_of_squares / total_sum_of_squares if total_sum_of_squares > 0 else 0.0
+        effects = dict(sorted(effects.items(), key=lambda item: item[1], reverse=True))
+        self._effects_cache[target_column] = (label, overall, effects, rates)
+        return self._effects_cache[target_column]
+
+    def correlations(self, target_column):
+        """숫자형 컬럼과 타겟 컬럼의 피어슨 상관계수를 절댓값 기준 내림차순으로 반환합니다."""
+        target_values, _ = self._target_values(target_column)
+        columns = [col for col in self.numeric_columns if col != target_column and col not in self.identifier_columns]
+        if not columns:
+            import pandas as pd
+            return pd.Series(dtype=float)
+        correlations = self.df[columns].corrwith(target_values).dropna()
+        return correlations.reindex(correlations.abs().sort_values(ascending=False).index)
+
+    def to_digest(self, target_column):
+        """프롬프트에 넣을 수 있는 압축된 텍스트 요약을 반환합니다. (타겟 컬럼별로 한 번만 생성)"""
+        if target_column in self._digest_cache:
+            return self._digest_cache[target_column]
+
+        if self.total_row_count != self.row_count:
+            lines = [f"[전체 행 수] {self.total_row_count} (세그먼트/상관 분석은 균등 무작위 표본 {self.row_count}행 기준)"]
+        else:
+            lines = [f"[전체 행 수] {self.row_count}"]
+        if self.identifier_columns:
+            lines.append(f"[식별자 컬럼 (분석 제외)] {', '.join(self.identifier_columns)}")
+
+        lines.append("[컬럼 요약]")
+        for col, summary in self.column_summaries.items():
+            if col in self.identifier_columns:
+                continue
+            if summary["type"] == "numeric":
+                lines.append(
+                    f"- {col} (숫자): 평균 {_fmt(summary['mean'])}, 표준편차 {_fmt(summary['std'])}, "
+                    f"최소 {_fmt(summary['min'])}, 중앙값 {_fmt(summary['median'])}, 최대 {_fmt(summary['max'])}, 결측 {summary['missing']}"
+                )
+            else:
+                top_values = ", ".join(f"{value} {share * 100:.1f}%" for value, share in summary["top_values"].items())
+                lines.append(f"- {col} (범주, {summary['unique']}종): {top_values}, 결측 {summary['missing']}")
+
+        if target_column in self.df.columns:
+            label, overall, rates = self.segment_rates(target_column)
+            lines.append(f"[세그먼트별 {label} (전체 {_fmt(overall)})]")
+            for col, grouped in rates.items():
+                segments = ", ".join(f"{segment} {_fmt(row['mean'])} (n={int(row['count'])})" for segment, row in grouped.iterrows())
+                lines.append(f"- {col}: {segments}")
+
+            correlations = self.correlations(target_column)
+            if not correlations.empty:
+                lines.append(f"[{label}과의 상관계수]")
+                lines.append(", ".join(f"{col} {value:+.3f}" for col, value in correlations.items()))
+
+        digest = "\n".join(lines)
+        self._digest_cache[target_column] = digest
+        return digest
+
+
+def _fmt(value):
+    """숫자를 프롬프트용으로 짧게 표시합니다."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "N/A"
+    return f"{value:.4g}"
+
+
+class DataProfiler:
+    """
+    DataLoader와 같은 파일을 pandas로 전체 로드하여 프로파일(요약 통계, 세그먼트별 타겟 비율, 상관계수)을 만듭니다.
+    프로파일은 파일 버전(경로 + mtime + 크기)별로 캐시되므로 반복 분석 시 다시 계산하지 않습니다.
+    """
+    def __init__(self, data_loader):
+        self.data_loader = data_loader
+        self.profile_cache = _shared_profile_cache
+
+    @staticmethod
+    def _read_dataframe(file_path):
+        """컬럼형 사이드카가 있으면 메모리 맵 배열로, 없으면 CSV를 파싱하여 DataFrame을 만듭니다."""
+        # numpy/pandas는 import 비용이 크므로 프로파일을 처음 만들 때 로드 (앱 첫 화면 표시를 늦추지 않도록)
+        import pandas as pd
+        from columnar_store import ColumnarSidecar
+        if AppConfig.COLUMNAR_SIDECAR_ENABLED:
+            try:
+                return ColumnarSidecar.load_or_build(file_path).to_dataframe()
+            except FileNotFoundError:
+                raise
+            except Exception as e:
+                print(f"컬럼형 사이드카를 사용할 수 없어 CSV를 직접 파싱합니다. ({file_path}) 오류: {e}")
+        return pd.read_csv(file_path, skipinitialspace=True)
+
+    @classmethod
+    def _build_profile(cls, file_path):
+        ingest_metadata = load_ingest_metadata(file_path)
+        if ingest_metadata:
+            return DatasetProfile(
+                cls._read_dataframe(file_path),
+                total_row_count=ingest_metadata["row_count"],
+                exact_summaries=ingest_metadata["columns"]
+            )
+        return DatasetProfile(cls._read_dataframe(file_path))
+
+    def load_profile(self, business_sector):
+        """선택된 비즈니스 분야의 전체 데이터 프로파일을 반환합니다. (파일이 없으면 None)"""
+        file_path = self.data_loader.get_file_path(business_sector)
+        if not file_path:
+            return None
+        try:
+            return self.profile_cache.get_or_load(file_path, self._build_profile, DatasetProfile.estimated_size)
+        except Exception as e:
+            print(f"데이터 프로파일 생성 중 오류가 발생했습니다. 오류: {e}")
+            return None
+
+    def build_digest(self, business_sector, target_column):
+        """프롬프트용 프로파일 요약 문자열을 반환합니다. (실패 시 None)"""
+        profile = self.load_profile(business_sector)
+        if profile is None:
+            return None
+        return profile.to_digest(target_column)
+
+
+# 데이터셋 캐시와 같은 방식으로 프로세스 전역에서 공유
+_shared_profile_cache = DatasetCache(AppConfig.PROFILE_CACHE_MAX_BYTES)
@@ -0,0 +1,86 @@
+import os
+import threading
+from collections import OrderedDict
+# config.py에서 설정 정보 로드
+from config import AppConfig
+
+class DatasetCache:
+    """
+    파싱된 데이터셋을 프로세스 전역 메모리에 보관하는 LRU 캐시입니다.
+    (파일 경로 + 수정 시각(mtime) + 파일 크기를 키로 사용하므로 파일이 바뀌면 자동으로 무효화됩니다.)
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, size_bytes)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(file_path):
+        """파일 경로와 현재 파일 버전(mtime, size)으로 캐시 키를 만듭니다. 파일이 없으면 FileNotFoundError가 발생합니다."""
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+    def get_or_load(self, file_path, loader, size_of):
+        """
+        캐시에 있으면 바로 반환하고, 없으면 loader(file_path)로 파싱한 뒤 저장합니다.
+        size_of(value)는 메모리 예산 계산에 사용할 대략적인 바이트 크기를 반환해야 합니다.
+        """
+        key = self.make_key(file_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # 파싱은 락 밖에서 수행 (다른 세션의 캐시 조회를 막지 않도록)
+        value = loader(file_path)
+        size_bytes = size_of(value)
+
+        with self._lock:
+            # 같은 파일의 이전 버전은 더 이상 쓰이지 않으므로 즉시 제거
+            for stale_key in [k for k in self._entries if k[0] == key[0] and k != key]:
+                self._remove(stale_key)
+
+            if key not in self._entries and size_bytes <= self.max_bytes:
+                self._entries[key] = (value, size_bytes)
+                self.current_bytes += size_bytes
+                while self.current_bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+
+        return value
+
+    def _remove(self, key):
+        _, size_bytes = self._entries.pop(key)
+        self.current_bytes -= size_bytes
+
+    def clear(self):
+        """모든 캐시 항목을 제거합니다."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """캐시 사용 현황을 딕셔너리로 반환합니다."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Streamlit은 rerun 시 메인 스크립트만 다시 실행하고 import된 모듈은 유지하므로,
+# 모듈 전역 인스턴스는 모든 세션과 rerun에서 공유됩니다.
+_shared_dataset_cache = DatasetCache(AppConfig.DATASET_CACHE_MAX_BYTES)
+
+def get_dataset_cache():
+    """프로세스 전역에서 공유되는 데이터셋 캐시를 반환합니다."""
+    return _shared_dataset_cache
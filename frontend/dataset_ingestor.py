@@ -0,0 +1,332 @@
+import argparse
+import codecs
+import csv
+import io
+import json
+import os
+import re
+from datetime import datetime
+# config.py에서 설정 정보 로드
+from config import AppConfig
+
+INGEST_METADATA_FILE = "ingest.json"
+SAMPLE_FILE = "sample.csv"
+UPLOADED_SECTOR_PREFIX = "업로드: "
+
+
+class _PrefixedStream(io.RawIOBase):
+    """감지용으로 먼저 읽어 둔 앞부분(prefix)과 나머지 스트림을 이어 붙여 읽습니다. (탐색 불가능한 입력도 처리)"""
+    def __init__(self, prefix, source):
+        self.prefix = io.BytesIO(prefix)
+        self.source = source
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.prefix.read(len(buffer)) or self.source.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class _ProgressReader(io.RawIOBase):
+    """
+    원본 바이너리 스트림을 고정 크기 청크로 읽으면서 읽은 바이트 수를 세고, 필요하면 사본 파일에 그대로 기록합니다.
+    """
+    def __init__(self, source, total_bytes=None, on_progress=None, copy_to=None):
+        self.source = source
+        self.total_bytes = total_bytes
+        self.on_progress = on_progress
+        self.copy_to = copy_to
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.source.read(len(buffer))
+        if not data:
+            return 0
+        buffer[:len(data)] = data
+        self.bytes_read += len(data)
+        if self.copy_to is not None:
+            self.copy_to.write(data)
+        if self.on_progress:
+            self.on_progress(self.bytes_read, self.total_bytes)
+        return len(data)
+
+
+class _ColumnStats:
+    """한 컬럼의 스트리밍 통계(결측 수, 숫자형 평균/분산/최소/최대, 범주형 값 빈도)를 청크 단위로 누적합니다."""
+    def __init__(self, max_tracked_values):
+        self.max_tracked_values = max_tracked_values
+        self.kind = "numeric"  # 숫자가 아닌 값이 한 번이라도 나오면 "categorical"로 바뀜
+        self.missing = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.value_counts = {}
+        self.untracked = 0  # 추적 한도를 넘은 뒤 새로 나온 값의 행 수
+
+    def update(self, values):
+        """청크의 한 컬럼(pandas가 청크별로 유형을 추론한 Series)을 반영합니다."""
+        import pandas as pd
+        present = values.dropna()
+        is_numeric = pd.api.types.is_numeric_dtype(present) and not pd.api.types.is_bool_dtype(present)
+        if not is_numeric and not pd.api.types.is_bool_dtype(present):
+            present = present.astype(str).str.strip()
+            present = present[present != ""]
+        self.missing += len(values) - len(present)
+        if present.empty:
+            return
+
+        if self.kind == "numeric":
+            # 어느 청크에서든 숫자가 아닌 값(문자열, 불리언)이 나오면 범주형으로 전환
+            if is_numeric:
+                self._update_numeric(present.to_numpy(dtype=float))
+            else:
+                self.kind = "categorical"
+
+        # 이미 추적 중인 값만 개별 갱신하고, 새 값은 남은 한도만큼만 추가 (고유값이 많은 컬럼도 청크당 비용 일정)
+        counts = present.value_counts()
+        known = counts.index.isin(list(self.value_counts))
+        for value, count in counts[known].items():
+            self.value_counts[value] += int(count)
+        new_counts = counts[~known]
+        room = max(0, self.max_tracked_values - len(self.value_counts))
+        for value, count in new_counts.iloc[:room].items():
+            self.value_counts[value] = int(count)
+        self.untracked += int(new_counts.iloc[room:].sum())
+
+    def _update_numeric(self, numbers):
+        """청크 통계를 병렬 분산 공식(Chan et al.)으로 누적 통계와 합칩니다."""
+        chunk_count = len(numbers)
+        chunk_mean = float(numbers.mean())
+        chunk_m2 = float(((numbers - chunk_mean) ** 2).sum())
+        total = self.count + chunk_count
+        delta = chunk_mean - self.mean
+        self.mean += delta * chunk_count / total
+        self.m2 += chunk_m2 + delta * delta * self.count * chunk_count / total
+        self.count = total
+        chunk_min, chunk_max = float(numbers.min()), float(numbers.max())
+        self.min = chunk_min if self.min is None else min(self.min, chunk_min)
+        self.max = chunk_max if self.max is None else max(self.max, chunk_max)
+
+    def to_summary(self):
+        """DatasetProfile의 column_summaries와 같은 키를 가진 요약을 반환합니다."""
+        if self.kind == "numeric" and self.count:
+            return {
+                "type": "numeric",
+                "mean": self.mean,
+                "std": (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else float("nan"),
+                "min": self.min,
+                "max": self.max,
+                "missing": self.missing,
+            }
+        present = sum(self.value_counts.values()) + self.untracked
+        top_values = sorted(self.value_counts.items(), key=lambda item: item[1], reverse=True)[:AppConfig.PROFILE_MAX_SEGMENTS]
+        return {
+            "type": "categorical",
+            # 추적 한도를 넘었으면 정확한 종류 수를 알 수 없으므로 "1000+" 형태로 표시
+            "unique": f"{len(self.value_counts)}+" if self.untracked else len(self.value_counts),
+            "top_values": {value: count / present for value, count in top_values} if present else {},
+            "missing": self.missing,
+        }
+
+
+class DatasetIngestor:
+    """
+    대용량 CSV를 고정 크기 청크로 한 번만 읽으면서 구분자/인코딩 감지, 컬럼 유형 추론, 스트리밍 컬럼 통계,
+    균등 무작위 표본(저수지 샘플링)을 계산합니다. 메모리 사용량은 파일 크기가 아니라 청크 크기와 표본 크기에 비례합니다.
+    결과는 'upload_dir/<이름>/sample.csv'(표본)와 'ingest.json'(통계)으로 저장되어 기존 데이터 파일처럼 분석에 사용됩니다.
+    """
+    SNIFF_BYTES = 64 * 1024
+    ENCODINGS = ("utf-8-sig", "cp949")  # 국내 엑셀 내보내기 파일은 cp949인 경우가 많음
+
+    def __init__(self, upload_dir=None, chunk_rows=None, sample_rows=None, max_tracked_values=None, seed=None):
+        self.upload_dir = upload_dir or AppConfig.UPLOAD_DATA_DIR
+        self.chunk_rows = chunk_rows or AppConfig.INGEST_CHUNK_ROWS
+        self.sample_rows = sample_rows or AppConfig.INGEST_SAMPLE_ROWS
+        self.max_tracked_values = max_tracked_values or AppConfig.INGEST_MAX_TRACKED_VALUES
+        self.seed = AppConfig.SAMPLING_SEED if seed is None else seed
+
+    @classmethod
+    def sniff(cls, head_bytes):
+        """파일 앞부분으로 인코딩과 CSV 구분자/따옴표 규칙을 추정합니다."""
+        encoding, text = cls.ENCODINGS[-1], None
+        for candidate in cls.ENCODINGS:
+            try:
+                # final=False: 읽기 경계에서 잘린 마지막 글자는 오류로 보지 않음
+                text = codecs.getincrementaldecoder(candidate)().decode(head_bytes, final=False)
+                encoding = candidate
+                break
+            except UnicodeDecodeError:
+                continue
+        if text is None:
+            text = head_bytes.decode(encoding, errors="replace")
+
+        # 마지막 줄은 잘렸을 수 있으므로 제외하고 감지
+        sniff_text = text.rsplit("\n", 1)[0] if "\n" in text else text
+        try:
+            dialect = csv.Sniffer().sniff(sniff_text, delimiters=",\t;|")
+            delimiter, quotechar = dialect.delimiter, dialect.quotechar or '"'
+        except csv.Error:
+            delimiter, quotechar = ",", '"'
+        return encoding, delimiter, quotechar
+
+    @staticmethod
+    def dataset_name(file_name):
+        """업로드 파일 이름을 폴더 이름으로 쓸 수 있게 정리합니다."""
+        base_name = os.path.splitext(os.path.basename(file_name))[0]
+        return re.sub(r"[^\w.-]+", "_", base_name).strip("._") or "dataset"
+
+    def ingest(self, source, file_name, total_bytes=None, keep_copy=True, on_progress=None):
+        """
+        source(바이너리 파일 객체)를 청크 단위로 처리하고 저장된 데이터셋의 메타데이터(dict)를 반환합니다.
+        keep_copy가 True이면 원본을 'data.csv'로 함께 저장합니다. (이미 서버에 있는 파일이면 False)
+        on_progress(bytes_read, total_bytes)는 청크를 읽을 때마다 호출됩니다.
+        """
+        name = self.dataset_name(file_name)
+        dataset_dir = os.path.join(self.upload_dir, name)
+        os.makedirs(dataset_dir, exist_ok=True)
+
+        head_bytes = source.read(self.SNIFF_BYTES)
+        encoding, delimiter, quotechar = self.sniff(head_bytes)
+
+        copy_path = os.path.join(dataset_dir, "data.csv")
+        copy_file = open(f"{copy_path}.tmp", 'wb') if keep_copy else None
+        try:
+            reader = _ProgressReader(_PrefixedStream(head_bytes, source), total_bytes, on_progress, copy_file)
+            metadata = self._process(io.BufferedReader(reader, buffer_size=1024 * 1024), encoding, delimiter, quotechar, dataset_dir)
+        finally:
+            if copy_file is not None:
+                copy_file.close()
+        if copy_file is not None:
+            os.replace(f"{copy_path}.tmp", copy_path)
+
+        metadata.update({
+            "name": name,
+            "source_file": os.path.basename(file_name) if keep_copy else os.path.abspath(file_name),
+            "data_file": copy_path if keep_copy else os.path.abspath(file_name),
+            "byte_count": reader.bytes_read,
+            "ingested_at": datetime.now().isoformat(timespec="seconds"),
+        })
+        metadata_path = os.path.join(dataset_dir, INGEST_METADATA_FILE)
+        with open(f"{metadata_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        os.replace(f"{metadata_path}.tmp", metadata_path)
+        return metadata
+
+    def ingest_file(self, file_path, keep_copy=False, on_progress=None):
+        """서버에 있는 파일을 처리합니다. (기본값으로 사본을 만들지 않고 원본 경로를 기록)"""
+        with open(file_path, 'rb') as source:
+            return self.ingest(source, file_path, os.path.getsize(file_path), keep_copy=keep_copy, on_progress=on_progress)
+
+    def _process(self, binary_stream, encoding, delimiter, quotechar, dataset_dir):
+        """청크마다 컬럼 통계를 누적하고 저수지 표본을 갱신한 뒤 표본을 sample.csv로 저장합니다."""
+        # numpy/pandas는 import 비용이 크므로 실제 업로드 처리 시에만 로드 (앱 첫 화면 표시를 늦추지 않도록)
+        import numpy as np
+        import pandas as pd
+        rng = np.random.default_rng(self.seed)
+        reservoir = []  # 원본 행 순서 유지를 위해 (행 번호, 값 목록)
+        column_stats = None
+        columns = []
+        row_count = 0
+
+        chunks = pd.read_csv(
+            binary_stream, sep=delimiter, quotechar=quotechar, encoding=encoding,
+            chunksize=self.chunk_rows, skipinitialspace=True
+        )
+        for chunk in chunks:
+            if column_stats is None:
+                columns = [str(col).strip() for col in chunk.columns]
+                column_stats = [_ColumnStats(self.max_tracked_values) for _ in columns]
+            for stats, col in zip(column_stats, chunk.columns):
+                stats.update(chunk[col])
+
+            # 저수지 샘플링(Algorithm R)을 청크 단위로 벡터화: 전역 행 번호 i의 행은 확률 k/(i+1)로 임의 칸을 대체
+            fill_count = max(0, min(len(chunk), self.sample_rows - len(reservoir)))
+            offsets = list(range(fill_count))
+            assignments = [None] * fill_count  # None이면 저수지 끝에 추가
+            if fill_count < len(chunk):
+                slots = rng.integers(0, np.arange(row_count + fill_count, row_count + len(chunk)) + 1)
+                for offset in np.nonzero(slots < self.sample_rows)[0]:
+                    offsets.append(fill_count + int(offset))
+                    assignments.append(int(slots[offset]))
+            # 선택된 행만 파이썬 값으로 변환 (결측값은 빈 문자열)
+            selected_rows = chunk.iloc[offsets].astype(object).where(chunk.iloc[offsets].notna(), "").to_numpy().tolist()
+            for offset, slot, row in zip(offsets, assignments, selected_rows):
+                if slot is None:
+                    reservoir.append((row_count + offset, row))
+                else:
+                    reservoir[slot] = (row_count + offset, row)
+            row_count += len(chunk)
+
+        if column_stats is None:
+            raise ValueError("파일 내용이 비어 있거나 컬럼을 찾을 수 없습니다.")
+
+        reservoir.sort(key=lambda item: item[0])
+        sample_path = os.path.join(dataset_dir, SAMPLE_FILE)
+        with open(f"{sample_path}.tmp", 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(columns)
+            writer.writerows(row for _, row in reservoir)
+        os.replace(f"{sample_path}.tmp", sample_path)
+
+        return {
+            "encoding": encoding,
+            "delimiter": delimiter,
+            "row_count": row_count,
+            "sample_rows": len(reservoir),
+            "sample_file": os.path.abspath(sample_path),
+            "columns": {col: stats.to_summary() for col, stats in zip(columns, column_stats)},
+        }
+
+
+def load_ingest_metadata(sample_path):
+    """표본 파일과 같은 폴더의 ingest.json을 읽습니다. (업로드 데이터셋이 아니면 None)"""
+    metadata_path = os.path.join(os.path.dirname(sample_path), INGEST_METADATA_FILE)
+    if os.path.basename(sample_path) != SAMPLE_FILE or not os.path.exists(metadata_path):
+        return None
+    try:
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def list_ingested_datasets(upload_dir=None):
+    """업로드 폴더에서 처리가 끝난 데이터셋을 찾아 {분야 이름: 표본 파일 경로}로 반환합니다."""
+    upload_dir = upload_dir or AppConfig.UPLOAD_DATA_DIR
+    datasets = {}
+    if not os.path.isdir(upload_dir):
+        return datasets
+    for name in sorted(os.listdir(upload_dir)):
+        sample_path = os.path.join(upload_dir, name, SAMPLE_FILE)
+        if os.path.exists(sample_path) and os.path.exists(os.path.join(upload_dir, name, INGEST_METADATA_FILE)):
+            datasets[f"{UPLOADED_SECTOR_PREFIX}{name}"] = os.path.abspath(sample_path)
+    return datasets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대용량 CSV를 청크 단위로 처리하여 분석용 표본과 컬럼 통계를 만듭니다.")
+    parser.add_argument("file_path", help="처리할 CSV/TSV 파일")
+    parser.add_argument("--upload-dir", default=AppConfig.UPLOAD_DATA_DIR)
+    parser.add_argument("--chunk-rows", type=int, default=AppConfig.INGEST_CHUNK_ROWS)
+    parser.add_argument("--sample-rows", type=int, default=AppConfig.INGEST_SAMPLE_ROWS)
+    parser.add_argument("--copy", action="store_true", help="원본 파일을 업로드 폴더에 복사")
+    args = parser.parse_args()
+
+    def on_progress(bytes_read, total_bytes):
+        if total_bytes:
+            print(f"\r처리 중: {bytes_read / total_bytes * 100:5.1f}% ({bytes_read / 1024 / 1024:,.0f} MB)", end="", flush=True)
+
+    ingestor = DatasetIngestor(args.upload_dir, args.chunk_rows, args.sample_rows)
+    metadata = ingestor.ingest_file(args.file_path, keep_copy=args.copy, on_progress=on_progress)
+    print(f"\n완료: {metadata['row_count']:,}행, 표본 {metadata['sample_rows']:,}행 -> {os.path.join(args.upload_dir, metadata['name'])}")
+
+
+if __name__ == "__main__":
+    main()
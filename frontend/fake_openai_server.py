@@ -0,0 +1,294 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 프롬프트 캐시 흉내: OpenAI와 같이 1024토큰 이상의 앞부분을 128토큰 단위로 캐시 (이 서버는 2글자를 1토큰으로 계산)
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_BLOCK_TOKENS = 128
+PROMPT_CACHE_MAX_ENTRIES = 100_000
+# malformed_rate로 섞는 형식 오류 응답 종류 (응답 검증/복구 테스트용)
+MALFORMED_KINDS = ("truncated", "string_score", "out_of_range_score", "missing_field")
+
+
+class FakeOpenAIServer:
+    """
+    벤치마크/테스트용 로컬 OpenAI 호환 서버입니다. (POST /v1/chat/completions, 일반/스트리밍 응답 지원)
+    응답 지연(latency), 응답 크기(summary_chars, alternative_count), 오류 비율(error_rate)을 설정할 수 있습니다.
+    꼬리 지연 재현용으로 일부 요청만 느리게(slow_rate, slow_latency), 일부는 429로(rate_limit_rate) 응답하게 할 수 있고,
+    model_latencies({모델 이름: 지연 시간})로 모델별 기본 지연을 다르게 줄 수 있습니다. (헤지 요청의 대체 모델 테스트용)
+    prompt_cache=True이면 이전 요청과 같은 메시지 앞부분을 캐시된 것으로 보고 usage.prompt_tokens_details.cached_tokens에 보고합니다.
+    malformed_rate 비율의 응답은 MALFORMED_KINDS 중 하나의 형식 오류(끊긴 JSON, 문자열/범위 밖 점수, 필드 누락)를 포함합니다.
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, latency_jitter=0.0, summary_chars=300,
+                 alternative_count=2, error_rate=0.0, stream_chunk_chars=8, seed=None,
+                 slow_rate=0.0, slow_latency=0.0, rate_limit_rate=0.0, model_latencies=None, prompt_cache=True,
+                 malformed_rate=0.0):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.rate_limit_rate = rate_limit_rate
+        self.model_latencies = dict(model_latencies or {})
+        self.summary_chars = summary_chars
+        self.alternative_count = alternative_count
+        self.error_rate = error_rate
+        self.stream_chunk_chars = stream_chunk_chars
+        self.prompt_cache = prompt_cache
+        self.malformed_rate = malformed_rate
+        self._prompt_prefixes = set()  # 지금까지 받은 메시지 앞부분(캐시 단위 경계까지)의 해시
+        self.cached_tokens_total = 0
+        self.request_count = 0
+        self.error_count = 0
+        self.rate_limited_count = 0
+        self.slow_count = 0
+        self.malformed_counts = {kind: 0 for kind in MALFORMED_KINDS}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """백그라운드 스레드에서 서버를 시작하고 자신을 반환합니다."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def build_content(self):
+        """AnalysisEngine의 [출력 형식]을 따르는 JSON 응답 문자열을 만듭니다."""
+        with self._lock:
+            validity_score = self._rng.randint(0, 100)
+            success_probability = self._rng.randint(0, 100)
+            malformed_kind = self._rng.choice(MALFORMED_KINDS) if self._rng.random() < self.malformed_rate else None
+            if malformed_kind:
+                self.malformed_counts[malformed_kind] += 1
+        summary = ("데이터 기반 분석 요약 문장입니다. " * (self.summary_chars // 19 + 1))[:self.summary_chars]
+        result = {
+            "derived_kpis": {f"KPI_{i}_이름": f"KPI {i} 설명" for i in range(1, 7)},
+            "strategy_analysis": {
+                "validity_score": validity_score,
+                "success_probability_percent": success_probability,
+                "analysis_summary": summary,
+                "alternative_strategies": [f"대안 전략 {i}" for i in range(1, self.alternative_count + 1)],
+            },
+        }
+        if malformed_kind == "string_score":
+            result["strategy_analysis"]["validity_score"] = f"{validity_score}점"
+        elif malformed_kind == "out_of_range_score":
+            result["strategy_analysis"]["success_probability_percent"] = success_probability + 100
+        elif malformed_kind == "missing_field":
+            del result["strategy_analysis"]["alternative_strategies"]
+        content = json.dumps(result, ensure_ascii=False)
+        if malformed_kind == "truncated":
+            # 출력 토큰 한도에 걸린 것처럼 analysis_summary 중간에서 끊음
+            content = content[:content.index('"analysis_summary"') + 40]
+        return content
+
+    def cached_prompt_tokens(self, messages):
+        """메시지 앞부분 중 이전 요청과 같은 부분의 토큰 수(캐시 단위로 내림)를 반환하고, 이번 요청의 앞부분을 캐시에 등록합니다."""
+        if not self.prompt_cache:
+            return 0
+        text = "".join(f"{message.get('role')}\n{message.get('content', '')}\n" for message in messages)
+        block_chars = PROMPT_CACHE_BLOCK_TOKENS * 2
+        digest = hashlib.sha1()
+        prefixes = []
+        for end in range(block_chars, len(text) + 1, block_chars):
+            digest.update(text[end - block_chars:end].encode('utf-8'))
+            if end >= PROMPT_CACHE_MIN_TOKENS * 2:
+                prefixes.append((end // 2, digest.hexdigest()))
+        cached_tokens = 0
+        with self._lock:
+            for tokens, prefix_hash in prefixes:
+                if prefix_hash not in self._prompt_prefixes:
+                    break
+                cached_tokens = tokens
+            if len(self._prompt_prefixes) > PROMPT_CACHE_MAX_ENTRIES:
+                self._prompt_prefixes.clear()
+            self._prompt_prefixes.update(prefix_hash for _, prefix_hash in prefixes)
+            self.cached_tokens_total += cached_tokens
+        return cached_tokens
+
+    def _next_behavior(self, model=None):
+        """이번 요청의 지연 시간과 오류 응답 상태 코드(정상이면 None)를 정합니다."""
+        with self._lock:
+            self.request_count += 1
+            base_latency = self.model_latencies.get(model, self.latency)
+            delay = max(0.0, base_latency + self._rng.uniform(-self.latency_jitter, self.latency_jitter))
+            if self._rng.random() < self.slow_rate:
+                self.slow_count += 1
+                delay = self.slow_latency
+            error_status = None
+            if self._rng.random() < self.error_rate:
+                self.error_count += 1
+                error_status = 500
+            elif self._rng.random() < self.rate_limit_rate:
+                self.rate_limited_count += 1
+                error_status = 429
+        return delay, error_status
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass  # 벤치마크 출력이 요청 로그로 가려지지 않도록 생략
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip('/').endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+                    return
+
+                delay, error_status = server._next_behavior(request.get("model"))
+                if error_status == 500:
+                    time.sleep(delay / 2)
+                    self._send_json(500, {"error": {"message": "fake server error", "type": "server_error"}})
+                    return
+                if error_status == 429:
+                    self._send_json(429, {"error": {"message": "fake rate limit", "type": "rate_limit_error"}}, {"Retry-After": "0.1"})
+                    return
+
+                content = server.build_content()
+                prompt_tokens = sum(len(message.get("content", "")) for message in request.get("messages", [])) // 2
+                usage = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(content) // 2,
+                    "total_tokens": prompt_tokens + len(content) // 2,
+                    "prompt_tokens_details": {"cached_tokens": min(prompt_tokens, server.cached_prompt_tokens(request.get("messages", [])))},
+                }
+                completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+                model = request.get("model", "fake-model")
+
+                if request.get("stream"):
+                    try:
+                        self._send_stream(completion_id, model, content, usage, delay, request)
+                    except (BrokenPipeError, ConnectionResetError):
+                        self.close_connection = True  # 클라이언트가 스트림을 중간에 닫음 (헤지 요청 취소 등)
+                    return
+
+                time.sleep(delay)
+                self._send_json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+
+            def _send_stream(self, completion_id, model, content, usage, delay, request):
+                """SSE 형식으로 content를 여러 조각으로 나누어 보냅니다. (첫 조각 전에 delay의 절반, 나머지는 조각마다 나누어 대기)"""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+
+                pieces = [content[i:i + server.stream_chunk_chars] for i in range(0, len(content), server.stream_chunk_chars)]
+                per_piece_delay = (delay / 2) / max(len(pieces), 1)
+                time.sleep(delay / 2)
+                for index, piece in enumerate(pieces):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": piece} if index else {"role": "assistant", "content": piece}, "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                    time.sleep(per_piece_delay)
+
+                final_chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    self.wfile.write(f"data: {json.dumps(final_chunk)}\n\n".encode('utf-8'))
+                    final_chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model, "choices": [], "usage": usage}
+                self.wfile.write(f"data: {json.dumps(final_chunk)}\n\n".encode('utf-8'))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 OpenAI 호환 가짜 서버를 실행합니다.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.0, help="응답 지연 시간(초)")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="지연 시간 무작위 변동 폭(초)")
+    parser.add_argument("--summary-chars", type=int, default=300, help="analysis_summary 길이(글자 수)")
+    parser.add_argument("--alternatives", type=int, default=2, help="대안 전략 개수")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 오류를 반환할 요청 비율 (0~1)")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="slow-latency만큼 느리게 응답할 요청 비율 (0~1)")
+    parser.add_argument("--slow-latency", type=float, default=0.0, help="느린 요청의 응답 지연 시간(초)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429 오류를 반환할 요청 비율 (0~1)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="형식 오류(끊긴 JSON, 문자열 점수 등)가 있는 응답 비율 (0~1)")
+    parser.add_argument("--no-prompt-cache", action="store_true", help="프롬프트 캐시 흉내(cached_tokens 보고)를 끔")
+    parser.add_argument("--instances", type=int, default=1, help="같은 설정으로 port부터 연속된 포트에 띄울 서버 수 (엔드포인트 라우팅 테스트용)")
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=SECONDS", help="모델별 응답 지연 시간 (여러 번 지정 가능)")
+    args = parser.parse_args()
+
+    model_latencies = {}
+    for item in args.model_latency:
+        model, _, seconds = item.partition("=")
+        model_latencies[model] = float(seconds)
+    servers = [FakeOpenAIServer(
+        host=args.host, port=args.port + index, latency=args.latency, latency_jitter=args.latency_jitter,
+        summary_chars=args.summary_chars, alternative_count=args.alternatives, error_rate=args.error_rate,
+        slow_rate=args.slow_rate, slow_latency=args.slow_latency, rate_limit_rate=args.rate_limit_rate,
+        model_latencies=model_latencies, prompt_cache=not args.no_prompt_cache,
+        malformed_rate=args.malformed_rate
+    ) for index in range(max(1, args.instances))]
+    if len(servers) == 1:
+        print(f"가짜 OpenAI 서버 실행 중: {servers[0].base_url} (OPENAI_BASE_URL로 지정하세요)")
+    else:
+        endpoints = [{"name": f"fake-{index + 1}", "base_url": server.base_url, "api_key": "fake"} for index, server in enumerate(servers)]
+        print(f"가짜 OpenAI 서버 {len(servers)}개 실행 중 (LLM_ENDPOINTS로 지정하세요): {json.dumps(endpoints)}")
+    for server in servers[1:]:
+        server.start()
+    try:
+        servers[0].httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers[1:]:
+            server.stop()
+        servers[0].httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
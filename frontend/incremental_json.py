@@ -0,0 +1,99 @@
+import json
+
+class IncrementalJsonParser:
+    """
+    스트리밍으로 조금씩 도착하는 JSON 텍스트에서, 지금까지 완성된 값만 담은 부분 객체를 만들어 냅니다.
+    (작성 중인 문자열/숫자는 포함하지 않으므로 화면에 잘린 값이 표시되지 않습니다.)
+    """
+    _CLOSERS = {'{': '}', '[': ']'}
+    MAX_PARSE_ATTEMPTS = 5  # 한 번에 시도할 최근 자르기 위치 수
+
+    def __init__(self):
+        self.buffer = ""
+        self._stack = []            # 열린 괄호 목록 ('{' 또는 '[')
+        self._in_string = False
+        self._escape = False
+        self._string_is_value = False
+        self._expect_value = False  # 다음 토큰이 (키가 아닌) 값인지 여부
+        self._cut_points = []       # (잘라낼 위치, 닫는 괄호 문자열): 이 위치까지는 완성된 값만 있음
+        self._last_result = None
+
+    def feed(self, text):
+        """새로 도착한 텍스트를 추가하고, 완성된 값이 늘어났다면 갱신된 부분 객체를 반환합니다. (변화 없으면 None)"""
+        start = len(self.buffer)
+        cut_point_count = len(self._cut_points)
+        self.buffer += text
+        for index in range(start, len(self.buffer)):
+            self._scan(index, self.buffer[index])
+
+        # 새로 완성된 값이 없으면 다시 파싱하지 않음
+        if len(self._cut_points) == cut_point_count:
+            return None
+        result = self._parse_latest()
+        if result is None or result == self._last_result:
+            return None
+        self._last_result = result
+        return result
+
+    def _scan(self, index, char):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == '\\':
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._string_is_value:
+                    self._add_cut_point(index + 1)
+            return
+
+        if char == '"':
+            self._in_string = True
+            self._string_is_value = self._expect_value or (self._stack and self._stack[-1] == '[')
+            self._expect_value = False
+        elif char in '{[':
+            self._stack.append(char)
+            self._expect_value = False
+        elif char in '}]':
+            if self._stack:
+                self._stack.pop()
+            self._add_cut_point(index + 1)
+        elif char == ':':
+            self._expect_value = True
+        elif char == ',':
+            # 쉼표 직전까지의 값(숫자, true/false/null 포함)은 완성된 상태
+            self._add_cut_point(index)
+            self._expect_value = False
+
+    def _add_cut_point(self, position):
+        closer = ''.join(self._CLOSERS[bracket] for bracket in reversed(self._stack))
+        self._cut_points.append((position, closer))
+
+    def _parse_latest(self):
+        """가장 최근의 자르기 위치부터 거꾸로 시도하여, 닫는 괄호를 붙여 파싱되는 첫 결과를 반환합니다."""
+        for position, closer in reversed(self._cut_points[-self.MAX_PARSE_ATTEMPTS:]):
+            try:
+                return json.loads(self.buffer[:position] + closer)
+            except ValueError:
+                continue
+        return None
+
+    def complete(self):
+        """
+        응답이 중간에 끊겼을 때 지금까지의 텍스트를 최대한 살려 객체로 만듭니다. (실패 시 None)
+        작성 중이던 문자열 값은 잘린 채로 닫고, 그래도 파싱되지 않으면 완성된 값만 담은 결과를 반환합니다.
+        (작성 중이던 숫자는 잘린 값일 수 있으므로 포함하지 않음)
+        """
+        if self._in_string and self._string_is_value:
+            text = self.buffer[:-1] if self._escape else self.buffer
+            closer = ''.join(self._CLOSERS[bracket] for bracket in reversed(self._stack))
+            try:
+                return json.loads(text + '"' + closer)
+            except ValueError:
+                pass
+        for position, closer in reversed(self._cut_points[-self.MAX_PARSE_ATTEMPTS * 10:]):
+            try:
+                return json.loads(self.buffer[:position] + closer)
+            except ValueError:
+                continue
+        return None
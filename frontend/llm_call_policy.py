@@ -0,0 +1,199 @@
+import queue
+import random
+import threading
+import time
+# config.py에서 설정 정보 로드
+from config import AppConfig
+
+
+class LLMDeadlineExceeded(Exception):
+    """재시도/헤지 요청을 포함한 LLM 호출이 정해진 시간 안에 끝나지 않았을 때 발생합니다."""
+
+
+class LLMCallCancelled(Exception):
+    """헤지 요청 중 다른 쪽이 먼저 끝나 이 요청을 중단했을 때 발생합니다."""
+
+
+class LLMCallOutcome:
+    """LLM 호출 한 건의 결과와 재시도/헤지 여부를 담습니다."""
+    def __init__(self, json_string, usage, model, attempts, hedged=False, hedge_won=False, endpoint=None):
+        self.json_string = json_string
+        self.usage = usage
+        self.model = model          # 실제로 응답한 모델 (엔드포인트별 설정 모델, 헤지 요청이 이기면 대체 모델일 수 있음)
+        self.attempts = attempts    # 모든 요청의 시도 횟수 합계 (재시도 포함)
+        self.hedged = hedged        # 헤지(중복) 요청을 보냈는지
+        self.hedge_won = hedge_won  # 헤지 요청의 응답을 사용했는지
+        self.endpoint = endpoint    # 응답한 엔드포인트 이름 (request_once가 알려준 경우)
+
+
+def is_retryable(error):
+    """일시적인 오류(연결 실패, 시간 초과, 429, 5xx)인지 판단합니다."""
+    import openai
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    # 스트리밍 응답을 읽는 도중의 연결 오류는 openai 예외로 감싸지지 않고 HTTP 라이브러리(httpx) 예외로 전달됨
+    return type(error).__module__.split('.')[0].startswith("httpx")
+
+
+def retry_after_seconds(error):
+    """429 응답의 Retry-After 헤더(초)를 반환합니다. (없으면 None)"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LLMCallPolicy:
+    """
+    LLM 호출에 전체 제한 시간(deadline), 지터를 넣은 지수 백오프 재시도, 선택적 헤지(중복) 요청을 적용합니다.
+    헤지를 켜면 hedge_delay 안에 첫 응답(스트리밍은 첫 토큰)이 없을 때 같은 요청을 (설정 시 더 빠른 대체 모델로) 한 번 더 보내고 먼저 끝난 쪽을 사용합니다.
+
+    request_once(model, deadline, cancel_event, on_partial, on_first_content)는 요청 한 번을 보내 (JSON 문자열, usage)를 반환하는 함수입니다.
+    엔드포인트를 골라 보내는 경우 (JSON 문자열, usage, 엔드포인트 이름, 실제로 요청한 모델)을 반환하면 결과의 endpoint/model에 반영합니다.
+    (deadline은 time.monotonic() 기준 시각, 스트리밍이면 토큰마다 cancel_event와 deadline을 확인해야 함)
+    """
+    def __init__(self, deadline_seconds, max_attempts, base_delay, max_delay, hedge_enabled=False, hedge_delay=None, hedge_model=None, seed=None):
+        self.deadline_seconds = deadline_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_enabled = hedge_enabled
+        self.hedge_delay = hedge_delay
+        self.hedge_model = hedge_model
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            AppConfig.LLM_CALL_DEADLINE_SECONDS,
+            AppConfig.LLM_RETRY_MAX_ATTEMPTS,
+            AppConfig.LLM_RETRY_BASE_DELAY_SECONDS,
+            AppConfig.LLM_RETRY_MAX_DELAY_SECONDS,
+            hedge_enabled=AppConfig.LLM_HEDGE_ENABLED,
+            hedge_delay=AppConfig.LLM_HEDGE_DELAY_SECONDS,
+            hedge_model=AppConfig.LLM_HEDGE_MODEL
+        )
+
+    def backoff_delay(self, retry_index, error=None):
+        """retry_index번째 재시도 전 대기 시간: 0 ~ min(max_delay, base_delay * 2^retry_index) 사이 무작위 (full jitter)."""
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        with self._rng_lock:
+            return self._rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry_index)))
+
+    def _call_with_retries(self, request_once, model, deadline, cancel_event, on_partial, on_first_content, attempt_counter):
+        """일시적인 오류는 백오프 후 다시 시도합니다. 다음 시도 전에 deadline을 넘기게 되면 마지막 오류를 그대로 올립니다."""
+        for attempt in range(self.max_attempts):
+            if cancel_event.is_set():
+                raise LLMCallCancelled()
+            if time.monotonic() >= deadline:
+                raise LLMDeadlineExceeded(f"LLM 호출 제한 시간({self.deadline_seconds}초)을 초과했습니다.")
+            attempt_counter[0] += 1
+            try:
+                return request_once(model, deadline, cancel_event, on_partial, on_first_content)
+            except (LLMDeadlineExceeded, LLMCallCancelled):
+                raise
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_attempts - 1:
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                print(f"LLM 호출 일시 오류로 {delay:.2f}초 후 다시 시도합니다. ({attempt + 1}/{self.max_attempts}) 오류: {e}")
+                if cancel_event.wait(delay):
+                    raise LLMCallCancelled()
+
+    @staticmethod
+    def _outcome(result, model, attempts, hedged=False, hedge_won=False):
+        """request_once의 반환값으로 LLMCallOutcome을 만듭니다. (응답한 모델을 알려주지 않았으면 요청한 model 사용)"""
+        endpoint = result[2] if len(result) > 2 else None
+        served_model = result[3] if len(result) > 3 else model
+        return LLMCallOutcome(result[0], result[1], served_model, attempts, hedged=hedged, hedge_won=hedge_won, endpoint=endpoint)
+
+    def call(self, request_once, model, on_partial=None):
+        """
+        LLM을 호출하여 LLMCallOutcome을 반환합니다.
+        실패하면 마지막 오류를 올리며, 실패한 호출의 재시도도 기록할 수 있도록 오류의 llm_attempts 속성에 시도 횟수를 남깁니다.
+        """
+        deadline = time.monotonic() + self.deadline_seconds
+        attempt_counter = [0]
+        try:
+            if not self.hedge_enabled:
+                result = self._call_with_retries(request_once, model, deadline, threading.Event(), on_partial, None, attempt_counter)
+                return self._outcome(result, model, attempt_counter[0])
+            return self._call_hedged(request_once, model, on_partial, deadline, attempt_counter)
+        except Exception as e:
+            e.llm_attempts = attempt_counter[0]
+            raise
+
+    def _call_hedged(self, request_once, model, on_partial, deadline, attempt_counter):
+        """
+        주 요청과 (필요 시) 헤지 요청을 작업 스레드에서 실행하고, 결과와 부분 결과는 대기열로 받아 호출한 스레드에서 처리합니다.
+        (Streamlit 화면 갱신은 스크립트 실행 스레드에서만 가능하므로 on_partial은 항상 호출한 스레드에서 실행)
+        스트리밍 부분 결과는 먼저 내용을 받기 시작한 요청의 것만 화면에 전달합니다.
+        """
+        events = queue.Queue()
+        cancel_event = threading.Event()
+        launched = []        # 시작한 요청 이름 ("primary", "hedge")
+        first_content = set()
+        owner = None         # 부분 결과를 화면에 보여주는 요청
+        finished = 0
+        last_error = None
+
+        def launch(label, request_model):
+            def run():
+                try:
+                    outcome = self._call_with_retries(
+                        request_once, request_model, deadline, cancel_event,
+                        (lambda partial: events.put(("partial", label, partial))) if on_partial else None,
+                        lambda: events.put(("first_content", label, None)),
+                        attempt_counter
+                    )
+                    events.put(("done", label, outcome))
+                except Exception as e:
+                    events.put(("error", label, e))
+            launched.append(label)
+            threading.Thread(target=run, name=f"llm-{label}", daemon=True).start()
+
+        hedge_at = time.monotonic() + self.hedge_delay
+        launch("primary", model)
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    raise LLMDeadlineExceeded(f"LLM 호출 제한 시간({self.deadline_seconds}초)을 초과했습니다.")
+                if "hedge" not in launched and "primary" not in first_content and now >= hedge_at:
+                    launch("hedge", self.hedge_model or model)
+                wait_until = deadline if "hedge" in launched or "primary" in first_content else min(deadline, hedge_at)
+                try:
+                    kind, label, payload = events.get(timeout=max(0.0, wait_until - now))
+                except queue.Empty:
+                    continue
+
+                if kind == "first_content":
+                    first_content.add(label)
+                elif kind == "partial":
+                    if owner is None:
+                        owner = label
+                    if owner == label:
+                        on_partial(payload)
+                elif kind == "done":
+                    return self._outcome(
+                        payload, model if label == "primary" else (self.hedge_model or model),
+                        attempt_counter[0], hedged="hedge" in launched, hedge_won=label == "hedge"
+                    )
+                else:
+                    finished += 1
+                    last_error = payload
+                    # 주 요청이 재시도까지 모두 실패했으면 남은 시간 안에서 헤지 요청을 바로 보냄
+                    if "hedge" not in launched:
+                        launch("hedge", self.hedge_model or model)
+                    elif finished == len(launched):
+                        raise last_error
+        finally:
+            # 이긴 쪽이 정해졌거나 실패했으면 남은 요청은 중단 (스트리밍은 다음 토큰에서 종료)
+            cancel_event.set()
@@ -0,0 +1,135 @@
+import threading
+# config.py에서 설정 정보 로드
+from config import AppConfig
+
+
+class OpenAIClientManager:
+    """
+    프로세스 전역에서 (API Key, base URL)별로 하나의 OpenAI 클라이언트와 HTTP 연결 풀을 공유합니다.
+    Streamlit rerun마다 AnalysisEngine이 새로 만들어져도 keep-alive 연결을 재사용하므로 요청마다 TLS 연결을 새로 맺지 않습니다.
+    (OpenAI 클라이언트와 내부 HTTP 클라이언트는 여러 스레드에서 동시에 사용해도 안전합니다.)
+    재시도는 LLMCallPolicy가 제한 시간 안에서 (다른 엔드포인트로) 처리하므로 클라이언트 자체 재시도는 끕니다.
+    """
+    def __init__(self, max_connections, max_keepalive_connections, keepalive_expiry, connect_timeout, read_timeout):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._clients = {}  # (api_key, base_url) -> (openai.OpenAI, HTTP 클라이언트)
+        self._lock = threading.Lock()
+        self._request_count = 0
+        self._response_counts = {}  # HTTP 상태 코드 -> 응답 수
+
+    def _on_request(self, request):
+        with self._lock:
+            self._request_count += 1
+
+    def _on_response(self, response):
+        with self._lock:
+            self._response_counts[response.status_code] = self._response_counts.get(response.status_code, 0) + 1
+
+    def _build_http_client(self):
+        # openai 패키지는 import 비용이 크므로 실제 LLM 호출이 필요할 때 로드
+        import openai
+        # openai가 사용하는 HTTP 라이브러리(httpx)의 Limits 타입으로 연결 풀 크기와 keep-alive 유지 시간을 지정
+        limits = type(openai.DEFAULT_CONNECTION_LIMITS)(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+        timeout = openai.Timeout(self.read_timeout, connect=self.connect_timeout)
+        return openai.DefaultHttpxClient(
+            limits=limits,
+            timeout=timeout,
+            event_hooks={"request": [self._on_request], "response": [self._on_response]}
+        )
+
+    def get_client(self, api_key, base_url=None):
+        """공유 OpenAI 클라이언트를 반환합니다. (처음 요청한 조합이면 연결 풀과 함께 생성)"""
+        import openai
+        key = (api_key, base_url)
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is None:
+                http_client = self._build_http_client()
+                client = openai.OpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    http_client=http_client,
+                    timeout=openai.Timeout(self.read_timeout, connect=self.connect_timeout),
+                    max_retries=0
+                )
+                entry = self._clients[key] = (client, http_client)
+            return entry[0]
+
+    @staticmethod
+    def _pool_connections(http_client):
+        """HTTP 클라이언트 내부 연결 풀의 (전체 연결 수, 유휴 연결 수)를 반환합니다. (내부 구조를 알 수 없으면 None)"""
+        pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is None:
+            return None
+        connections = list(connections)
+        idle = sum(1 for connection in connections if getattr(connection, "is_idle", lambda: False)())
+        return len(connections), idle
+
+    def stats(self):
+        """클라이언트 수, 요청/응답 수, 연결 풀 상태를 반환합니다."""
+        with self._lock:
+            http_clients = [http_client for _, http_client in self._clients.values()]
+            stats = {
+                "clients": len(http_clients),
+                "requests": self._request_count,
+                "responses_by_status": dict(self._response_counts),
+                "max_connections": self.max_connections,
+                "max_keepalive_connections": self.max_keepalive_connections,
+            }
+        open_connections = idle_connections = 0
+        for http_client in http_clients:
+            pool_state = self._pool_connections(http_client)
+            if pool_state:
+                open_connections += pool_state[0]
+                idle_connections += pool_state[1]
+        stats["open_connections"] = open_connections
+        stats["idle_connections"] = idle_connections
+        return stats
+
+    def prometheus_lines(self):
+        """연결 풀 상태를 Prometheus 텍스트 노출 형식의 줄 목록으로 반환합니다."""
+        stats = self.stats()
+        lines = [
+            "# HELP strategy_app_llm_http_requests_total HTTP requests sent to the LLM API.",
+            "# TYPE strategy_app_llm_http_requests_total counter",
+            f"strategy_app_llm_http_requests_total {stats['requests']}",
+            "# HELP strategy_app_llm_http_responses_total HTTP responses from the LLM API, by status code.",
+            "# TYPE strategy_app_llm_http_responses_total counter",
+        ]
+        for status_code, count in sorted(stats["responses_by_status"].items()):
+            lines.append(f'strategy_app_llm_http_responses_total{{status="{status_code}"}} {count}')
+        lines.append("# HELP strategy_app_llm_pool_connections Connections in the shared LLM HTTP connection pool, by state.")
+        lines.append("# TYPE strategy_app_llm_pool_connections gauge")
+        lines.append(f'strategy_app_llm_pool_connections{{state="active"}} {stats["open_connections"] - stats["idle_connections"]}')
+        lines.append(f'strategy_app_llm_pool_connections{{state="idle"}} {stats["idle_connections"]}')
+        return lines
+
+    def close(self):
+        """모든 클라이언트의 연결 풀을 닫습니다."""
+        with self._lock:
+            entries = list(self._clients.values())
+            self._clients.clear()
+        for _, http_client in entries:
+            http_client.close()
+
+
+_shared_client_manager = OpenAIClientManager(
+    AppConfig.OPENAI_MAX_CONNECTIONS,
+    AppConfig.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    AppConfig.OPENAI_KEEPALIVE_EXPIRY_SECONDS,
+    AppConfig.OPENAI_CONNECT_TIMEOUT_SECONDS,
+    AppConfig.OPENAI_READ_TIMEOUT_SECONDS
+)
+
+def get_client_manager():
+    """프로세스 전역에서 공유되는 OpenAI 클라이언트 관리자를 반환합니다."""
+    return _shared_client_manager
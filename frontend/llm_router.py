@@ -0,0 +1,250 @@
+import json
+import os
+import threading
+import time
+# config.py에서 설정 정보 로드
+from config import AppConfig
+from llm_call_policy import LLMCallCancelled
+from llm_client import get_client_manager
+
+# 회로 차단기 상태 (Prometheus gauge 값)
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+# 한동안 선택되지 않은 엔드포인트의 관측 지연을 절반으로 줄이는 시간(초): 느렸던 엔드포인트도 회복 여부를 다시 확인하도록
+LATENCY_DECAY_HALF_LIFE_SECONDS = 60.0
+
+
+class NoEndpointAvailable(Exception):
+    """모든 LLM 엔드포인트의 회로가 열려 있고(연속 실패) 호출 제한 시간 안에 다시 열리지 않아 요청을 보낼 곳이 없을 때 발생합니다."""
+
+
+class LLMEndpoint:
+    """
+    OpenAI 호환 엔드포인트 하나의 설정(이름, base URL, API Key, 모델, 동시 처리 용량)과 라우팅 상태입니다.
+    상태(관측 지연 EWMA, 진행 중 요청 수, 회로 차단기)는 EndpointRouter의 잠금 안에서만 변경합니다.
+    """
+    def __init__(self, name, base_url, api_key, model, capacity=None):
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.capacity = max(1, capacity or AppConfig.LLM_ENDPOINT_CAPACITY)
+        self.ewma_latency = None   # 성공한 요청 소요 시간(초)의 지수 이동 평균
+        self.last_sample_at = None
+        self.outstanding = 0
+        self.circuit = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.request_totals = {}   # 결과("ok"/"error"/"cancelled"/"bad_request") -> 요청 수
+        self.latency_sum = 0.0
+        self._client = None
+
+    def config_key(self):
+        return (self.name, self.base_url, self.api_key, self.model, self.capacity)
+
+    def client(self):
+        """프로세스 전역 연결 풀을 공유하는 이 엔드포인트의 OpenAI 클라이언트를 반환합니다."""
+        if self._client is None:
+            self._client = get_client_manager().get_client(self.api_key, self.base_url)
+        return self._client
+
+
+def load_endpoints(default_api_key=None, default_base_url=None, default_model=None):
+    """
+    AppConfig.LLM_ENDPOINTS(JSON 목록 문자열 또는 JSON 파일 경로)의 엔드포인트 목록을 반환합니다.
+    항목: {"name", "base_url", "api_key" 또는 "api_key_env", "model", "capacity"} (빠진 값은 기본 API Key/주소/모델 사용)
+    설정이 없거나 읽을 수 없으면 기본값으로 만든 단일 엔드포인트 목록을 반환합니다.
+    """
+    default_endpoint = [LLMEndpoint("default", default_base_url, default_api_key, default_model)]
+    if not AppConfig.LLM_ENDPOINTS:
+        return default_endpoint
+    try:
+        source = AppConfig.LLM_ENDPOINTS.strip()
+        if not source.startswith("["):
+            with open(source, 'r', encoding='utf-8') as f:
+                source = f.read()
+        endpoints = []
+        for index, item in enumerate(json.loads(source)):
+            api_key = item.get("api_key") or (os.getenv(item["api_key_env"]) if item.get("api_key_env") else None) or default_api_key
+            endpoints.append(LLMEndpoint(
+                item.get("name") or f"endpoint-{index + 1}",
+                item.get("base_url") or default_base_url,
+                api_key,
+                item.get("model") or default_model,
+                item.get("capacity")
+            ))
+        if not endpoints:
+            raise ValueError("엔드포인트 목록이 비어 있습니다.")
+        return endpoints
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        print(f"LLM 엔드포인트 설정(LLM_ENDPOINTS)을 읽을 수 없어 기본 엔드포인트를 사용합니다. 오류: {e}")
+        return default_endpoint
+
+
+class EndpointRouter:
+    """
+    여러 OpenAI 호환 엔드포인트 중 요청마다 예상 비용이 가장 낮은 곳을 고릅니다.
+    비용 = 관측 지연 EWMA x (진행 중 요청 수 + 1) / 용량 이므로, 빠르고 여유 있는 엔드포인트로 먼저 보내고
+    한 엔드포인트가 느려지면 그쪽의 EWMA와 대기 요청이 늘어나 자연스럽게 다른 엔드포인트로 분산됩니다.
+    연속 failure_threshold번 실패한 엔드포인트는 open_seconds 동안 회로를 열어 제외하고, 이후 요청 하나로만 회복 여부를 확인(half-open)합니다.
+    회로 차단은 엔드포인트가 2개 이상일 때만 적용합니다. (하나뿐이면 우회할 곳이 없으므로 재시도 정책에 맡김)
+    """
+    def __init__(self, endpoints, ewma_alpha=None, failure_threshold=None, open_seconds=None):
+        self.endpoints = list(endpoints)
+        self.ewma_alpha = ewma_alpha if ewma_alpha is not None else AppConfig.LLM_ENDPOINT_EWMA_ALPHA
+        self.failure_threshold = max(1, failure_threshold or AppConfig.LLM_ENDPOINT_FAILURE_THRESHOLD)
+        self.open_seconds = open_seconds if open_seconds is not None else AppConfig.LLM_ENDPOINT_OPEN_SECONDS
+        self._lock = threading.Lock()
+        # 확인 요청이 끝나거나 회로가 닫히면 엔드포인트를 기다리는 acquire를 깨움
+        self._released = threading.Condition(self._lock)
+
+    @property
+    def circuit_breaking(self):
+        return len(self.endpoints) > 1
+
+    def _effective_latency(self, endpoint, now):
+        """관측 지연 EWMA (관측 전이면 0으로 두어 먼저 한 번 시도되게 하고, 오래 선택되지 않았으면 반감기만큼 낮춰 다시 시도되게 함)"""
+        if endpoint.ewma_latency is None:
+            return 0.0
+        idle_seconds = now - endpoint.last_sample_at if endpoint.outstanding == 0 else 0.0
+        return endpoint.ewma_latency * 0.5 ** (idle_seconds / LATENCY_DECAY_HALF_LIFE_SECONDS)
+
+    def _is_available(self, endpoint, now):
+        """회로가 닫혀 있거나, 열린 지 open_seconds가 지나 확인 요청(half-open)을 보낼 수 있는지 판단합니다."""
+        if endpoint.circuit == "closed":
+            return True
+        if endpoint.circuit == "open" and now - endpoint.opened_at >= self.open_seconds:
+            return True
+        # half-open 상태에서는 확인 요청이 끝나기 전까지 다른 요청을 보내지 않음
+        return False
+
+    def acquire(self, exclude=(), deadline=None, cancel_event=None):
+        """
+        요청을 보낼 엔드포인트를 골라 진행 중 요청 수를 올린 뒤 반환합니다. (끝나면 반드시 release)
+        exclude(이번 호출에서 이미 시도한 엔드포인트 이름)는 다른 엔드포인트가 있으면 피합니다. 용량이 남은 엔드포인트를 우선합니다.
+        모든 회로가 열려 있으면 가장 먼저 확인 요청을 보낼 수 있는 시각까지 기다리고, 그 시각이 deadline(time.monotonic() 기준)을 넘으면
+        NoEndpointAvailable을 올립니다. 기다리는 중 cancel_event가 설정되면 LLMCallCancelled를 올립니다.
+        """
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                candidates = [endpoint for endpoint in self.endpoints if self._is_available(endpoint, now)]
+                if candidates:
+                    break
+                if cancel_event is not None and cancel_event.is_set():
+                    raise LLMCallCancelled()
+                # 열린 회로는 open_seconds가 지나면, half-open은 확인 요청이 끝나면(release가 깨움) 다시 보낼 수 있음
+                reopen_at = min((endpoint.opened_at + self.open_seconds for endpoint in self.endpoints if endpoint.circuit == "open"), default=None)
+                if deadline is not None and (now >= deadline or (reopen_at is not None and reopen_at > deadline)):
+                    raise NoEndpointAvailable("모든 LLM 엔드포인트가 연속 실패로 일시 차단되어 호출 제한 시간 안에 요청을 보낼 수 없습니다.")
+                # cancel_event는 Condition으로 알 수 없으므로 최대 0.5초씩 나눠서 확인
+                self._released.wait(timeout=min([0.5] + [at - now for at in (reopen_at, deadline) if at is not None]))
+            candidates = [endpoint for endpoint in candidates if endpoint.name not in exclude] or candidates
+            candidates = [endpoint for endpoint in candidates if endpoint.outstanding < endpoint.capacity] or candidates
+            endpoint = min(candidates, key=lambda candidate: self._effective_latency(candidate, now) * (candidate.outstanding + 1) / candidate.capacity)
+            if endpoint.circuit == "open":
+                endpoint.circuit = "half_open"
+            endpoint.outstanding += 1
+            return endpoint
+
+    def release(self, endpoint, latency=None, outcome="ok"):
+        """
+        요청 결과를 반영합니다. outcome: "ok"(latency로 EWMA 갱신), "error"(엔드포인트 실패, 연속 실패 시 회로 열기),
+        "rate_limited"(429: 엔드포인트는 응답하고 있으므로 실패로 세지 않고 백오프는 재시도 정책에 맡김),
+        "cancelled"/"bad_request"(헤지 요청에 져서 중단, 요청 형식 오류 등 엔드포인트와 무관한 종료, 지연/실패로 세지 않음)
+        """
+        with self._lock:
+            now = time.monotonic()
+            endpoint.outstanding -= 1
+            endpoint.request_totals[outcome] = endpoint.request_totals.get(outcome, 0) + 1
+            if outcome == "ok":
+                endpoint.ewma_latency = latency if endpoint.ewma_latency is None else endpoint.ewma_latency + self.ewma_alpha * (latency - endpoint.ewma_latency)
+                endpoint.last_sample_at = now
+                endpoint.latency_sum += latency
+                endpoint.consecutive_failures = 0
+                endpoint.circuit = "closed"
+            elif outcome == "error":
+                endpoint.consecutive_failures += 1
+                if self.circuit_breaking and (endpoint.circuit == "half_open" or endpoint.consecutive_failures >= self.failure_threshold):
+                    if endpoint.circuit != "open":
+                        print(f"LLM 엔드포인트 '{endpoint.name}'이(가) 연속 {endpoint.consecutive_failures}회 실패하여 {self.open_seconds}초 동안 제외합니다.")
+                    endpoint.circuit = "open"
+                    endpoint.opened_at = now
+            elif outcome == "rate_limited" and endpoint.circuit == "half_open":
+                # 확인 요청에 429로라도 응답했으면 엔드포인트는 살아 있으므로 회로를 닫음
+                endpoint.consecutive_failures = 0
+                endpoint.circuit = "closed"
+            elif endpoint.circuit == "half_open":
+                # 확인 요청이 중단되었으면 다음 요청이 다시 확인할 수 있도록 열린 상태로 되돌림 (대기 시간은 이미 지남)
+                endpoint.circuit = "open"
+            self._released.notify_all()
+
+    def stats(self):
+        """엔드포인트별 라우팅 상태를 반환합니다. (API Key는 포함하지 않음)"""
+        with self._lock:
+            return [{
+                "name": endpoint.name,
+                "base_url": endpoint.base_url,
+                "model": endpoint.model,
+                "capacity": endpoint.capacity,
+                "outstanding": endpoint.outstanding,
+                "ewma_latency_seconds": endpoint.ewma_latency,
+                "circuit": endpoint.circuit,
+                "consecutive_failures": endpoint.consecutive_failures,
+                "requests": dict(endpoint.request_totals),
+                "latency_seconds_sum": endpoint.latency_sum,
+            } for endpoint in self.endpoints]
+
+    def prometheus_lines(self):
+        """엔드포인트별 지표를 Prometheus 텍스트 노출 형식의 줄 목록으로 반환합니다."""
+        return endpoint_prometheus_lines(self.stats())
+
+
+def endpoint_prometheus_lines(stats):
+    """EndpointRouter.stats() 항목 목록을 지표별로 묶어 Prometheus 텍스트 줄 목록으로 변환합니다."""
+    labels = lambda endpoint: f'endpoint="{endpoint["name"]}",base_url="{endpoint["base_url"] or ""}"'
+    lines = [
+        "# HELP strategy_app_llm_endpoint_requests_total LLM requests per endpoint, by outcome (rate_limited: 429, not counted as a failure; cancelled: stopped after a hedged request won).",
+        "# TYPE strategy_app_llm_endpoint_requests_total counter",
+    ]
+    for endpoint in stats:
+        for outcome, count in endpoint["requests"].items():
+            lines.append(f'strategy_app_llm_endpoint_requests_total{{{labels(endpoint)},model="{endpoint["model"]}",outcome="{outcome}"}} {count}')
+    lines.append("# HELP strategy_app_llm_endpoint_latency_seconds_sum Total duration of successful LLM requests per endpoint.")
+    lines.append("# TYPE strategy_app_llm_endpoint_latency_seconds_sum counter")
+    for endpoint in stats:
+        lines.append(f'strategy_app_llm_endpoint_latency_seconds_sum{{{labels(endpoint)}}} {endpoint["latency_seconds_sum"]:.6f}')
+    lines.append("# HELP strategy_app_llm_endpoint_latency_ewma_seconds Exponentially weighted moving average of successful request duration per endpoint.")
+    lines.append("# TYPE strategy_app_llm_endpoint_latency_ewma_seconds gauge")
+    for endpoint in stats:
+        if endpoint["ewma_latency_seconds"] is not None:
+            lines.append(f'strategy_app_llm_endpoint_latency_ewma_seconds{{{labels(endpoint)}}} {endpoint["ewma_latency_seconds"]:.6f}')
+    lines.append("# HELP strategy_app_llm_endpoint_outstanding LLM requests in progress per endpoint.")
+    lines.append("# TYPE strategy_app_llm_endpoint_outstanding gauge")
+    for endpoint in stats:
+        lines.append(f'strategy_app_llm_endpoint_outstanding{{{labels(endpoint)}}} {endpoint["outstanding"]}')
+    lines.append("# HELP strategy_app_llm_endpoint_circuit_state Circuit breaker state per endpoint (0 closed, 1 half-open, 2 open).")
+    lines.append("# TYPE strategy_app_llm_endpoint_circuit_state gauge")
+    for endpoint in stats:
+        lines.append(f'strategy_app_llm_endpoint_circuit_state{{{labels(endpoint)}}} {CIRCUIT_STATES[endpoint["circuit"]]}')
+    return lines
+
+
+# 엔드포인트 구성(이름, 주소, 키, 모델, 용량)별로 프로세스 전역에서 공유 (Streamlit rerun마다 관측 지연/회로 상태가 초기화되지 않도록)
+_shared_routers = {}
+_shared_routers_lock = threading.Lock()
+
+def get_endpoint_router(endpoints):
+    """같은 엔드포인트 구성에 대해 프로세스 전역에서 공유되는 EndpointRouter를 반환합니다."""
+    key = tuple(endpoint.config_key() for endpoint in endpoints)
+    with _shared_routers_lock:
+        router = _shared_routers.get(key)
+        if router is None:
+            router = _shared_routers[key] = EndpointRouter(endpoints)
+        return router
+
+
+def router_prometheus_lines():
+    """공유 라우터 전체의 엔드포인트별 지표 줄 목록을 반환합니다."""
+    with _shared_routers_lock:
+        routers = list(_shared_routers.values())
+    return endpoint_prometheus_lines([endpoint for router in routers for endpoint in router.stats()])
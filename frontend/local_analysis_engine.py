@@ -0,0 +1,195 @@
+import json
+import math
+import re
+from metrics import RequestTrace
+
+# 트레이스/지표에 기록하는 로컬 분석의 모델 이름
+LOCAL_MODEL_NAME = "local-statistics"
+
+# 한국어 전략 문구의 표현 -> 관련 컬럼 이름에 들어가는 영어 단어 (공백/대소문자 무시)
+_KEYWORD_COLUMN_HINTS = {
+    "계약": ("contract",), "결제": ("payment",), "연체": ("paymentdelay", "delay"), "지연": ("delay",),
+    "상담": ("support",), "고객센터": ("support",), "문의": ("support",), "지원": ("support",),
+    "사용": ("usage",), "이용": ("usage",), "빈도": ("frequency",), "구독": ("subscription",),
+    "요금제": ("subscriptiontype", "plan"), "플랜": ("plan", "subscriptiontype"), "등급": ("tier", "type"),
+    "지출": ("spend",), "결제액": ("spend",), "금액": ("spend", "amount"),
+    "가입 기간": ("tenure",), "가입기간": ("tenure",), "장기 고객": ("tenure",), "계약 기간": ("contractlength",),
+    "나이": ("age",), "연령": ("age",), "성별": ("gender",), "최근": ("lastinteraction", "recency"), "접속": ("lastinteraction",),
+    "조회": ("view",), "좋아요": ("like",), "댓글": ("comment",), "카테고리": ("category",), "태그": ("tag",),
+    "구매": ("purchase",), "장바구니": ("cart",), "배송": ("delivery", "shipping"), "할인": ("discount",),
+    "거래": ("transaction",), "대출": ("loan",), "신용": ("credit",),
+}
+_DECREASE_WORDS = ("낮추", "낮춰", "감소", "줄이", "줄여", "방지", "예방", "억제", "막기", "막아", "막는", "막고", "reduce", "lower", "decrease", "prevent")
+_INCREASE_WORDS = ("높이", "높여", "증가", "늘리", "늘려", "향상", "확대", "increase", "raise", "boost", "grow")
+# 타겟 컬럼 이름만으로 '낮을수록 좋은' 지표인지 추정할 때 쓰는 단어
+_NEGATIVE_TARGET_WORDS = ("churn", "이탈", "cancel", "해지", "default", "연체", "fraud", "사기", "delay", "complaint")
+
+
+def _normalize(text):
+    return re.sub(r"[\s_\-]+", "", str(text).lower())
+
+
+def _fmt(value):
+    """숫자를 요약 문장용으로 짧게 표시합니다."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "N/A"
+    return f"{value:.4g}"
+
+
+class LocalAnalysisEngine:
+    """
+    LLM 없이 전체 데이터 프로파일의 세그먼트별 타겟 평균(lift), 상관비(η²), 상관계수로 전략 타당성을 계산하는 로컬 분석 엔진입니다.
+    AnalysisEngine.run_analysis와 같은 인자/반환값(strategy_analysis 딕셔너리, 전체 JSON 문자열)을 사용하며,
+    같은 데이터셋 버전과 입력값에 대해서는 항상 같은 결과를 밀리초 단위로 반환합니다. (API 장애 시 대체 또는 LLM 호출 전 사전 검토용)
+    """
+    def __init__(self, data_profiler):
+        self.data_profiler = data_profiler
+        self.llm_model = LOCAL_MODEL_NAME
+        self.last_cache_hit = False
+
+    @staticmethod
+    def _matched_columns(text, columns):
+        """전략 문구가 직접(컬럼 이름/단어) 또는 한국어 표현으로 언급하는 컬럼 목록을 반환합니다."""
+        normalized_text = _normalize(text)
+        hint_tokens = [token for keyword, tokens in _KEYWORD_COLUMN_HINTS.items() if _normalize(keyword) in normalized_text for token in tokens]
+        matched = []
+        for col in columns:
+            normalized_col = _normalize(col)
+            words = [_normalize(word) for word in re.split(r"[\s_\-]+", str(col)) if len(word) >= 3]
+            if (normalized_col in normalized_text
+                    or any(word in normalized_text for word in words)
+                    or any(token in normalized_col for token in hint_tokens)):
+                matched.append(col)
+        return matched
+
+    @staticmethod
+    def _wants_decrease(text, target_column):
+        """전략이 타겟 지표를 낮추려는 것인지 판단합니다. (문구에 방향이 없으면 타겟 이름으로 추정)"""
+        lowered = text.lower()
+        decrease = any(word in lowered for word in _DECREASE_WORDS)
+        increase = any(word in lowered for word in _INCREASE_WORDS)
+        if decrease != increase:
+            return decrease
+        return any(word in str(target_column).lower() for word in _NEGATIVE_TARGET_WORDS)
+
+    @staticmethod
+    def _risk_segments(grouped, overall, wants_decrease):
+        """개선이 필요한(타겟이 전체 평균보다 나쁜) 세그먼트를 나쁜 순서로 반환합니다."""
+        worse = grouped[grouped["mean"] > overall] if wants_decrease else grouped[grouped["mean"] < overall]
+        return worse.sort_values("mean", ascending=not wants_decrease)
+
+    def analyze(self, strategy_data, profile):
+        """프로파일로 derived_kpis와 strategy_analysis를 계산하여 AnalysisEngine과 같은 구조의 딕셔너리를 반환합니다."""
+        target_column = strategy_data['target_column']
+        if target_column not in profile.df.columns:
+            raise ValueError(f"타겟 컬럼 '{target_column}'을(를) 데이터에서 찾을 수 없습니다.")
+
+        label, overall, effects, rates = profile.segment_effects(target_column)
+        correlations = profile.correlations(target_column)
+        strategy_text = f"{strategy_data['ai_strategy']} {strategy_data['key_feature']}"
+        wants_decrease = self._wants_decrease(strategy_text, target_column)
+        direction = "낮을수록" if wants_decrease else "높을수록"
+
+        matched = [col for col in self._matched_columns(strategy_text, list(effects)) if effects.get(col, 0) > 0]
+        matched.sort(key=lambda col: effects[col], reverse=True)
+        strongest_col = next(iter(effects), None)
+        eta_max = math.sqrt(effects[strongest_col]) if strongest_col else 0.0
+        eta_matched = math.sqrt(effects[matched[0]]) if matched else 0.0
+
+        # 타당성: 전략이 다루는 요인의 설명력(η 0.5 이상이면 만점) + 데이터상 가장 강한 요인 대비 비율
+        validity_score = 30
+        if matched:
+            validity_score += 50 * min(1.0, eta_matched / 0.5) + 20 * (eta_matched / eta_max if eta_max else 0.0)
+        validity_score = max(0, min(100, int(round(validity_score))))
+
+        # 성공 확률: 타당성 x (전략이 다루는 컬럼에서 개선이 필요한 세그먼트에 속한 행의 비율만큼 가중)
+        at_risk_share = 0.0
+        if matched:
+            grouped = rates[matched[0]]
+            at_risk_share = float(self._risk_segments(grouped, overall, wants_decrease)["count"].sum() / grouped["count"].sum())
+        success_probability = max(0, min(100, int(round(validity_score * (0.6 + 0.4 * at_risk_share))))) if matched else max(0, validity_score - 10)
+
+        def describe(col):
+            grouped = rates[col]
+            top, bottom = grouped.iloc[0], grouped.iloc[-1]
+            gap = f", 격차 {top['mean'] / bottom['mean']:.2f}배" if bottom['mean'] else ""
+            return (f"최고 '{grouped.index[0]}' {_fmt(top['mean'])} (n={int(top['count'])}), "
+                    f"최저 '{grouped.index[-1]}' {_fmt(bottom['mean'])} (n={int(bottom['count'])}){gap}, 설명력 η² {effects[col] * 100:.1f}%")
+
+        derived_kpis = {f"전체 {label}": f"{_fmt(overall)} (전체 {profile.total_row_count:,}행, {direction} 좋은 지표로 판단)"}
+        for col in list(effects)[:4]:
+            derived_kpis[f"{col}별 {label}"] = describe(col)
+        if not correlations.empty:
+            derived_kpis[f"{label}과의 상관계수 상위"] = ", ".join(f"{col} {value:+.3f}" for col, value in list(correlations.items())[:3])
+        elif len(effects) > 4:
+            col = list(effects)[4]
+            derived_kpis[f"{col}별 {label}"] = describe(col)
+
+        summary = [f"[로컬 통계 분석] 전체 {label}은(는) {_fmt(overall)}입니다."]
+        if matched:
+            col = matched[0]
+            risk = self._risk_segments(rates[col], overall, wants_decrease)
+            summary.append(f"전략 문구와 연결된 컬럼은 {', '.join(matched[:3])}이며, 이 중 '{col}'이(가) {label} 변동의 {effects[col] * 100:.1f}%를 설명합니다(η²).")
+            if not risk.empty:
+                summary.append(
+                    f"'{col}'이(가) '{risk.index[0]}'인 세그먼트의 {label}이(가) {_fmt(risk['mean'].iloc[0])}로 전체 대비 {risk['mean'].iloc[0] / overall:.2f}배이며, "
+                    f"개선이 필요한 세그먼트가 전체의 {at_risk_share * 100:.1f}%를 차지합니다." if overall else
+                    f"'{col}'이(가) '{risk.index[0]}'인 세그먼트의 {label}이(가) {_fmt(risk['mean'].iloc[0])}입니다."
+                )
+            if strongest_col and strongest_col not in matched:
+                summary.append(f"다만 데이터상 영향이 가장 큰 요인은 '{strongest_col}'(η² {effects[strongest_col] * 100:.1f}%)인데 전략이 이를 직접 다루지 않아 점수를 낮췄습니다.")
+        else:
+            summary.append("전략 문구에서 데이터 컬럼과 직접 연결되는 근거를 찾지 못해 데이터 근거가 약한 전략으로 평가했습니다.")
+            if strongest_col:
+                summary.append(f"데이터상 영향이 가장 큰 요인은 '{strongest_col}'(η² {effects[strongest_col] * 100:.1f}%)입니다.")
+        summary.append("이 결과는 LLM 없이 데이터 집계만으로 계산한 사전 검토이며, 전략의 실행 비용과 리스크는 평가하지 않았습니다.")
+
+        alternative_strategies = []
+        for col in [col for col in effects if col not in matched] + matched:
+            risk = self._risk_segments(rates[col], overall, wants_decrease)
+            if risk.empty:
+                continue
+            share = risk["count"].iloc[0] / rates[col]["count"].sum() * 100
+            alternative_strategies.append(
+                f"'{col}'이(가) '{risk.index[0]}'인 고객군(전체의 {share:.1f}%, {label} {_fmt(risk['mean'].iloc[0])})을 우선 대상으로 한 "
+                f"{strategy_data['target_column']} 개선 전략"
+            )
+            if len(alternative_strategies) == 2:
+                break
+        if not alternative_strategies:
+            alternative_strategies.append("데이터에서 뚜렷한 고위험 세그먼트가 없으므로 전체 고객 대상 A/B 테스트로 효과를 먼저 검증")
+
+        return {
+            "derived_kpis": derived_kpis,
+            "strategy_analysis": {
+                "validity_score": validity_score,
+                "success_probability_percent": success_probability,
+                "analysis_summary": " ".join(summary),
+                "alternative_strategies": alternative_strategies,
+            },
+        }
+
+    def run_analysis(self, strategy_data, raw_data_input=None, data_profile=None, dataset_fingerprint=None, use_cache=True, on_partial=None, trace=None):
+        """
+        AnalysisEngine.run_analysis와 같은 형식으로 (strategy_analysis 딕셔너리, 전체 JSON 문자열)을 반환합니다. (실패 시 (None, None))
+        원시 데이터 샘플과 프롬프트용 프로파일 요약(raw_data_input, data_profile)은 사용하지 않고 전체 파일 프로파일을 직접 계산에 사용합니다.
+        """
+        self.last_cache_hit = False
+        trace = trace or RequestTrace(strategy_data['business_sector'])
+        try:
+            with trace.span("local_analysis"):
+                profile = self.data_profiler.load_profile(strategy_data['business_sector'])
+                if profile is None:
+                    raise ValueError("데이터 프로파일을 만들 수 없습니다.")
+                full_analysis_result = self.analyze(strategy_data, profile)
+                json_string = json.dumps(full_analysis_result, ensure_ascii=False)
+            trace.record_usage(None, LOCAL_MODEL_NAME)
+        except Exception as e:
+            trace.status = "error"
+            print(f"로컬 분석 중 오류가 발생했습니다. 오류: {e}")
+            return None, None
+
+        analysis_result = full_analysis_result["strategy_analysis"]
+        if on_partial:
+            on_partial(analysis_result)
+        return analysis_result, json_string
@@ -0,0 +1,355 @@
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+# config.py에서 설정 정보 로드
+from config import AppConfig
+from llm_client import get_client_manager
+from admission_control import get_admission_controller
+from llm_router import router_prometheus_lines
+
+# 단계별 소요 시간 히스토그램 구간(초)
+DURATION_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 단계별 P50/P95/P99 계산에 사용하는 최근 기록 수
+QUANTILE_WINDOW = 1000
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def percentile(sorted_values, quantile):
+    """정렬된 값 목록의 분위수를 최근접 순위(nearest-rank) 방식으로 반환합니다."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(quantile * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class RequestTrace:
+    """
+    요청 하나의 단계별 소요 시간(데이터 로드, 프롬프트 구성, LLM 호출, JSON 파싱, 로그 저장)과 토큰 사용량을 기록합니다.
+    """
+    def __init__(self, business_sector=None):
+        self.business_sector = business_sector
+        self.started_at = time.time()
+        self.stages = {}  # 단계 이름 -> 소요 시간(초), 기록 순서 유지
+        self.model = None
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.cached_prompt_tokens = None  # 제공자 프롬프트 캐시에서 처리된 입력 토큰 수 (앞부분이 이전 요청과 같을 때)
+        self.prompt_template_version = None
+        self.cache_hit = False
+        self.status = "ok"
+        self.llm_attempts = 0     # 재시도를 포함한 LLM 요청 횟수
+        self.hedged = False       # 헤지(중복) 요청을 보냈는지
+        self.hedge_won = False    # 헤지 요청의 응답을 사용했는지
+        self.llm_endpoint = None  # 응답한 LLM 엔드포인트 이름
+        self.response_validation = None  # LLM 응답 검증 결과: "valid"/"repaired"/"requeried"/"failed" (캐시 적중/로컬 분석은 None)
+        self.response_repairs = []       # 적용한 로컬 복구 종류 목록
+        self.requeried_fields = []       # 누락되어 다시 요청한 필드 목록
+        self.admission_queue_position = None  # LLM 호출 허가 대기열에 들어갈 때의 대기 순서 (0이면 바로 허가)
+        self.admission_rejected = None        # 허가를 받지 못한 사유 ("queue_full"/"timeout")
+
+    @contextmanager
+    def span(self, stage):
+        """with 블록의 실행 시간을 stage 이름으로 기록합니다. (같은 단계가 여러 번이면 누적)"""
+        started_at = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.stages[stage] = self.stages.get(stage, 0.0) + (time.perf_counter() - started_at)
+
+    def record_usage(self, usage, model):
+        """OpenAI 응답의 usage 객체에서 토큰 수를 기록합니다. (누락 필드 재요청처럼 한 요청에서 여러 번 호출하면 누적)"""
+        self.model = model
+        if usage is None:
+            return
+        self.prompt_tokens = self._add_tokens(self.prompt_tokens, getattr(usage, "prompt_tokens", None))
+        self.completion_tokens = self._add_tokens(self.completion_tokens, getattr(usage, "completion_tokens", None))
+        # 프롬프트 캐시를 지원하지 않는 OpenAI 호환 서버는 prompt_tokens_details를 주지 않음
+        self.cached_prompt_tokens = self._add_tokens(self.cached_prompt_tokens, getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None))
+
+    @staticmethod
+    def _add_tokens(total, count):
+        if count is None:
+            return total
+        return (total or 0) + count
+
+    def record_response_validation(self, outcome, validation):
+        """응답 검증 결과(outcome)와 SchemaValidationResult에 적용된 로컬 복구 목록을 기록합니다."""
+        self.response_validation = outcome
+        self.response_repairs = list(validation.repairs)
+
+    def record_call_outcome(self, outcome):
+        """LLMCallPolicy 호출 결과(LLMCallOutcome)의 시도 횟수, 헤지 여부, 응답한 엔드포인트를 기록합니다."""
+        self.llm_attempts = outcome.attempts
+        self.hedged = outcome.hedged
+        self.hedge_won = outcome.hedge_won
+        self.llm_endpoint = outcome.endpoint
+
+    def record_call_failure(self, error):
+        """실패한 LLMCallPolicy 호출의 시도 횟수를 기록합니다. (재시도 지표에 실패한 요청의 재시도도 포함되도록)"""
+        attempts = getattr(error, "llm_attempts", None)
+        if attempts is not None:
+            self.llm_attempts = attempts
+
+    def total_seconds(self):
+        return sum(self.stages.values())
+
+    def to_dict(self):
+        return {
+            "timestamp": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "business_sector": self.business_sector,
+            "status": self.status,
+            "cache_hit": self.cache_hit,
+            "model": self.model,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "prompt_template_version": self.prompt_template_version,
+            "llm_attempts": self.llm_attempts,
+            "hedged": self.hedged,
+            "hedge_won": self.hedge_won,
+            "llm_endpoint": self.llm_endpoint,
+            "response_validation": self.response_validation,
+            "response_repairs": self.response_repairs,
+            "requeried_fields": self.requeried_fields,
+            "admission_queue_position": self.admission_queue_position,
+            "admission_rejected": self.admission_rejected,
+            "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()},
+            "total_ms": round(self.total_seconds() * 1000, 3),
+        }
+
+
+class MetricsRecorder:
+    """
+    RequestTrace를 회전(rotating) JSONL 파일에 기록하고, 프로세스 단위 누적 지표를 Prometheus 텍스트 형식으로 제공합니다.
+    """
+    def __init__(self, metrics_dir, max_bytes, backup_count, dump_interval=0.0):
+        self.metrics_dir = metrics_dir
+        self.dump_interval = dump_interval
+        self._lock = threading.Lock()
+        self._dump_lock = threading.Lock()          # metrics.prom 쓰기 직렬화
+        self._dump_state_lock = threading.Lock()
+        self._dump_pending = False                  # 예약된 metrics.prom 갱신이 있는지
+        self._last_dump_at = float("-inf")
+        self._stage_buckets = {}   # stage -> 구간별 누적 개수 목록
+        self._stage_sums = {}      # stage -> 누적 소요 시간
+        self._stage_counts = {}    # stage -> 기록 횟수
+        self._token_totals = {}    # (model, "prompt"/"completion"/"cached_prompt") -> 누적 토큰 수
+        self._request_totals = {}  # (status, cache_hit) -> 요청 수
+        self._recent_durations = {}  # stage -> 최근 QUANTILE_WINDOW개의 소요 시간 (분위수 계산용)
+        self._llm_retry_total = 0    # 첫 시도를 제외한 LLM 재시도 횟수
+        self._hedge_totals = {}      # 헤지 요청 결과("won"/"lost") -> 요청 수
+        self._response_validation_totals = {}  # 응답 검증 결과("valid"/"repaired"/"requeried"/"failed") -> 요청 수
+        self._response_repair_totals = {}      # 로컬 복구 종류 -> 적용 횟수
+
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._logger = logging.getLogger("strategy_app.metrics")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+
+    def _ensure_file_handler(self):
+        """첫 기록 시점에 지표 폴더와 회전 파일 핸들러를 준비합니다. (import만으로 폴더가 생기지 않도록)"""
+        if self._logger.handlers:
+            return
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            handler = RotatingFileHandler(os.path.join(self.metrics_dir, "metrics.jsonl"), maxBytes=self.max_bytes, backupCount=self.backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(handler)
+        except OSError as e:
+            print(f"지표 파일 초기화 중 오류가 발생했습니다. 오류: {e}")
+
+    def record(self, trace):
+        """요청 기록을 파일에 남기고 누적 지표에 반영한 뒤, Prometheus 텍스트 파일 갱신을 예약합니다."""
+        with self._lock:
+            for stage, seconds in trace.stages.items():
+                buckets = self._stage_buckets.setdefault(stage, [0] * len(DURATION_BUCKETS))
+                for index, upper_bound in enumerate(DURATION_BUCKETS):
+                    if seconds <= upper_bound:
+                        buckets[index] += 1
+                self._stage_sums[stage] = self._stage_sums.get(stage, 0.0) + seconds
+                self._stage_counts[stage] = self._stage_counts.get(stage, 0) + 1
+                self._recent_durations.setdefault(stage, deque(maxlen=QUANTILE_WINDOW)).append(seconds)
+
+            if trace.llm_attempts > 1:
+                self._llm_retry_total += trace.llm_attempts - 1
+            if trace.hedged:
+                hedge_key = "won" if trace.hedge_won else "lost"
+                self._hedge_totals[hedge_key] = self._hedge_totals.get(hedge_key, 0) + 1
+
+            if trace.response_validation:
+                self._response_validation_totals[trace.response_validation] = self._response_validation_totals.get(trace.response_validation, 0) + 1
+                for repair in trace.response_repairs:
+                    self._response_repair_totals[repair] = self._response_repair_totals.get(repair, 0) + 1
+
+            if trace.model:
+                for token_type, count in (("prompt", trace.prompt_tokens), ("completion", trace.completion_tokens), ("cached_prompt", trace.cached_prompt_tokens)):
+                    if count:
+                        key = (trace.model, token_type)
+                        self._token_totals[key] = self._token_totals.get(key, 0) + count
+
+            request_key = (trace.status, "true" if trace.cache_hit else "false")
+            self._request_totals[request_key] = self._request_totals.get(request_key, 0) + 1
+            self._ensure_file_handler()
+
+        self._logger.info(json.dumps(trace.to_dict(), ensure_ascii=False))
+        self._schedule_dump()
+
+    def _schedule_dump(self):
+        """
+        metrics.prom 갱신을 백그라운드 타이머로 예약합니다. 마지막 갱신 후 dump_interval이 지나기 전의 요청은
+        이미 예약된 한 번의 갱신에 함께 반영되므로, 요청 스레드는 파일을 쓰지 않고 요청 수만큼 파일을 다시 쓰지도 않습니다.
+        """
+        with self._dump_state_lock:
+            if self._dump_pending:
+                return
+            self._dump_pending = True
+            delay = max(0.0, self._last_dump_at + self.dump_interval - time.monotonic())
+        timer = threading.Timer(delay, self._run_scheduled_dump)
+        timer.daemon = True
+        timer.start()
+
+    def _run_scheduled_dump(self):
+        with self._dump_state_lock:
+            if not self._dump_pending:
+                return
+            self._dump_pending = False
+            self._last_dump_at = time.monotonic()
+        self.dump_prometheus()
+
+    def flush(self):
+        """예약된 metrics.prom 갱신이 있으면 바로 저장합니다. (프로세스 종료 시 마지막 요청까지 반영)"""
+        self._run_scheduled_dump()
+
+    def stage_percentiles(self, stage):
+        """최근 QUANTILE_WINDOW개 기록 기준 단계 소요 시간의 {분위수: 초}를 반환합니다. (기록이 없으면 빈 dict)"""
+        with self._lock:
+            ordered = sorted(self._recent_durations.get(stage, ()))
+        if not ordered:
+            return {}
+        return {quantile: percentile(ordered, quantile) for quantile in QUANTILES}
+
+    def prometheus_text(self):
+        """누적 지표를 Prometheus 텍스트 노출 형식으로 반환합니다."""
+        lines = [
+            "# HELP strategy_app_stage_duration_seconds Duration of each analysis request stage.",
+            "# TYPE strategy_app_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for stage, buckets in self._stage_buckets.items():
+                for upper_bound, count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'strategy_app_stage_duration_seconds_bucket{{stage="{stage}",le="{upper_bound}"}} {count}')
+                lines.append(f'strategy_app_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {self._stage_counts[stage]}')
+                lines.append(f'strategy_app_stage_duration_seconds_sum{{stage="{stage}"}} {self._stage_sums[stage]:.6f}')
+                lines.append(f'strategy_app_stage_duration_seconds_count{{stage="{stage}"}} {self._stage_counts[stage]}')
+
+            lines.append("# HELP strategy_app_stage_duration_quantile_seconds Stage duration percentiles over the most recent requests.")
+            lines.append("# TYPE strategy_app_stage_duration_quantile_seconds gauge")
+            for stage, durations in self._recent_durations.items():
+                ordered = sorted(durations)
+                for quantile in QUANTILES:
+                    lines.append(f'strategy_app_stage_duration_quantile_seconds{{stage="{stage}",quantile="{quantile}"}} {percentile(ordered, quantile):.6f}')
+
+            lines.append("# HELP strategy_app_llm_retries_total LLM request retries after transient errors.")
+            lines.append("# TYPE strategy_app_llm_retries_total counter")
+            lines.append(f"strategy_app_llm_retries_total {self._llm_retry_total}")
+
+            lines.append("# HELP strategy_app_llm_hedged_requests_total Analysis requests that sent a hedged duplicate LLM request, by whether the hedge won.")
+            lines.append("# TYPE strategy_app_llm_hedged_requests_total counter")
+            for outcome, count in self._hedge_totals.items():
+                lines.append(f'strategy_app_llm_hedged_requests_total{{outcome="{outcome}"}} {count}')
+
+            lines.append("# HELP strategy_app_llm_response_validation_total LLM responses by schema validation outcome (repaired: fixed locally, requeried: missing fields requested again, failed: unusable).")
+            lines.append("# TYPE strategy_app_llm_response_validation_total counter")
+            for outcome, count in self._response_validation_totals.items():
+                lines.append(f'strategy_app_llm_response_validation_total{{outcome="{outcome}"}} {count}')
+
+            lines.append("# HELP strategy_app_llm_response_repairs_total Local repairs applied to LLM responses, by repair kind.")
+            lines.append("# TYPE strategy_app_llm_response_repairs_total counter")
+            for repair, count in self._response_repair_totals.items():
+                lines.append(f'strategy_app_llm_response_repairs_total{{kind="{repair}"}} {count}')
+
+            lines.append("# HELP strategy_app_llm_tokens_total LLM tokens used, by model and token type (cached_prompt is the part of prompt served from the provider prompt cache).")
+            lines.append("# TYPE strategy_app_llm_tokens_total counter")
+            for (model, token_type), count in self._token_totals.items():
+                lines.append(f'strategy_app_llm_tokens_total{{model="{model}",type="{token_type}"}} {count}')
+
+            lines.append("# HELP strategy_app_requests_total Analysis requests, by status and response cache hit.")
+            lines.append("# TYPE strategy_app_requests_total counter")
+            for (status, cache_hit), count in self._request_totals.items():
+                lines.append(f'strategy_app_requests_total{{status="{status}",cache_hit="{cache_hit}"}} {count}')
+        lines.extend(get_client_manager().prometheus_lines())
+        lines.extend(get_admission_controller().prometheus_lines())
+        lines.extend(router_prometheus_lines())
+        return "\n".join(lines) + "\n"
+
+    def dump_prometheus(self):
+        """Prometheus textfile collector가 읽을 수 있도록 metrics.prom 파일로 저장합니다."""
+        prom_path = os.path.join(self.metrics_dir, "metrics.prom")
+        # 같은 프로세스의 다른 스레드(예약 갱신, 종료 시 flush)와 임시 파일이 겹치지 않도록 스레드 id도 붙이고, 쓰기는 한 번에 하나씩
+        temp_path = f"{prom_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._dump_lock:
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    f.write(self.prometheus_text())
+                os.replace(temp_path, prom_path)
+            except OSError as e:
+                print(f"Prometheus 지표 저장 중 오류가 발생했습니다. 오류: {e}")
+
+
+_shared_metrics_recorder = MetricsRecorder(AppConfig.METRICS_DIR, AppConfig.METRICS_FILE_MAX_BYTES, AppConfig.METRICS_FILE_BACKUP_COUNT, AppConfig.METRICS_PROM_DUMP_INTERVAL_SECONDS)
+# 프로세스 종료 시 아직 반영하지 않은 지표까지 metrics.prom에 저장
+atexit.register(_shared_metrics_recorder.flush)
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+def get_metrics_recorder():
+    """프로세스 전역에서 공유되는 지표 기록기를 반환합니다."""
+    return _shared_metrics_recorder
+
+
+def start_metrics_server(port):
+    """
+    GET /metrics 로 Prometheus 텍스트 지표를 제공하는 HTTP 서버를 백그라운드에서 시작합니다.
+    Streamlit rerun마다 호출되어도 프로세스당 한 번만 시작합니다. (port가 0이면 시작하지 않음)
+    """
+    global _metrics_server
+    if not port:
+        return None
+    with _metrics_server_lock:
+        if _metrics_server is not None:
+            return _metrics_server
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?')[0] != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = _shared_metrics_recorder.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        try:
+            _metrics_server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+        except OSError as e:
+            print(f"지표 서버 시작 중 오류가 발생했습니다. (포트 {port}) 오류: {e}")
+            return None
+        _metrics_server.daemon_threads = True
+        threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+        return _metrics_server
@@ -0,0 +1,216 @@
+import csv
+import io
+import re
+# config.py에서 설정 정보 로드
+from config import AppConfig
+
+# 토큰 수 추정용 패턴: 영문 단어, 숫자(3자리 단위), 비ASCII 문자(한글 등), 기호를 각각 토큰 후보로 봅니다.
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\x00-\x7F]|[^\sA-Za-z\d]")
+# 식별자 컬럼 이름 패턴 (예: CustomerID, CustomerId, Customer ID, user_id, id, order-no): 'id'/'no'가 구분자 뒤나 대문자로 시작하는
+# 별도 단어일 때만 식별자로 봄 (Amount Paid, Valid, Android, Grid, Casino 등은 제외)
+_IDENTIFIER_PATTERN = re.compile(r"(?i:(?:^|[\s_-])(?:u?uid|id|no))$|[a-z](?:ID|Id)$")
+
+
+def is_identifier_name(column):
+    """컬럼 이름이 식별자 형태(ID/번호)인지 확인합니다."""
+    return bool(_IDENTIFIER_PATTERN.search(str(column).strip()))
+
+
+def estimate_tokens(text):
+    """
+    외부 토크나이저 없이 텍스트의 토큰 수를 대략적으로(다소 넉넉하게) 추정합니다.
+    (영문 단어는 6글자당 1토큰, 숫자는 3자리당 1토큰, 한글 등 비ASCII 문자와 기호는 글자당 1토큰)
+    """
+    count = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        piece = match.group()
+        if piece[0].isascii() and piece[0].isalpha():
+            count += 1 + len(piece) // 6
+        else:
+            count += 1
+    return count
+
+
+class PackedSample:
+    """
+    토큰 예산에 맞게 압축된 원시 데이터 샘플과 압축 통계를 보관합니다.
+    """
+    def __init__(self, text, row_count, candidate_row_count, dropped_columns, encoded_columns, estimated_tokens):
+        self.text = text
+        self.row_count = row_count
+        self.candidate_row_count = candidate_row_count
+        self.dropped_columns = dropped_columns
+        self.encoded_columns = encoded_columns
+        self.estimated_tokens = estimated_tokens
+
+    def stats(self):
+        """압축 결과를 딕셔너리로 반환합니다."""
+        return {
+            "row_count": self.row_count,
+            "candidate_row_count": self.candidate_row_count,
+            "dropped_columns": self.dropped_columns,
+            "encoded_columns": self.encoded_columns,
+            "estimated_tokens": self.estimated_tokens,
+        }
+
+
+class PromptPacker:
+    """
+    DataLoader가 만든 원시 데이터(헤더 + 후보 행)를 토큰 예산 안에 최대한 많이 담도록 압축합니다.
+    1) 식별자 컬럼 제거  2) 반복되는 범주형 값을 짧은 코드로 사전 인코딩  3) 예산에 맞는 행 수를 고르게 선택
+    """
+    def __init__(self, token_budget=None):
+        self.token_budget = token_budget if token_budget is not None else AppConfig.PROMPT_TOKEN_BUDGET
+
+    @staticmethod
+    def _is_number(value):
+        try:
+            float(value)
+            return True
+        except ValueError:
+            return False
+
+    @classmethod
+    def _is_fractional(cls, value):
+        """정수가 아닌 숫자(예: 12.5, 1e3)인지 확인합니다."""
+        if not cls._is_number(value):
+            return False
+        try:
+            int(value)
+            return False
+        except ValueError:
+            return True
+
+    def _find_identifier_columns(self, header, rows):
+        """이름이 식별자 형태이고, 값이 정수 또는 문자열이며 모두 고유한 컬럼의 인덱스를 찾습니다. (실수 컬럼은 측정값이므로 제외)"""
+        identifier_indexes = []
+        for index, column in enumerate(header):
+            if not is_identifier_name(column):
+                continue
+            values = [row[index] for row in rows if index < len(row)]
+            if values and len(set(values)) == len(values) and not any(self._is_fractional(value.strip()) for value in values):
+                identifier_indexes.append(index)
+        return identifier_indexes
+
+    def _build_codebooks(self, header, rows, skip_indexes):
+        """
+        숫자가 아니고 값이 반복되는 컬럼에 대해 값 -> 코드(0, 1, 2, ...) 사전을 만듭니다.
+        코드로 바꿔도 토큰이 줄지 않는 컬럼은 인코딩하지 않습니다.
+        """
+        codebooks = {}
+        for index, column in enumerate(header):
+            if index in skip_indexes:
+                continue
+            values = [row[index] for row in rows if index < len(row)]
+            if not values:
+                continue
+            distinct_values = [value for value in dict.fromkeys(values) if value]  # 처음 등장한 순서 유지, 빈 값 제외
+            if len(distinct_values) > AppConfig.PROFILE_MAX_SEGMENTS or len(distinct_values) == len(values):
+                continue
+            if all(self._is_number(value) for value in distinct_values):
+                continue
+
+            codebook = {value: str(code) for code, value in enumerate(distinct_values)}
+            original_tokens = sum(estimate_tokens(value) for value in values)
+            encoded_tokens = len(values) + sum(estimate_tokens(f"{code}={value}, ") for value, code in codebook.items())
+            if encoded_tokens < original_tokens:
+                codebooks[index] = codebook
+        return codebooks
+
+    @staticmethod
+    def _write_row(fields, delimiter):
+        buffer = io.StringIO()
+        csv.writer(buffer, delimiter=delimiter, lineterminator='').writerow(fields)
+        return buffer.getvalue()
+
+    def pack(self, raw_data, token_budget=None):
+        """
+        헤더 + 후보 행으로 된 원시 데이터 문자열을 토큰 예산에 맞게 압축하여 PackedSample로 반환합니다.
+        후보 행은 파일 순서로 정렬된 샘플이므로, 앞에서부터 자르지 않고 전체 구간에서 고르게 선택합니다.
+        """
+        token_budget = token_budget if token_budget is not None else self.token_budget
+        lines = [line for line in raw_data.split('\n') if line.strip()]
+        if not lines:
+            return PackedSample("", 0, 0, [], [], 0)
+
+        delimiter = '\t' if ',' not in lines[0] and '\t' in lines[0] else ','
+        parsed = list(csv.reader(lines, delimiter=delimiter))
+        header, rows = parsed[0], parsed[1:]
+
+        identifier_indexes = self._find_identifier_columns(header, rows)
+        codebooks = self._build_codebooks(header, rows, identifier_indexes)
+        kept_indexes = [index for index in range(len(header)) if index not in identifier_indexes]
+
+        # 코드표와 헤더는 행 수와 관계없이 고정 비용
+        preamble_lines = []
+        if codebooks:
+            legend = " | ".join(
+                f"{header[index]}: " + ", ".join(f"{code}={value}" for value, code in codebook.items())
+                for index, codebook in codebooks.items()
+            )
+            preamble_lines.append(f"[범주 코드표] 아래 표의 일부 컬럼 값은 다음 코드로 표기되어 있습니다. {legend}")
+        preamble_lines.append(self._write_row([header[index] for index in kept_indexes], delimiter))
+
+        encoded_rows = []
+        for row in rows:
+            fields = []
+            for index in kept_indexes:
+                value = row[index] if index < len(row) else ""
+                fields.append(codebooks[index].get(value, value) if index in codebooks else value)
+            encoded_rows.append(self._write_row(fields, delimiter))
+
+        preamble_tokens = estimate_tokens('\n'.join(preamble_lines))
+        row_tokens = [estimate_tokens(row) + 1 for row in encoded_rows]  # +1: 줄바꿈
+        selected_indexes = self._select_rows(row_tokens, token_budget - preamble_tokens)
+
+        selected_rows = [encoded_rows[index] for index in selected_indexes]
+        text = '\n'.join(preamble_lines + selected_rows)
+        return PackedSample(
+            text,
+            len(selected_rows),
+            len(rows),
+            [header[index] for index in identifier_indexes],
+            [header[index] for index in codebooks],
+            preamble_tokens + sum(row_tokens[index] for index in selected_indexes),
+        )
+
+    def prepare(self, raw_data, data_profile=None):
+        """
+        AppConfig.PROMPT_DATA_MODE에 따라 프롬프트에 넣을 원시 데이터 문자열과 통계를 반환합니다.
+        프로파일 요약이 차지하는 토큰을 먼저 빼고, 남은 예산 안에서 원시 데이터 샘플을 압축합니다.
+        """
+        profile_tokens = estimate_tokens(data_profile) if data_profile else 0
+        # 프로파일 생성에 실패하면 원시 샘플만이라도 사용
+        if AppConfig.PROMPT_DATA_MODE == "profile" and data_profile:
+            return "", {"row_count": 0, "profile_tokens": profile_tokens, "estimated_tokens": profile_tokens}
+
+        if not AppConfig.PROMPT_PACKING_ENABLED:
+            sample_tokens = estimate_tokens(raw_data)
+            return raw_data, {"row_count": max(raw_data.count('\n'), 0), "profile_tokens": profile_tokens, "estimated_tokens": profile_tokens + sample_tokens}
+
+        packed = self.pack(raw_data, self.token_budget - profile_tokens)
+        stats = packed.stats()
+        stats["profile_tokens"] = profile_tokens
+        stats["estimated_tokens"] += profile_tokens
+        return packed.text, stats
+
+    @staticmethod
+    def candidate_rows():
+        """DataLoader에서 샘플링할 행 수(헤더 포함)를 반환합니다. 압축을 사용하면 예산을 채울 수 있도록 넉넉하게 가져옵니다."""
+        return AppConfig.PACKER_CANDIDATE_ROWS if AppConfig.PROMPT_PACKING_ENABLED else 100
+
+    @staticmethod
+    def _select_rows(row_tokens, available_tokens):
+        """평균 행 비용으로 담을 수 있는 행 수를 구한 뒤, 전체 후보에서 같은 간격으로 행을 고르고 예산을 넘으면 줄입니다."""
+        if not row_tokens or available_tokens <= 0:
+            return []
+        average_tokens = sum(row_tokens) / len(row_tokens)
+        target_count = min(len(row_tokens), int(available_tokens // average_tokens))
+
+        while target_count > 0:
+            step = len(row_tokens) / target_count
+            selected_indexes = [int(i * step) for i in range(target_count)]
+            if sum(row_tokens[index] for index in selected_indexes) <= available_tokens:
+                return selected_indexes
+            target_count -= 1
+        return []
@@ -0,0 +1,113 @@
+import textwrap
+
+# 프롬프트 구조/문구를 바꾸면 올림 (트레이스와 지표에서 어떤 템플릿으로 만든 요청인지 구분)
+PROMPT_TEMPLATE_VERSION = "2"
+
+# 분야별 KPI 도출 지침
+KPI_INSTRUCTIONS = {
+    "subscription service": "제공된 원시 데이터를 기반으로 **구독/반복 활동 및 위험(Risk) 관련 핵심 지표** 6가지 (예: 전체 유지/이탈 지표, 사용 빈도, 구독 플랜별 성과, 계약 기간별 패턴, 지원 호출 리스크, 결제 지연 리스크 등)를 도출합니다.",
+    "online commerce": "제공된 원시 데이터를 기반으로 **거래 및 고객 행동 관련 핵심 지표** 6가지 (예: 객단가, 전환율, 장바구니 포기율, 재구매율, 평균 배송 시간 관련 지표 등)를 도출합니다.",
+    "contents": "제공된 원시 데이터를 기반으로 **콘텐츠 소비 및 참여 관련 핵심 지표** 6가지 (예: 카테고리별 평균 성과, 제목 길이 vs 조회수 패턴, 업로드 시간 vs 성과, 태그 수 vs 조회수 패턴, 평균 시청 시간, 월간 활동 사용자(MAU), 유료 전환율, 이탈률, 좋아요/공유 지표 등)를 도출합니다.",
+    "fintech": "제공된 원시 데이터를 기반으로 **금융 거래 및 리스크 관리 관련 핵심 지표** 6가지 (예: 거래 빈도, 평균 거래 금액, 사기 탐지율, 신용 점수 변화, 대출 상환율, 사용자 활동 지표 등)를 도출합니다.",
+}
+DEFAULT_KPI_INSTRUCTION = "제공된 원시 데이터를 기반으로 **해당 분야에 가장 적합한 핵심 지표** 6가지를 도출합니다."
+
+# LLM 제공자의 프롬프트 캐시는 요청 앞부분이 이전 요청과 바이트 단위로 같을 때만 적용되므로
+# [정적 지시문 + 출력 형식] -> [분야/데이터 블록] -> [요청별 전략 입력] 순서로 배치하고, 앞의 두 부분에는 요청별 값을 넣지 않음
+
+# 1. 모든 요청에 공통인 시스템 프롬프트 (분야/타겟 컬럼/기간 등 요청별 값 없음)
+SYSTEM_PROMPT = textwrap.dedent("""
+    당신은 비즈니스 전략 전문가입니다. 사용자 메시지의 [분석 대상 데이터]에 제공된 '데이터 프로파일'과 '원시 데이터(Raw Data)'를 활용하여 메시지 마지막의 [입력 전략]에 대한 전략 분석을 수행하세요.
+    분석 단계:
+    1) 데이터 내용을 기반으로 [분석 대상 데이터]의 **비즈니스 분야에 가장 적합한 핵심 지표** 6가지를 도출하고 **'derived_kpis'** 항목에 JSON 형태로 정리합니다. 이 지표들은 [분석 대상 데이터]의 'KPI 도출 지침'을 따르세요.
+    2) 도출된 KPI를 근거로 **'입력 전략'**의 타당성 점수, 성공 확률, 분석 요약, 대안 전략을 제시합니다. 이때 [입력 전략]의 '개선 타겟 컬럼'을 **개선 타겟 지표**로 설정하고, 이 지표를 증가/감소시키는 전략이 KPI와 얼마나 부합하는지 중점적으로 분석하세요.
+    특히, [입력 전략]의 '전략 목표 기간'이 단기(Monthly), 중기(Quarterly), 장기(Annual) 중 어디에 해당하는지 판단하고, 전략의 효과와 리스크(예: 고객 이탈, 단기 비용)를 해당 기간의 관점에서 분석하여 타당성과 성공 확률을 평가해야 합니다.
+    '데이터 프로파일'이 제공된 경우, 이는 전체 파일에 대한 정확한 집계 결과이므로 일부 행만 담긴 원시 데이터 샘플보다 우선하여 KPI 수치와 근거로 사용하세요.
+    **[성공 확률 검증 강화] 성공 확률을 평가할 때는, 제공된 '원시 데이터'에서 전략을 직접적으로 뒷받침하거나 혹은 반박하는 구체적인 데이터 패턴(예: 특정 시간대 업로드 시 낮은 성과, 특정 속성을 가진 고객층의 예상치 못한 행동 등)을 반드시 찾아 이를 근거로 점수를 부여해야 합니다. 단순히 일반적인 이론이 아닌, 데이터에 기반한 엄격한 비판적 검토를 수행하고, 모순되는 패턴이 있다면 점수를 낮추고 분석 요약에 그 이유를 명시해야 합니다.**
+    **[중요] 최종 결과는 반드시 다음 [출력 형식]에 맞춘 단일 JSON 문자열로 반환해야 합니다. 분석이 어렵더라도 'validity_score'와 'success_probability_percent'는 0 이상의 정수(int)로, 'analysis_summary'는 최소 한 문장으로, 'alternative_strategies'는 최소 1개 이상의 대안을 포함하는 배열로 필수로 채워야 합니다.**
+    **[중요] () 안에 들어가있는 예시는 참고용일 뿐, 실제 출력 시 똑같이 따라하지 말고, 해당 비즈니스 분야와 데이터에 맞게 적절히 변형하여 생각하세요.**
+
+    [출력 형식]
+    결과는 반드시 다음 구조를 가진 JSON 문자열로만 반환해야 합니다:
+    {
+      "derived_kpis": {
+        "KPI_1_이름": "KPI 1 설명",
+        "KPI_2_이름": "KPI 2 설명",
+        "KPI_3_이름": "KPI 3 설명",
+        "KPI_4_이름": "KPI 4 설명",
+        "KPI_5_이름": "KPI 5 설명",
+        "KPI_6_이름": "KPI 6 설명"
+      },
+      "strategy_analysis": {
+        "validity_score": (int, 0부터 100 사이),
+        "success_probability_percent": (int, 0부터 100 사이),
+        "analysis_summary": (string),
+        "alternative_strategies": [
+          (string: 대안 전략 1),
+          (string: 대안 전략 2)
+        ]
+      }
+    }
+""").strip()
+
+# 2. 같은 분야/데이터셋(과 타겟 컬럼별 프로파일)을 쓰는 요청끼리 공통인 데이터 블록
+DATASET_TEMPLATE = textwrap.dedent("""
+    [분석 대상 데이터]
+    - 비즈니스 분야: {business_sector}
+    - KPI 도출 지침: {kpi_instruction}
+
+    {data_section}
+""").strip()
+
+# 3. 요청마다 달라지는 전략 입력 (항상 메시지 마지막)
+REQUEST_TEMPLATE = textwrap.dedent("""
+    [입력 전략]
+    - 비즈니스 분야: {business_sector}
+    - 개선 타겟 컬럼: {target_column}
+    - 핵심 기능: {key_feature}
+    - 전략 목표 기간: {contract_type}
+    - 전략: {ai_strategy}
+""").strip()
+
+# 4. 응답에서 로컬 복구로도 채울 수 없는 필드만 다시 요청할 때 이어 붙이는 메시지
+REQUERY_TEMPLATE = textwrap.dedent("""
+    앞의 응답에서 다음 항목이 누락되었거나 형식이 올바르지 않습니다: {fields}
+    같은 분석을 바탕으로 이 항목만 [출력 형식]과 같은 구조(derived_kpis / strategy_analysis 아래)의 JSON으로 다시 반환하세요. 다른 항목은 포함하지 않아도 됩니다.
+""").strip()
+
+
+def kpi_instruction(business_sector):
+    """분야별 KPI 도출 지침을 반환합니다."""
+    return KPI_INSTRUCTIONS.get(business_sector, DEFAULT_KPI_INSTRUCTION)
+
+
+def build_data_section(raw_data_input, data_profile):
+    """프롬프트에 들어갈 데이터 블록(전체 파일 프로파일 및/또는 원시 데이터 샘플)을 구성합니다."""
+    sections = []
+    if data_profile:
+        sections.append(f"[데이터 프로파일 (전체 파일 집계)]\n{data_profile}")
+    if raw_data_input:
+        sections.append(f"[원시 데이터 (Raw Data)]\n{raw_data_input}")
+    return "\n\n".join(sections)
+
+
+def build_prompts(strategy_data, raw_data_input, data_profile):
+    """(시스템 프롬프트, 사용자 프롬프트)를 반환합니다. 사용자 프롬프트는 데이터 블록 뒤에 요청별 전략 입력을 붙입니다."""
+    dataset_block = DATASET_TEMPLATE.format(
+        business_sector=strategy_data['business_sector'],
+        kpi_instruction=kpi_instruction(strategy_data['business_sector']),
+        data_section=build_data_section(raw_data_input, data_profile)
+    )
+    request_block = REQUEST_TEMPLATE.format(
+        business_sector=strategy_data['business_sector'],
+        target_column=strategy_data['target_column'],
+        key_feature=strategy_data['key_feature'],
+        contract_type=strategy_data['contract_type'],
+        ai_strategy=strategy_data['ai_strategy']
+    )
+    return SYSTEM_PROMPT, f"{dataset_block}\n\n{request_block}"
+
+
+def build_requery_prompt(missing_fields):
+    """누락 필드 재요청 메시지를 반환합니다."""
+    return REQUERY_TEMPLATE.format(fields=", ".join(missing_fields))
@@ -0,0 +1,188 @@
+import csv
+import hashlib
+import io
+import json
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+# config.py에서 설정 정보 로드
+from config import INPUT_FIELDS
+
+
+class _ChunkSink(io.RawIOBase):
+    """zipfile이 쓴 바이트를 모아 두었다가 꺼내 가는 탐색 불가능(non-seekable) 출력 스트림입니다."""
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class RenderedReport:
+    """
+    하나의 분석 결과에 대한 JSON/TXT/CSV 보고서 바이트와 다운로드 파일 이름을 담습니다.
+    """
+    BUNDLE_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, business_sector, json_bytes, txt_bytes, csv_bytes):
+        self.business_sector = business_sector
+        self.json_bytes = json_bytes
+        self.txt_bytes = txt_bytes
+        self.csv_bytes = csv_bytes
+
+    def files(self):
+        """(파일 이름, 내용 바이트, MIME 타입) 목록을 반환합니다."""
+        return [
+            (f"strategy_report_{self.business_sector}.json", self.json_bytes, "application/json"),
+            (f"strategy_report_{self.business_sector}.txt", self.txt_bytes, "text/plain"),
+            (f"strategy_summary_{self.business_sector}.csv", self.csv_bytes, "text/csv"),
+        ]
+
+    @property
+    def bundle_file_name(self):
+        return f"strategy_report_{self.business_sector}.zip"
+
+    def iter_bundle_chunks(self):
+        """JSON+TXT+CSV zip 묶음을 만들면서 완성된 부분부터 바이트 조각으로 내보냅니다. (전체 zip을 메모리에 만들지 않음)"""
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+            for file_name, content, _ in self.files():
+                with bundle.open(file_name, 'w') as entry:
+                    for start in range(0, len(content), self.BUNDLE_CHUNK_SIZE):
+                        entry.write(content[start:start + self.BUNDLE_CHUNK_SIZE])
+                        chunk = sink.drain()
+                        if chunk:
+                            yield chunk
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+
+    def bundle_file(self):
+        """zip 묶음을 임시 파일(작으면 메모리, 크면 디스크)에 순차 기록하여 처음 위치로 되감은 파일 객체를 반환합니다."""
+        bundle_file = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        for chunk in self.iter_bundle_chunks():
+            bundle_file.write(chunk)
+        bundle_file.seek(0)
+        return bundle_file
+
+
+class ReportRenderer:
+    """
+    분석 결과를 JSON/TXT/CSV 보고서로 한 번만 렌더링하고, 같은 결과에 대해서는 저장해 둔 바이트를 재사용합니다.
+    """
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # 입력값+원본 JSON 해시 -> RenderedReport (최근 사용 순)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(input_data, raw_json_report):
+        digest = hashlib.sha256()
+        for part in (*(str(input_data.get(field, "")) for field in INPUT_FIELDS), raw_json_report or ""):
+            digest.update(part.encode('utf-8'))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def render(self, input_data, analysis_result, raw_json_report):
+        """보고서를 반환합니다. 같은 입력값과 원본 JSON에 대해서는 처음 렌더링한 결과를 그대로 돌려줍니다."""
+        key = self.make_key(input_data, raw_json_report)
+        with self._lock:
+            report = self._entries.get(key)
+            if report is not None:
+                self._entries.move_to_end(key)
+                return report
+
+        report = RenderedReport(
+            input_data['business_sector'],
+            (raw_json_report or json.dumps(analysis_result, ensure_ascii=False)).encode('utf-8'),
+            self.render_text(input_data, analysis_result).encode('utf-8'),
+            self.render_csv(input_data, analysis_result).encode('utf-8'),
+        )
+        with self._lock:
+            self._entries[key] = report
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return report
+
+    @staticmethod
+    def _report_values(analysis_result):
+        """LLM 분석 결과에서 보고서에 쓸 값을 안전하게 추출합니다."""
+        alternative_strategies_list = analysis_result.get('alternative_strategies', ['N/A'])
+        return {
+            "validity_score": analysis_result.get('validity_score', 'N/A'),
+            "success_probability": analysis_result.get('success_probability_percent', 'N/A'),
+            "alt_1": alternative_strategies_list[0] if len(alternative_strategies_list) > 0 else 'N/A',
+            "alt_2": alternative_strategies_list[1] if len(alternative_strategies_list) > 1 else 'N/A',
+            "analysis_summary": analysis_result.get('analysis_summary', '분석 요약 정보를 불러오지 못했습니다.'),
+        }
+
+    @classmethod
+    def render_text(cls, input_data, analysis_result):
+        """텍스트(TXT) 보고서: 모든 입력값과 분석 결과를 포함합니다."""
+        values = cls._report_values(analysis_result)
+        text_report = f"""
+[AI 비즈니스 전략 타당성 검증 리포트 - {input_data['business_sector']}]
+
+--- 입력 정보 ---
+비즈니스 분야: {input_data['business_sector']}
+개선 타겟 컬럼: {input_data['target_column']}
+AI 추천 핵심 전략: {input_data['ai_strategy']}
+핵심 기능 요약: {input_data['key_feature']}
+전략 목표 기간: {input_data['contract_type']}
+--- 분석 결과 ---
+타당성 점수: {values['validity_score']}점
+예상 성공 확률: {values['success_probability']}%
+
+[요약]
+{values['analysis_summary']}
+
+[대안 전략]
+- {values['alt_1']}
+- {values['alt_2']}
+"""
+        return text_report.strip()
+
+    @classmethod
+    def render_csv(cls, input_data, analysis_result):
+        """CSV 요약 보고서: 따옴표, 쉼표, 줄바꿈이 들어간 전략 문구도 csv 모듈로 올바르게 이스케이프합니다."""
+        values = cls._report_values(analysis_result)
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator='\n')
+        writer.writerows([
+            ("지표", "값"),
+            ("비즈니스 분야", input_data['business_sector']),
+            ("개선 타겟 컬럼", input_data['target_column']),
+            ("AI 추천 핵심 전략", input_data['ai_strategy']),
+            ("핵심 기능 요약", input_data['key_feature']),
+            ("전략 목표 기간", input_data['contract_type']),
+            ("타당성 점수", values['validity_score']),
+            ("성공 확률", values['success_probability']),
+            ("대안 1", values['alt_1']),
+            ("대안 2", values['alt_2']),
+        ])
+        return output.getvalue()
+
+
+_shared_report_renderer = ReportRenderer()
+
+def get_report_renderer():
+    """프로세스 전역에서 공유되는 보고서 렌더러를 반환합니다."""
+    return _shared_report_renderer
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+import time
+# config.py에서 설정 정보 로드
+from config import AppConfig
+
+class ResponseCache:
+    """
+    LLM 응답(JSON 문자열)을 디스크에 저장하는 내용 주소 기반(content-addressed) 캐시입니다.
+    (모델, 프롬프트, 데이터셋 버전의 해시를 파일 이름으로 사용하며, TTL과 전체 크기 기준 LRU 제거를 지원합니다.)
+    """
+    def __init__(self, cache_dir, ttl_seconds, max_bytes):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(llm_model, system_prompt, user_prompt, dataset_fingerprint):
+        """캐시 키(SHA-256 해시)를 만듭니다."""
+        digest = hashlib.sha256()
+        for part in (llm_model, system_prompt, user_prompt, dataset_fingerprint or ""):
+            digest.update(part.encode('utf-8'))
+            digest.update(b"\0")  # 구분자 (필드 경계가 섞여 같은 해시가 나오지 않도록)
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """캐시된 JSON 문자열을 반환합니다. 없거나 만료되었으면 None을 반환합니다."""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count(hit=False)
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            self._delete(entry_path)
+            self._count(hit=False)
+            return None
+
+        # 최근 사용 시각을 갱신하여 LRU 제거 순서에 반영
+        try:
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+        self._count(hit=True)
+        return entry.get("json_string")
+
+    def put(self, key, json_string):
+        """JSON 문자열을 저장하고, 전체 크기가 한도를 넘으면 오래 사용되지 않은 항목부터 제거합니다."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entry_path = self._entry_path(key)
+            # 임시 파일에 쓴 뒤 교체하여 다른 프로세스가 쓰다 만 파일을 읽지 않도록 함
+            temp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"created_at": time.time(), "json_string": json_string}, f, ensure_ascii=False)
+            os.replace(temp_path, entry_path)
+            self._evict()
+        except OSError as e:
+            print(f"LLM 응답 캐시 저장 중 오류가 발생했습니다. 오류: {e}")
+
+    def _evict(self):
+        entries = []
+        total_bytes = 0
+        with os.scandir(self.cache_dir) as it:
+            for dir_entry in it:
+                if not dir_entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = dir_entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+                total_bytes += stat.st_size
+
+        if total_bytes <= self.max_bytes:
+            return
+        for _, size_bytes, entry_path in sorted(entries):
+            self._delete(entry_path)
+            total_bytes -= size_bytes
+            if total_bytes <= self.max_bytes:
+                break
+
+    @staticmethod
+    def _delete(entry_path):
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        """적중/미적중 횟수를 딕셔너리로 반환합니다."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+# 적중/미적중 카운터를 모든 세션에서 공유하기 위해 프로세스 전역 인스턴스 사용
+_shared_response_cache = ResponseCache(
+    AppConfig.RESPONSE_CACHE_DIR,
+    AppConfig.RESPONSE_CACHE_TTL_SECONDS,
+    AppConfig.RESPONSE_CACHE_MAX_BYTES,
+)
+
+def get_response_cache():
+    """프로세스 전역에서 공유되는 LLM 응답 캐시를 반환합니다."""
+    return _shared_response_cache
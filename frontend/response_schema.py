@@ -0,0 +1,208 @@
+import json
+import re
+from incremental_json import IncrementalJsonParser
+
+# [출력 형식]의 strategy_analysis 필드 (화면에 표시하므로 모두 있어야 결과로 사용)
+SCORE_FIELDS = ("validity_score", "success_probability_percent")
+STRATEGY_FIELDS = SCORE_FIELDS + ("analysis_summary", "alternative_strategies")
+# 누락 시 재요청 대상이 되는 전체 필드 (derived_kpis는 재요청 후에도 없으면 빈 값으로 허용)
+RESPONSE_FIELDS = ("derived_kpis",) + STRATEGY_FIELDS
+
+_CODE_FENCE_PATTERN = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+class SchemaValidationResult:
+    """
+    LLM 응답을 [출력 형식] 구조로 검증/복구한 결과입니다.
+    data: {"derived_kpis": {...}, "strategy_analysis": {...}} (복구할 수 없는 필드는 빠져 있음)
+    repairs: 적용한 로컬 복구 종류 목록 (예: "truncated_json", "score_coerced")
+    missing_fields: 복구할 수 없어 비어 있는 필드 이름 목록 (RESPONSE_FIELDS 중)
+    """
+    def __init__(self, data, repairs, missing_fields):
+        self.data = data
+        self.repairs = repairs
+        self.missing_fields = missing_fields
+
+    @property
+    def is_complete(self):
+        return not self.missing_fields
+
+    @property
+    def is_usable(self):
+        """화면에 표시할 strategy_analysis 필드가 모두 있는지 (derived_kpis는 없어도 됨)"""
+        return not any(field in STRATEGY_FIELDS for field in self.missing_fields)
+
+    def merge(self, other):
+        """재요청 응답(other)에서 이 결과의 누락 필드만 가져와 합친 새 결과를 반환합니다."""
+        data = {"derived_kpis": dict(self.data.get("derived_kpis", {})), "strategy_analysis": dict(self.data.get("strategy_analysis", {}))}
+        missing_fields = []
+        for field in self.missing_fields:
+            section = "derived_kpis" if field == "derived_kpis" else "strategy_analysis"
+            if field in other.missing_fields:
+                missing_fields.append(field)
+            elif section == "derived_kpis":
+                data["derived_kpis"] = other.data["derived_kpis"]
+            else:
+                data["strategy_analysis"][field] = other.data["strategy_analysis"][field]
+        if "derived_kpis" in missing_fields:
+            del data["derived_kpis"]
+        return SchemaValidationResult(_ordered(data), self.repairs + other.repairs, missing_fields)
+
+    def to_json(self):
+        return json.dumps(self.data, ensure_ascii=False)
+
+
+def _ordered(data):
+    """derived_kpis -> strategy_analysis 순서, strategy_analysis 안은 [출력 형식]의 필드 순서로 정렬합니다."""
+    analysis = data.get("strategy_analysis", {})
+    ordered_analysis = {field: analysis[field] for field in STRATEGY_FIELDS if field in analysis}
+    ordered_analysis.update({key: value for key, value in analysis.items() if key not in ordered_analysis})
+    ordered = {"derived_kpis": data["derived_kpis"]} if "derived_kpis" in data else {}
+    ordered["strategy_analysis"] = ordered_analysis
+    return ordered
+
+
+def parse_response(text):
+    """
+    응답 문자열을 JSON 객체로 파싱합니다. 그대로 파싱되지 않으면 코드 블록 표시 제거, 앞뒤 설명문 제거,
+    끊긴 JSON 닫기 순서로 복구를 시도합니다. 반환값: (dict 또는 None, 적용한 복구 목록)
+    """
+    try:
+        parsed = json.loads(text)
+        return (parsed, []) if isinstance(parsed, dict) else (None, ["not_object"])
+    except (TypeError, ValueError):
+        pass
+    if not text:
+        return None, ["empty_response"]
+
+    stripped = _CODE_FENCE_PATTERN.sub("", text.strip())
+    start = stripped.find("{")
+    if start < 0:
+        return None, ["unparseable"]
+    end = stripped.rfind("}")
+    if end > start:
+        try:
+            parsed = json.loads(stripped[start:end + 1])
+            if isinstance(parsed, dict):
+                return parsed, ["extracted_json"]
+        except ValueError:
+            pass
+
+    parser = IncrementalJsonParser()
+    parser.feed(stripped[start:])
+    parsed = parser.complete()
+    if isinstance(parsed, dict):
+        return parsed, ["truncated_json"]
+    return None, ["unparseable"]
+
+
+def _coerce_score(value):
+    """점수를 0~100 정수로 변환합니다. 반환값: (정수 또는 None, 복구 종류 또는 None)"""
+    if isinstance(value, bool) or value is None:
+        return None, None
+    repair = None
+    if isinstance(value, str):
+        match = _NUMBER_PATTERN.search(value.replace(",", ""))
+        if not match:
+            return None, None
+        value, repair = float(match.group()), "score_coerced"
+    if not isinstance(value, (int, float)):
+        return None, None
+    if isinstance(value, float):
+        if 0 < value < 1:
+            # 0.75처럼 비율로 답한 경우 백분율로 변환
+            value, repair = value * 100, "score_scaled"
+        elif not value.is_integer():
+            repair = repair or "score_coerced"
+    score = int(round(value))
+    if not 0 <= score <= 100:
+        score, repair = max(0, min(100, score)), "score_clamped"
+    return score, repair
+
+
+def _coerce_text(value):
+    """분석 요약을 비어 있지 않은 문자열로 변환합니다. 반환값: (문자열 또는 None, 복구 종류 또는 None)"""
+    if isinstance(value, str):
+        return (value.strip(), None) if value.strip() else (None, None)
+    if isinstance(value, list):
+        text = " ".join(str(item).strip() for item in value if str(item).strip())
+        return (text, "summary_joined") if text else (None, None)
+    if value is None or isinstance(value, (dict, bool)):
+        return None, None
+    return str(value), "summary_coerced"
+
+
+def _coerce_alternatives(value):
+    """대안 전략을 비어 있지 않은 문자열 목록으로 변환합니다. 반환값: (목록 또는 None, 복구 종류 또는 None)"""
+    if isinstance(value, str):
+        return ([value.strip()], "alternatives_wrapped") if value.strip() else (None, None)
+    if not isinstance(value, list):
+        return None, None
+    items, repair = [], None
+    for item in value:
+        if isinstance(item, dict):
+            item, repair = " - ".join(str(part) for part in item.values()), "alternatives_coerced"
+        elif not isinstance(item, str):
+            item, repair = str(item), "alternatives_coerced"
+        if item.strip():
+            items.append(item.strip())
+    return (items, repair) if items else (None, None)
+
+
+def _coerce_kpis(value):
+    """derived_kpis를 {이름: 설명 문자열} 딕셔너리로 변환합니다. 반환값: (딕셔너리 또는 None, 복구 종류 또는 None)"""
+    if isinstance(value, list):
+        value = {f"KPI_{index}": item for index, item in enumerate(value, start=1)}
+        repair = "kpis_listed"
+    elif isinstance(value, dict):
+        repair = None
+    else:
+        return None, None
+    kpis = {}
+    for name, description in value.items():
+        if not isinstance(description, str):
+            description, repair = json.dumps(description, ensure_ascii=False) if isinstance(description, (dict, list)) else str(description), repair or "kpis_coerced"
+        kpis[str(name)] = description
+    return (kpis, repair) if kpis else (None, None)
+
+
+def validate_response(parsed, repairs=None):
+    """
+    파싱된 응답을 [출력 형식]에 맞게 검증하고, 형식만 틀린 값(문자열 점수, 범위 밖 점수, 문자열 하나인 대안 등)은 로컬에서 고칩니다.
+    strategy_analysis 필드가 최상위에 있는 응답도 받아들입니다.
+    """
+    repairs = list(repairs or [])
+    parsed = parsed if isinstance(parsed, dict) else {}
+    analysis = parsed.get("strategy_analysis")
+    if not isinstance(analysis, dict):
+        analysis = {field: parsed[field] for field in STRATEGY_FIELDS if field in parsed}
+        if analysis:
+            repairs.append("flattened_strategy_analysis")
+
+    data = {"strategy_analysis": {key: value for key, value in analysis.items() if key not in STRATEGY_FIELDS}}
+    missing_fields = []
+    coercers = {"analysis_summary": _coerce_text, "alternative_strategies": _coerce_alternatives}
+    for field in STRATEGY_FIELDS:
+        value, repair = coercers.get(field, _coerce_score)(analysis.get(field))
+        if value is None:
+            missing_fields.append(field)
+            continue
+        data["strategy_analysis"][field] = value
+        if repair:
+            repairs.append(repair)
+
+    kpis, repair = _coerce_kpis(parsed.get("derived_kpis"))
+    if kpis is None:
+        missing_fields.insert(0, "derived_kpis")
+    else:
+        data["derived_kpis"] = kpis
+        if repair:
+            repairs.append(repair)
+    return SchemaValidationResult(_ordered(data), repairs, missing_fields)
+
+
+def validate_response_text(text):
+    """응답 문자열을 파싱(복구 포함)하고 검증한 SchemaValidationResult를 반환합니다."""
+    parsed, repairs = parse_response(text)
+    return validate_response(parsed, repairs)
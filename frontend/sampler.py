@@ -0,0 +1,153 @@
+import csv
+import random
+
+class RowSampler:
+    """
+    데이터 행을 한 번만 순회하면서 고정된 메모리 안에서 대표 샘플을 추출합니다.
+    (입력은 헤더를 제외한 데이터 행의 이터러블이며, 파일 객체를 그대로 넘겨도 됩니다.)
+    """
+    # 층화 샘플링 시 별도로 추적할 최대 층(stratum) 수. 초과하는 값은 하나의 층으로 묶습니다.
+    MAX_STRATA = 50
+    OTHER_STRATUM = "(기타)"
+
+    def __init__(self, seed=None):
+        self.seed = seed
+
+    def head(self, rows, sample_size):
+        """앞에서부터 sample_size개의 행을 반환합니다. (기존 방식)"""
+        sampled = []
+        for row in rows:
+            if len(sampled) >= sample_size:
+                break
+            sampled.append(row)
+        return sampled
+
+    def reservoir(self, rows, sample_size):
+        """
+        저수지 샘플링(Algorithm R)으로 전체 행에서 균등하게 sample_size개를 추출합니다.
+        결과는 원본 파일의 행 순서를 유지합니다.
+        """
+        rng = random.Random(self.seed)
+        reservoir = []  # (원본 행 번호, 행)
+
+        for index, row in enumerate(rows):
+            if index < sample_size:
+                reservoir.append((index, row))
+            else:
+                slot = rng.randrange(index + 1)
+                if slot < sample_size:
+                    reservoir[slot] = (index, row)
+
+        reservoir.sort(key=lambda item: item[0])
+        return [row for _, row in reservoir]
+
+    def stratified(self, rows, sample_size, column_index, delimiter=','):
+        """
+        column_index 컬럼 값을 기준으로 층을 나누어, 각 층의 비율에 맞게 sample_size개를 추출합니다.
+        층마다 크기 sample_size의 저수지를 유지하므로 메모리는 sample_size * MAX_STRATA로 제한됩니다.
+        """
+        rng = random.Random(self.seed)
+        reservoirs = {}  # 층 값 -> [(원본 행 번호, 행)]
+        counts = {}      # 층 값 -> 지금까지 본 행 수
+
+        for index, (row, fields) in enumerate(self._split_rows(rows, delimiter)):
+            key = fields[column_index].strip() if column_index < len(fields) else ""
+            if key not in reservoirs and len(reservoirs) >= self.MAX_STRATA:
+                key = self.OTHER_STRATUM
+
+            reservoir = reservoirs.setdefault(key, [])
+            seen = counts.get(key, 0)
+            counts[key] = seen + 1
+
+            if seen < sample_size:
+                reservoir.append((index, row))
+            else:
+                slot = rng.randrange(seen + 1)
+                if slot < sample_size:
+                    reservoir[slot] = (index, row)
+
+        allocation = self._allocate(counts, sample_size)
+        sampled = []
+        for key, reservoir in reservoirs.items():
+            take = min(allocation.get(key, 0), len(reservoir))
+            sampled.extend(rng.sample(reservoir, take))
+
+        sampled.sort(key=lambda item: item[0])
+        return [row for _, row in sampled]
+
+    def reservoir_indices(self, row_count, sample_size):
+        """행 수만 알 때(컬럼형 데이터셋) 전체에서 균등하게 sample_size개의 행 번호를 뽑아 오름차순으로 반환합니다."""
+        import numpy as np
+        rng = np.random.default_rng(self.seed)
+        return np.sort(rng.choice(row_count, size=min(sample_size, row_count), replace=False))
+
+    def stratified_indices(self, strata, sample_size):
+        """
+        행별 층 코드 배열(strata)을 기준으로 stratified와 같은 비율 배분 규칙으로 행 번호를 뽑아 오름차순으로 반환합니다.
+        층이 MAX_STRATA개를 넘으면 행 수가 적은 층들을 하나로 묶습니다. (행 문자열을 분리하지 않는 벡터 연산)
+        """
+        import numpy as np
+        rng = np.random.default_rng(self.seed)
+        _, inverse, counts = np.unique(strata, return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+        if len(counts) > self.MAX_STRATA:
+            kept = np.argsort(-counts, kind="stable")[:self.MAX_STRATA - 1]
+            mapping = np.full(len(counts), self.MAX_STRATA - 1)
+            mapping[kept] = np.arange(len(kept))
+            inverse = mapping[inverse]
+            counts = np.bincount(inverse)
+
+        allocation = self._allocate(dict(enumerate(counts.tolist())), sample_size)
+        # 층 번호로 정렬한 행 번호를 층 경계에서 잘라 각 층의 구성원을 구함
+        members_by_stratum = np.split(np.argsort(inverse, kind="stable"), np.cumsum(counts)[:-1])
+        sampled = [
+            rng.choice(members_by_stratum[stratum], size=take, replace=False)
+            for stratum, take in allocation.items() if take > 0
+        ]
+        return np.sort(np.concatenate(sampled)) if sampled else np.array([], dtype=np.int64)
+
+    @staticmethod
+    def _split_rows(rows, delimiter):
+        """원본 행 문자열과 CSV 규칙으로 분리한 필드 목록을 함께 반환합니다. (따옴표 안의 구분자 처리)"""
+        for row in rows:
+            fields = next(csv.reader([row], delimiter=delimiter), [])
+            yield row, fields
+
+    @staticmethod
+    def _allocate(counts, sample_size):
+        """
+        각 층의 행 수에 비례하여 샘플 개수를 배분합니다. (최대 잉여 방식)
+        샘플 크기가 허용하는 한 모든 층에 최소 1개씩 배분하여 소수 층이 누락되지 않도록 합니다.
+        """
+        total = sum(counts.values())
+        if total == 0 or sample_size <= 0:
+            return {}
+
+        sample_size = min(sample_size, total)
+        allocation = {}
+        remainders = []
+        for key, count in counts.items():
+            exact = sample_size * count / total
+            allocation[key] = int(exact)
+            remainders.append((exact - int(exact), key))
+
+        if sample_size >= len(counts):
+            for key, count in counts.items():
+                if allocation[key] == 0 and count > 0:
+                    allocation[key] = 1
+
+        remaining = sample_size - sum(allocation.values())
+        for _, key in sorted(remainders, reverse=True):
+            if remaining <= 0:
+                break
+            if allocation[key] < counts[key]:
+                allocation[key] += 1
+                remaining -= 1
+
+        # 최소 1개 보장으로 초과한 경우 가장 큰 층부터 줄임
+        while remaining < 0:
+            largest = max(allocation, key=allocation.get)
+            allocation[largest] -= 1
+            remaining += 1
+
+        return allocation
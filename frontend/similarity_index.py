@@ -0,0 +1,160 @@
+import math
+import re
+import threading
+from collections import Counter
+# config.py에서 설정 정보 로드
+from config import AppConfig
+from analysis_store import get_analysis_store
+
+# 입력란이 비어 있을 때 화면의 예시 문구(placeholder)로 채운 값은 이 접두어로 시작하며, 사용자가 쓴 문구가 아니므로 유사도 비교에서 제외
+PLACEHOLDER_PREFIX = "예시:"
+
+_PUNCTUATION = re.compile(r"[^\w\s%]")
+_WHITESPACE = re.compile(r"\s+")
+
+# 단어 끝의 조사/어미 (긴 것부터 제거: "고객에게" -> "고객", "인상하여" -> "인상")
+_SUFFIXES = tuple(sorted((
+    "에게서", "으로써", "으로서", "에게", "에서", "까지", "부터", "으로", "처럼", "보다", "하고", "이나",
+    "합니다", "입니다", "습니다", "니다", "하여", "해서", "하는", "한다", "하기", "하면", "시켜", "시키는", "된", "되는",
+    "을", "를", "이", "가", "은", "는", "의", "에", "와", "과", "로", "도", "만", "한", "할", "해", "s",
+), key=len, reverse=True))
+# 의미 없이 자주 쓰이는 단어
+_STOPWORDS = {"및", "등", "위해", "위한", "통해", "통한", "대상", "대한", "기반", "활용", "the", "to", "for", "of", "a", "an", "and", "with"}
+# 같은 뜻으로 자주 바꿔 쓰는 분야 용어를 하나로 모음 (해지/탈퇴 -> 이탈 등)
+_SYNONYMS = {
+    "해지": "이탈", "탈퇴": "이탈", "취소": "이탈", "churn": "이탈", "churning": "이탈",
+    "쿠폰": "할인", "coupon": "할인", "discount": "할인", "프로모션": "할인",
+    "발송": "캠페인", "전송": "캠페인", "campaign": "캠페인",
+    "사용자": "고객", "회원": "고객", "user": "고객", "customer": "고객",
+    "징후": "위험", "risk": "위험",
+}
+# 방향이 반대인 표현 쌍: 한쪽 전략에만 있고 다른 쪽 전략에는 반대 표현만 있으면 문구가 비슷해도 다른 전략으로 봄
+_OPPOSITE_TERMS = (
+    ("인상", "인하"), ("증가", "감소"), ("확대", "축소"), ("강화", "완화"), ("늘리", "줄이"), ("늘려", "줄여"),
+    ("높이", "낮추"), ("높입", "낮춥"), ("올리", "내리"), ("올려", "내려"), ("추가", "제거"), ("도입", "폐지"),
+    ("raise", "cut"), ("increase", "decrease"),
+)
+
+
+def strip_placeholder(text):
+    """예시 문구(placeholder)로 채운 값이면 빈 문자열을, 아니면 원래 문구를 반환합니다."""
+    text = text or ""
+    return "" if text.startswith(PLACEHOLDER_PREFIX) else text
+
+
+class StrategySimilarityIndex:
+    """
+    과거 분석의 전략 문구(ai_strategy + key_feature)에 대한 단어 단위 TF-IDF 코사인 유사도 색인입니다.
+    단어의 조사/어미를 떼고 자주 바꿔 쓰는 분야 용어를 하나로 모아 표현만 다른 전략을 찾고,
+    인상/인하처럼 방향이 반대인 표현이 있으면 문구가 비슷해도 다른 전략으로 봅니다.
+    비즈니스 분야, 타겟 컬럼, 전략 목표 기간, 데이터셋 버전별로 따로 색인하며 (기간이나 데이터가 다른 분석은 재사용하지 않음),
+    분석 기록 저장소에 새로 추가된 기록만 읽어 색인(단어별 역색인과 문서 빈도)을 갱신합니다.
+    """
+    def __init__(self, analysis_store, threshold):
+        self.analysis_store = analysis_store
+        self.threshold = threshold
+        self._scopes = {}  # (business_sector, target_column, contract_type, dataset_fingerprint) -> {"ids": [...], "terms": [Counter, ...], "texts": [...], "postings": {단어: [위치, ...]}}
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(text):
+        return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+    @classmethod
+    def terms(cls, ai_strategy, key_feature):
+        """전략 문구를 단어 빈도(Counter)로 변환합니다. (조사/어미 제거, 불용어 제외, 동의어 통일)"""
+        counts = Counter()
+        for word in cls._normalize(f"{ai_strategy} {key_feature}").split(" "):
+            for suffix in _SUFFIXES:
+                # 한 글자 조사는 두 글자 이상 남을 때만 뗌 (증가 -> 증, 효과 -> 효 방지)
+                if word.endswith(suffix) and len(word) - len(suffix) >= (2 if len(suffix) == 1 else 1):
+                    word = word[:-len(suffix)]
+                    break
+            word = _SYNONYMS.get(word, word)
+            if word and word not in _STOPWORDS:
+                counts[word] += 1
+        return counts
+
+    @classmethod
+    def _opposite(cls, text, other_text):
+        """두 문구에 방향이 반대인 표현이 엇갈려 들어 있는지 확인합니다."""
+        for term, opposite in _OPPOSITE_TERMS:
+            if (term in text and opposite not in text and opposite in other_text and term not in other_text) or \
+               (opposite in text and term not in text and term in other_text and opposite not in other_text):
+                return True
+        return False
+
+    def _add(self, record_id, scope_key, ai_strategy, key_feature):
+        terms = self.terms(ai_strategy, key_feature)
+        if not terms:
+            return
+        scope = self._scopes.setdefault(scope_key, {"ids": [], "terms": [], "texts": [], "postings": {}})
+        position = len(scope["ids"])
+        scope["ids"].append(record_id)
+        scope["terms"].append(terms)
+        scope["texts"].append(self._normalize(f"{ai_strategy} {key_feature}"))
+        for term in terms:
+            scope["postings"].setdefault(term, []).append(position)
+
+    def refresh(self):
+        """저장소에 마지막으로 색인한 기록 이후 추가된 기록만 색인에 반영합니다."""
+        with self._lock:
+            for row in self.analysis_store.iter_strategy_texts(after_id=self._last_id):
+                self._last_id = max(self._last_id, row["id"])
+                # 데이터셋 버전이 없는(버전 기록 이전의) 기록과 전략을 예시 문구로 채운 기록은 비교 대상이 아니므로 색인하지 않음
+                ai_strategy = strip_placeholder(row["ai_strategy"])
+                if row["dataset_fingerprint"] is None or not ai_strategy:
+                    continue
+                scope_key = (row["business_sector"], row["target_column"], row["contract_type"], row["dataset_fingerprint"])
+                self._add(row["id"], scope_key, ai_strategy, strip_placeholder(row["key_feature"]))
+
+    @staticmethod
+    def _vector(terms, idf):
+        vector = {term: count * idf(term) for term, count in terms.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return vector, norm
+
+    def find_similar(self, business_sector, target_column, contract_type, dataset_fingerprint, ai_strategy, key_feature, limit=1):
+        """
+        같은 분야/타겟 컬럼/목표 기간/데이터셋 버전의 과거 분석 중 TF-IDF 코사인 유사도가 threshold 이상인 기록을 유사도 순으로 반환합니다.
+        ai_strategy/key_feature는 사용자가 입력한 그대로의 문구여야 합니다. (예시 문구로 채운 값은 비교하지 않음)
+        반환값: [(유사도, record_id), ...]
+        """
+        self.refresh()
+        ai_strategy = strip_placeholder(ai_strategy)
+        terms = self.terms(ai_strategy, strip_placeholder(key_feature))
+        if not ai_strategy or not terms or dataset_fingerprint is None:
+            return []
+        text = self._normalize(f"{ai_strategy} {strip_placeholder(key_feature)}")
+
+        with self._lock:
+            scope = self._scopes.get((business_sector, target_column, contract_type, dataset_fingerprint))
+            if not scope:
+                return []
+            document_count = len(scope["ids"])
+            # 평활화한 IDF: 이 범위의 과거 전략 대부분에 나오는 단어(예: 고객)일수록 가중치가 낮음
+            idf = lambda term: math.log((1 + document_count) / (1 + len(scope["postings"].get(term, ())))) + 1.0
+            query_vector, query_norm = self._vector(terms, idf)
+            candidates = set()
+            for term in terms:
+                candidates.update(scope["postings"].get(term, ()))
+            matches = []
+            for position in candidates:
+                if self._opposite(text, scope["texts"][position]):
+                    continue
+                vector, norm = self._vector(scope["terms"][position], idf)
+                similarity = sum(weight * vector.get(term, 0.0) for term, weight in query_vector.items()) / (query_norm * norm)
+                if similarity >= self.threshold:
+                    matches.append((similarity, scope["ids"][position]))
+
+        # 유사도가 같으면 최근 기록 우선
+        matches.sort(key=lambda match: (match[0], match[1]), reverse=True)
+        return matches[:limit]
+
+
+_shared_similarity_index = StrategySimilarityIndex(get_analysis_store(), AppConfig.SIMILARITY_THRESHOLD)
+
+def get_similarity_index():
+    """프로세스 전역에서 공유되는 전략 유사도 색인을 반환합니다."""
+    return _shared_similarity_index
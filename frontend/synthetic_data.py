@@ -0,0 +1,64 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+# config.py에서 설정 정보 로드
+from config import AppConfig
+
+class SyntheticDataGenerator:
+    """
+    example_dataset의 예시 CSV와 같은 스키마(컬럼, 값 형식, 값 분포)를 가진 대용량 합성 CSV를 만듭니다.
+    각 컬럼은 예시 파일의 값에서 독립적으로 복원 추출하고, 식별자 컬럼은 1부터 순서대로 채웁니다.
+    """
+    CHUNK_ROWS = 200_000  # 한 번에 메모리에 만드는 행 수
+
+    def __init__(self, example_file_path, seed=42):
+        # 원본 표기(TRUE/FALSE, 소수 자릿수 등)를 그대로 유지하기 위해 문자열로 읽음
+        self.example = pd.read_csv(example_file_path, dtype=str, keep_default_na=False)
+        self.rng = np.random.default_rng(seed)
+        self.identifier_columns = [
+            col for col in self.example.columns
+            if self.example[col].is_unique and self.example[col].str.fullmatch(r"\d+").all()
+        ]
+
+    def generate(self, output_path, row_count):
+        """row_count개의 행을 가진 CSV 파일을 청크 단위로 기록합니다. (메모리 사용량은 CHUNK_ROWS에 비례)"""
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        written = 0
+        with open(output_path, 'w', encoding='utf-8', newline='') as f:
+            while written < row_count:
+                chunk_rows = min(self.CHUNK_ROWS, row_count - written)
+                chunk = {}
+                for col in self.example.columns:
+                    if col in self.identifier_columns:
+                        chunk[col] = np.arange(written + 1, written + chunk_rows + 1)
+                    else:
+                        chunk[col] = self.rng.choice(self.example[col].to_numpy(), size=chunk_rows)
+                pd.DataFrame(chunk, columns=self.example.columns).to_csv(f, index=False, header=(written == 0), lineterminator='\n')
+                written += chunk_rows
+        return output_path
+
+
+def example_file_path(business_sector):
+    """비즈니스 분야에 매핑된 예시 데이터 파일 경로를 반환합니다."""
+    relative_file_path = AppConfig.BUSINESS_FILE_MAPPING[business_sector]
+    return os.path.join(AppConfig.BASE_DATA_DIR, relative_file_path.replace('/', os.sep))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="예시 데이터셋 스키마를 따르는 합성 CSV를 생성합니다.")
+    parser.add_argument("--sector", default="subscription service", choices=list(AppConfig.BUSINESS_FILE_MAPPING.keys()))
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="생성할 행 수 목록 (예: 10000 10000000)")
+    parser.add_argument("--output-dir", default="bench_data")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(example_file_path(args.sector), seed=args.seed)
+    for row_count in args.rows:
+        output_path = os.path.join(args.output_dir, f"{args.sector.replace(' ', '_')}_{row_count}.csv")
+        generator.generate(output_path, row_count)
+        print(f"생성 완료: {output_path} ({row_count}행, {os.path.getsize(output_path) / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()